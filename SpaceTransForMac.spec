@@ -19,6 +19,32 @@ a = Analysis(
         'tkinter.messagebox',
         'config_manager', 
         'main',
+        'http_client',
+        'streaming',
+        'translation_cache',
+        'clipboard_monitor',
+        'lang_detect',
+        'segmenter',
+        'translation_engine',
+        'async_core',
+        'scheduler',
+        'providers',
+        'telemetry',
+        'input_backend',
+        'prompt_budget',
+        'local_engine',
+        'glossary',
+        'config_watcher',
+        'selection_source',
+        'incremental',
+        'rate_limiter',
+        'keystroke',
+        'numpy',
+        'lazy_import',
+        'requests',
+        'pyperclip',
+        'py3langid',
+        'sqlite3',
         'threading',
         'json',
         'os',
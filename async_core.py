@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SpaceTrans异步核心模块
+
+在一个专用线程上运行asyncio事件循环，所有翻译任务都作为协程提交到这里执行，
+可以随时取消，并为每个阶段设置单独的超时时间。
+"""
+
+import asyncio
+import threading
+
+
+class StageTimeoutError(Exception):
+    """
+    某个阶段在规定时间内没有完成时抛出
+    """
+    def __init__(self, stage, timeout):
+        super().__init__(f"{stage}阶段超时（{timeout}秒）")
+        self.stage = stage
+        self.timeout = timeout
+
+
+async def run_stage(stage, awaitable, timeout):
+    """
+    带超时地等待一个阶段完成
+
+    Args:
+        stage: 阶段名称，用于错误信息
+        awaitable: 要等待的协程或Future
+        timeout: 超时时间（秒），None或0表示不限时
+
+    Raises:
+        StageTimeoutError: 阶段超时
+    """
+    if not timeout:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        raise StageTimeoutError(stage, timeout) from None
+
+
+class AsyncCore:
+    """
+    异步核心 - 持有一个在后台线程中常驻的事件循环
+    """
+    def __init__(self, name="async-core"):
+        self.loop = asyncio.new_event_loop()
+        self._lock = threading.Lock()
+        self._futures = set()
+        self._thread = threading.Thread(target=self._run, name=name)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, coro):
+        """
+        从任意线程提交协程
+
+        Returns:
+            concurrent.futures.Future，调用其cancel()即可取消对应任务
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._forget)
+        return future
+
+    def run(self, coro, timeout=None):
+        """
+        提交协程并阻塞等待结果，供同步代码调用
+        """
+        return self.submit(coro).result(timeout)
+
+    def cancel_all(self):
+        """
+        取消所有尚未完成的任务
+
+        Returns:
+            被取消的任务数
+        """
+        with self._lock:
+            futures = list(self._futures)
+        return sum(1 for future in futures if future.cancel())
+
+    def pending(self):
+        """
+        当前未完成的任务数
+        """
+        with self._lock:
+            return len(self._futures)
+
+    def stop(self):
+        """
+        取消全部任务并停止事件循环
+        """
+        self.cancel_all()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=1)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+        # 停止后让已取消的任务执行完清理代码，避免任务在未结束时被销毁
+        tasks = asyncio.all_tasks(self.loop)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+
+    def _forget(self, future):
+        with self._lock:
+            self._futures.discard(future)
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SpaceTrans批量翻译命令
+
+复用键盘翻译所用的TranslationEngine，对txt、Markdown、SRT字幕文件或包含这些文件的目录
+进行无界面的批量翻译。文件按片段流式读取、并发翻译、按顺序写出，
+进度保存在输出文件旁的检查点中，中断后再次运行会从断点继续。
+
+用法:
+    python batch.py 输入文件或目录 [...] [-o 输出目录] [--target auto|en|zh-Hans] [--workers 4]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from config_manager import load_config
+from rate_limiter import BATCH, request_priority
+from segmenter import segment_text
+from translation_engine import TARGET_LANGUAGES, TranslationEngine
+
+SUPPORTED_EXTENSIONS = (".txt", ".md", ".markdown", ".srt")
+
+# 检查点最少间隔多久写一次（秒）
+CHECKPOINT_INTERVAL = 1.0
+
+# 进度输出间隔（秒）
+PROGRESS_INTERVAL = 2.0
+
+
+def iter_text_units(lines, max_chars, markdown=False):
+    """
+    把纯文本或Markdown按段落切分成翻译单元
+
+    Args:
+        lines: 文件的行迭代器（保留行尾换行符）
+        max_chars: 单个单元的最大字符数
+        markdown: 是否按Markdown处理（代码块原样保留）
+
+    Yields:
+        (文本, 是否需要翻译)，所有单元按顺序拼接后与原文完全相同
+    """
+    block = []
+    block_len = 0
+    fence = None
+
+    for line in lines:
+        stripped = line.strip()
+
+        if markdown and fence is not None:
+            # 代码块内部原样输出，直到遇到对应的结束标记
+            yield line, False
+            if stripped.startswith(fence):
+                fence = None
+            continue
+
+        if markdown and (stripped.startswith("```") or stripped.startswith("~~~")):
+            if block:
+                yield "".join(block), True
+                block, block_len = [], 0
+            fence = stripped[:3]
+            yield line, False
+            continue
+
+        if not stripped:
+            if block:
+                yield "".join(block), True
+                block, block_len = [], 0
+            yield line, False
+            continue
+
+        if block and block_len + len(line) > max_chars:
+            yield "".join(block), True
+            block, block_len = [], 0
+        block.append(line)
+        block_len += len(line)
+
+    if block:
+        yield "".join(block), True
+
+
+def iter_srt_units(lines):
+    """
+    把SRT字幕切分成翻译单元，序号和时间轴原样保留，只翻译字幕文本
+
+    Yields:
+        (文本, 是否需要翻译)
+    """
+    block = []
+
+    def flush():
+        # 前两行是序号和时间轴，其余是字幕文本
+        if len(block) >= 2 and "-->" in block[1]:
+            yield "".join(block[:2]), False
+            if block[2:]:
+                yield "".join(block[2:]), True
+        else:
+            yield "".join(block), False
+
+    for line in lines:
+        if line.strip():
+            block.append(line)
+            continue
+        if block:
+            yield from flush()
+            block = []
+        yield line, False
+
+    if block:
+        yield from flush()
+
+
+def iter_units(path, max_chars):
+    """
+    按文件类型选择切分方式，逐个返回翻译单元
+    """
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if extension == ".srt":
+            yield from iter_srt_units(f)
+        else:
+            yield from iter_text_units(f, max_chars, markdown=extension in (".md", ".markdown"))
+
+
+def collect_files(inputs, output_dir, suffix):
+    """
+    展开输入的文件和目录，确定每个文件的输出路径
+
+    Returns:
+        [(输入路径, 输出路径)]
+    """
+    jobs = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, dirs, files in os.walk(item):
+                dirs.sort()
+                for name in sorted(files):
+                    if not name.lower().endswith(SUPPORTED_EXTENSIONS):
+                        continue
+                    if suffix and os.path.splitext(name)[0].endswith(suffix):
+                        continue
+                    src = os.path.join(root, name)
+                    relative = os.path.relpath(src, item)
+                    jobs.append((src, output_path(src, relative, output_dir, suffix)))
+        elif os.path.isfile(item):
+            jobs.append((item, output_path(item, os.path.basename(item), output_dir, suffix)))
+        else:
+            print(f"找不到输入: {item}")
+    return jobs
+
+
+def output_path(src, relative, output_dir, suffix):
+    if output_dir:
+        return os.path.join(output_dir, relative)
+    base, extension = os.path.splitext(src)
+    return f"{base}{suffix}{extension}"
+
+
+class BatchStats:
+    """
+    批量翻译的吞吐统计
+    """
+    def __init__(self, engine):
+        self.engine = engine
+        self.start_time = time.time()
+        self.segments = 0
+        self.characters = 0
+        self._lock = threading.Lock()
+        self._start_usage = engine.usage()
+        self._last_report = self.start_time
+
+    def add(self, text):
+        with self._lock:
+            self.segments += 1
+            self.characters += len(text)
+
+    def report(self, force=False):
+        """
+        打印当前吞吐量，未到输出间隔时不打印
+        """
+        now = time.time()
+        if not force and now - self._last_report < PROGRESS_INTERVAL:
+            return
+        self._last_report = now
+        elapsed = max(now - self.start_time, 1e-6)
+        usage = self.engine.usage()
+        tokens = (usage["prompt_tokens"] - self._start_usage["prompt_tokens"]
+                  + usage["completion_tokens"] - self._start_usage["completion_tokens"])
+        print(
+            f"已翻译 {self.segments} 个片段，{self.characters} 字符，用时 {elapsed:.1f}秒 | "
+            f"{self.segments / elapsed:.2f} 片段/秒，{tokens / elapsed:.1f} tokens/秒"
+        )
+
+
+class BatchTranslator:
+    """
+    批量翻译器 - 流式读取文件，有界并发翻译，按顺序写出并记录检查点
+    """
+    def __init__(self, engine, target="auto", workers=4):
+        """
+        Args:
+            engine: TranslationEngine实例
+            target: 目标语言代码，auto表示按每个文件的内容自动判断
+            workers: 并发翻译的片段数
+        """
+        self.engine = engine
+        self.target = target
+        self.workers = workers
+        self.max_chars = engine.config["CHUNK_MAX_CHARS"]
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch")
+        self.stats = BatchStats(engine)
+
+    def translate_unit(self, text, target_lang):
+        """
+        翻译一个单元，首尾空白原样保留
+
+        Raises:
+            APIError: API服务返回错误
+        """
+        parts = []
+        for segment, translatable in segment_text(text, self.max_chars):
+            parts.append(self.engine.translate_segment(segment, target_lang) if translatable else segment)
+        return "".join(parts)
+
+    def translate_file(self, src, dst):
+        """
+        翻译单个文件，支持从检查点继续
+        """
+        checkpoint_path = dst + ".progress.json"
+        source_stat = os.stat(src)
+        state = self._load_checkpoint(checkpoint_path, src, source_stat)
+        skip = state["units"] if state else 0
+        target_lang = state["target"] if state else (None if self.target == "auto" else self.target)
+
+        os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+        if state:
+            print(f"从检查点继续: {src}（已完成 {skip} 个单元）")
+            out = open(dst, "r+b")
+            out.seek(state["offset"])
+            out.truncate()
+        else:
+            out = open(dst, "wb")
+
+        # 同时在途的单元数有上限，内存占用与文件大小无关
+        window = self.workers * 4
+        pending = deque()
+        written = skip
+        last_checkpoint = time.time()
+
+        def write_ready(limit):
+            # 按顺序写出已完成的单元，在途单元超过limit时阻塞等待最早的一个
+            nonlocal written, last_checkpoint
+            while pending and (pending[0].done() or len(pending) > limit):
+                future = pending.popleft()
+                out.write(future.result().encode("utf-8"))
+                written += 1
+                if time.time() - last_checkpoint >= CHECKPOINT_INTERVAL:
+                    out.flush()
+                    self._save_checkpoint(checkpoint_path, src, source_stat, target_lang, written, out.tell())
+                    last_checkpoint = time.time()
+                self.stats.report()
+
+        try:
+            for index, (text, translatable) in enumerate(iter_units(src, self.max_chars)):
+                if index < skip:
+                    continue
+                if translatable and target_lang is None:
+                    target_lang = self.engine.detect_target_language(text)[0]
+                    print(f"{src} 将翻译为 {TARGET_LANGUAGES[target_lang]}")
+
+                if translatable:
+                    future = self.executor.submit(self._translate_and_count, text, target_lang)
+                else:
+                    future = Future()
+                    future.set_result(text)
+                pending.append(future)
+                write_ready(window)
+
+            write_ready(0)
+        except BaseException:
+            # 出错或被中断时保存已按顺序写出的进度，下次运行从这里继续
+            for future in pending:
+                future.cancel()
+            out.flush()
+            self._save_checkpoint(checkpoint_path, src, source_stat, target_lang, written, out.tell())
+            out.close()
+            raise
+
+        out.close()
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        print(f"翻译完成: {src} -> {dst}")
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _translate_and_count(self, text, target_lang):
+        # 与键盘触发的翻译共用配额时，批量请求排在后面
+        with request_priority(BATCH):
+            result = self.translate_unit(text, target_lang)
+        self.stats.add(text)
+        return result
+
+    def _load_checkpoint(self, path, src, source_stat):
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except Exception as e:
+            print(f"读取检查点出错，将重新翻译: {e}")
+            return None
+        # 原文件发生变化或目标语言不同时不能继续
+        if (state.get("size") != source_stat.st_size or state.get("mtime") != source_stat.st_mtime
+                or (self.target != "auto" and state.get("target") != self.target)):
+            print(f"{src} 已修改，忽略旧的检查点")
+            return None
+        return state
+
+    def _save_checkpoint(self, path, src, source_stat, target_lang, units, offset):
+        state = {
+            "source": os.path.abspath(src),
+            "size": source_stat.st_size,
+            "mtime": source_stat.st_mtime,
+            "target": target_lang,
+            "units": units,
+            "offset": offset
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+def main(argv=None):
+    """
+    批量翻译命令入口
+    """
+    parser = argparse.ArgumentParser(description="SpaceTrans批量翻译txt、Markdown和SRT字幕文件")
+    parser.add_argument("inputs", nargs="+", help="要翻译的文件或目录")
+    parser.add_argument("-o", "--output-dir", help="输出目录，默认写在原文件旁")
+    parser.add_argument("--suffix", default=".translated",
+                        help="未指定输出目录时添加在文件名后的后缀 (默认: .translated)")
+    parser.add_argument("--target", default="auto", choices=["auto"] + list(TARGET_LANGUAGES),
+                        help="目标语言，auto表示中文译为英文、其他译为简体中文")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="并发翻译的片段数 (默认使用配置中的CHUNK_WORKERS)")
+    args = parser.parse_args(argv)
+
+    config = load_config()
+    if not config["API_KEY"] and config["ENGINE"] != "local":
+        print("错误：请先设置API_KEY")
+        return 1
+
+    jobs = collect_files(args.inputs, args.output_dir, args.suffix)
+    if not jobs:
+        print("没有找到可翻译的文件")
+        return 1
+
+    engine = TranslationEngine(config)
+    translator = BatchTranslator(engine, target=args.target, workers=args.workers or config["CHUNK_WORKERS"])
+    failed = 0
+    try:
+        for src, dst in jobs:
+            try:
+                translator.translate_file(src, dst)
+            except KeyboardInterrupt:
+                print("\n已中断，再次运行相同命令即可从检查点继续")
+                return 130
+            except Exception as e:
+                failed += 1
+                print(f"翻译 {src} 出错: {e}（再次运行可从检查点继续）")
+    finally:
+        translator.stats.report(force=True)
+        translator.close()
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SpaceTrans端到端性能测试
+
+用模拟的键盘、剪贴板和输入框驱动SpaceTranslator.translate_selected_text，
+API请求发往本地模拟服务（见mock_server.py），不需要图形界面和网络。
+按选区大小分别统计各阶段耗时的p50/p95/p99和吞吐量。
+
+用法:
+    python benchmark.py [--sizes 50,500,3000] [--runs 30] [--latency 0.3] [--token-rate 200]
+                        [--stream] [--speculative] [--json 结果文件]
+"""
+
+import argparse
+import functools
+import io
+import json
+import random
+import sys
+import threading
+import time
+import unicodedata
+from contextlib import redirect_stdout
+
+import clipboard_monitor
+import main as app
+from config_manager import DEFAULT_CONFIG
+from input_backend import FakeInputBackend
+from mock_server import MockOpenAIServer
+
+# 生成测试文本用的句子
+SAMPLE_SENTENCES = [
+    "The quick brown fox jumps over the lazy dog.",
+    "Latency matters more than throughput for interactive tools.",
+    "Please review the attached document before the meeting on Monday.",
+    "We measured the response time of every stage separately.",
+    "Caching identical requests avoids paying for the same translation twice.",
+    "Small changes in the hot path can add up to noticeable delays.",
+    "Our users expect the replacement to appear almost instantly.",
+    "Network conditions vary a lot between home and office connections."
+]
+
+# 统计的阶段，按流程顺序输出
+STAGES = ["获取选中文本", "语言识别", "翻译", "粘贴", "首次粘贴", "总计"]
+
+
+class FakeClipboard:
+    """
+    模拟剪贴板，提供与pyperclip相同的copy/paste接口和一个变化序列号
+    """
+    def __init__(self):
+        self._text = ""
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def copy(self, text):
+        with self._lock:
+            self._text = text
+            self._sequence += 1
+
+    def paste(self):
+        with self._lock:
+            return self._text
+
+    def sequence(self):
+        with self._lock:
+            return self._sequence
+
+
+class FakeTextField:
+    """
+    模拟输入框，记录文本和选区
+    """
+    def __init__(self):
+        self.text = ""
+        self.start = 0
+        self.end = 0
+        self._lock = threading.Lock()
+
+    def set(self, text):
+        with self._lock:
+            self.text = text
+            self.start = self.end = len(text)
+
+    def select_all(self):
+        with self._lock:
+            self.start, self.end = 0, len(self.text)
+
+    def selected(self):
+        with self._lock:
+            return self.text[self.start:self.end]
+
+    def insert(self, text):
+        # 替换选区，光标移到插入内容之后
+        with self._lock:
+            self.text = self.text[:self.start] + text + self.text[self.end:]
+            self.start = self.end = self.start + len(text)
+
+
+class FakeApplication:
+    """
+    模拟目标应用对快捷键的响应，快捷键作用在模拟输入框上
+    """
+    def __init__(self, clipboard, field, app_delay=0.0):
+        """
+        Args:
+            app_delay: 模拟目标应用处理复制快捷键的耗时（秒）
+        """
+        self.clipboard = clipboard
+        self.field = field
+        self.app_delay = app_delay
+
+    def on_shortcut(self, combo):
+        key = combo.split("+")[-1]
+        if key == "a":
+            self.field.select_all()
+        elif key == "c":
+            copy = lambda: self.clipboard.copy(self.field.selected())
+            if self.app_delay:
+                threading.Timer(self.app_delay, copy).start()
+            else:
+                copy()
+        elif key == "v":
+            self.field.insert(self.clipboard.paste())
+
+
+class StageTimer:
+    """
+    记录每一轮中各阶段的耗时
+    """
+    def __init__(self):
+        self.samples = {stage: [] for stage in STAGES}
+        self.run_start = None
+        self._first_paste_recorded = False
+
+    def begin_run(self):
+        self.run_start = time.perf_counter()
+        self._first_paste_recorded = False
+
+    def add(self, stage, seconds):
+        self.samples[stage].append(seconds)
+
+    def wrap(self, stage, func):
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+        return timed
+
+    def wrap_async(self, stage, func):
+        @functools.wraps(func)
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+        return timed
+
+    def wrap_first_paste(self, func):
+        # 从触发到第一次粘贴的时间，流式模式下就是用户看到第一段译文的时间
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            if not self._first_paste_recorded:
+                self._first_paste_recorded = True
+                self.add("首次粘贴", time.perf_counter() - self.run_start)
+            return func(*args, **kwargs)
+        return timed
+
+    def reset(self):
+        self.samples = {stage: [] for stage in STAGES}
+
+
+def pad(text, width):
+    # 按显示宽度补齐，中文字符占两列
+    display = sum(2 if unicodedata.east_asian_width(c) in "WF" else 1 for c in text)
+    return text + " " * max(width - display, 0)
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+def make_text(size, seed):
+    """
+    生成约size个字符的英文测试文本，每5句分一段
+    """
+    rng = random.Random(seed)
+    parts = [f"Run {seed}."]
+    length = len(parts[0])
+    count = 0
+    while length < size:
+        sentence = rng.choice(SAMPLE_SENTENCES)
+        count += 1
+        separator = "\n\n" if count % 5 == 0 else " "
+        parts.append(separator + sentence)
+        length += len(separator) + len(sentence)
+    return "".join(parts)[:size].rstrip()
+
+
+def build_translator(config, clipboard, application):
+    """
+    用模拟的输入和剪贴板后端创建SpaceTranslator，并为各阶段加上计时
+    """
+    app.pyperclip = clipboard
+    app.get_foreground_app = lambda: "benchmark"
+    clipboard_monitor.pyperclip = clipboard
+    app._config = config
+
+    translator = app.SpaceTranslator(FakeInputBackend(on_synthesize=application.on_shortcut))
+    translator.clipboard_monitor = clipboard_monitor.ClipboardMonitor(
+        poll_interval=config["CLIPBOARD_POLL_INTERVAL"],
+        deadline=config["CLIPBOARD_TIMEOUT"],
+        stats_path=None,
+        sequence_reader=clipboard.sequence
+    )
+
+    timer = StageTimer()
+    translator.capture_selection = timer.wrap("获取选中文本", translator.capture_selection)
+    translator.replace_selected_text = timer.wrap("粘贴", translator.replace_selected_text)
+    translator.paste_text = timer.wrap_first_paste(translator.paste_text)
+    translator.stream_translate_and_paste = timer.wrap("翻译", translator.stream_translate_and_paste)
+    engine = translator.engine
+    engine.detect_target_language = timer.wrap("语言识别", engine.detect_target_language)
+    engine.translate_async = timer.wrap_async("翻译", engine.translate_async)
+    return translator, timer
+
+
+def run_size(translator, timer, field, size, runs, warmup, speculative=False):
+    """
+    对一种选区大小重复测试。speculative为True时先在倒数第二次按键的时刻做预判，
+    计时从最后一次按键开始
+
+    Returns:
+        (各阶段耗时样本, 译文与预期不符的次数)
+    """
+    mismatches = 0
+    for index in range(warmup + runs):
+        if index == warmup:
+            timer.reset()
+        text = make_text(size, seed=index)
+        field.set(text + " " * translator.SPACE_TRIGGER_COUNT)
+
+        speculation = None
+        if speculative:
+            speculation = translator.core.submit(translator.prepare_capture())
+            # 两次按键之间的典型间隔
+            time.sleep(0.1)
+
+        timer.begin_run()
+        with redirect_stdout(io.StringIO()):
+            translator.translate_selected_text(speculation)
+        timer.add("总计", time.perf_counter() - timer.run_start)
+
+        # 模拟服务原样返回原文，替换后的输入框应与原文完全相同
+        if index >= warmup and field.text != text:
+            mismatches += 1
+    return timer.samples, mismatches
+
+
+def report(size, runs, samples, mismatches):
+    """
+    打印一种选区大小的结果
+
+    Returns:
+        可写入JSON的结果字典
+    """
+    result = {"size": size, "runs": runs, "mismatches": mismatches, "stages": {}}
+    print(f"\n选区 {size} 字符，{runs} 次")
+    print(f"{pad('阶段', 14)}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}")
+    for stage in STAGES:
+        values = samples[stage]
+        if not values:
+            continue
+        p50, p95, p99 = (percentile(values, q) * 1000 for q in (0.5, 0.95, 0.99))
+        result["stages"][stage] = {"p50": p50, "p95": p95, "p99": p99, "samples": len(values)}
+        print(f"{pad(stage, 14)}{p50:>10.1f}{p95:>10.1f}{p99:>10.1f}")
+
+    total = sum(samples["总计"])
+    result["chars_per_second"] = size * runs / total if total else 0.0
+    result["translations_per_second"] = runs / total if total else 0.0
+    print(f"吞吐: {result['chars_per_second']:.0f} 字符/秒，{result['translations_per_second']:.2f} 次/秒")
+    if mismatches:
+        print(f"警告: {mismatches} 次替换结果与原文不一致")
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SpaceTrans端到端性能测试（本地模拟服务，无需网络）")
+    parser.add_argument("--sizes", default="50,500,3000", help="选区字符数，逗号分隔 (默认: 50,500,3000)")
+    parser.add_argument("--runs", type=int, default=30, help="每种大小的测试次数 (默认: 30)")
+    parser.add_argument("--warmup", type=int, default=2, help="每种大小开始前不计入统计的次数 (默认: 2)")
+    parser.add_argument("--latency", type=float, default=0.3, help="模拟服务的首字延迟（秒）(默认: 0.3)")
+    parser.add_argument("--token-rate", type=float, default=200, help="模拟服务每秒输出的token数 (默认: 200)")
+    parser.add_argument("--jitter", type=float, default=0.1, help="首字延迟的随机波动比例 (默认: 0.1)")
+    parser.add_argument("--app-delay", type=float, default=0.002, help="模拟应用响应复制快捷键的耗时（秒）(默认: 0.002)")
+    parser.add_argument("--stream", action="store_true", help="开启流式翻译")
+    parser.add_argument("--speculative", action="store_true", help="模拟开启SPECULATIVE_ENABLED后的触发流程")
+    parser.add_argument("--json", help="把结果写入JSON文件，便于对比不同版本")
+    args = parser.parse_args(argv)
+
+    server = MockOpenAIServer(latency=args.latency, token_rate=args.token_rate, jitter=args.jitter).start()
+    config = dict(
+        DEFAULT_CONFIG,
+        API_KEY="benchmark",
+        API_HOST=server.url,
+        STREAM=args.stream,
+        CACHE_ENABLED=False,
+        PROVIDERS=[],
+        # 不写入~/.spacetrans下的耗时记录，也不占用指标端口
+        TELEMETRY_ENABLED=False,
+        METRICS_PORT=0
+    )
+
+    clipboard = FakeClipboard()
+    field = FakeTextField()
+    with redirect_stdout(io.StringIO()):
+        translator, timer = build_translator(config, clipboard, FakeApplication(clipboard, field, args.app_delay))
+
+    print(f"模拟服务: {server.url}，首字延迟 {args.latency}秒，{args.token_rate} tokens/秒，"
+          f"{'流式' if args.stream else '非流式'}")
+    results = []
+    failed = False
+    try:
+        for size in (int(s) for s in args.sizes.split(",")):
+            samples, mismatches = run_size(
+                translator, timer, field, size, args.runs, args.warmup, args.speculative
+            )
+            results.append(report(size, args.runs, samples, mismatches))
+            failed = failed or mismatches > 0
+    finally:
+        translator.core.stop()
+        server.stop()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入 {args.json}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
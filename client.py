@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SpaceTrans命令行客户端
+
+通过Unix套接字把文本交给常驻的翻译服务（python daemon.py），
+翻译引擎、连接池和语言识别模型都已在服务中预热，本客户端只导入标准库，启动后几毫秒即可返回。
+
+协议：每个请求和响应都是一行JSON，同一连接上可以依次发送多个请求。
+    {"id": 1, "method": "translate", "text": "...", "target": "auto"}
+    {"id": 2, "method": "translate_batch", "texts": ["...", "..."], "target": "auto"}
+    {"id": 3, "method": "stats"}
+响应为 {"id": 1, "ok": true, "result": ...} 或 {"id": 1, "ok": false, "error": "..."}
+
+用法:
+    python client.py "要翻译的文本" [--target auto|en|zh-Hans]
+    echo "要翻译的文本" | python client.py
+    python client.py --batch < 每行一段.txt
+    python client.py --stats
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+
+# 翻译服务的套接字路径
+DAEMON_SOCKET = os.path.join(os.path.expanduser("~/.spacetrans"), "daemon.sock")
+
+
+class DaemonError(Exception):
+    """
+    翻译服务不可用或返回错误
+    """
+
+
+class DaemonClient:
+    """
+    翻译服务客户端，同一个连接可以发送多个请求
+    """
+    def __init__(self, path=DAEMON_SOCKET, timeout=120):
+        """
+        Args:
+            path: 套接字路径
+            timeout: 等待响应的超时时间（秒）
+        """
+        self.path = path
+        self.timeout = timeout
+        self._socket = None
+        self._reader = None
+        self._next_id = 0
+
+    def connect(self):
+        if self._socket is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.path)
+            except OSError as e:
+                sock.close()
+                raise DaemonError(f"无法连接翻译服务（{self.path}），请先运行 python daemon.py: {e}") from None
+            self._socket = sock
+            self._reader = sock.makefile("rb")
+        return self
+
+    def close(self):
+        if self._socket is not None:
+            self._reader.close()
+            self._socket.close()
+            self._socket = None
+
+    def __enter__(self):
+        return self.connect()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def call(self, method, **params):
+        """
+        发送一个请求并等待响应
+
+        Returns:
+            响应中的result
+
+        Raises:
+            DaemonError: 连接失败或服务返回错误
+        """
+        self.connect()
+        self._next_id += 1
+        request = dict(params, id=self._next_id, method=method)
+        try:
+            self._socket.sendall(json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n")
+            line = self._reader.readline()
+        except OSError as e:
+            self.close()
+            raise DaemonError(f"与翻译服务通信失败: {e}") from None
+        if not line:
+            self.close()
+            raise DaemonError("翻译服务关闭了连接")
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise DaemonError(response.get("error", "未知错误"))
+        return response["result"]
+
+    def translate(self, text, target="auto"):
+        """
+        Returns:
+            {"text": 译文, "target": 目标语言}
+        """
+        return self.call("translate", text=text, target=target)
+
+    def translate_batch(self, texts, target="auto"):
+        """
+        一次请求翻译多段文本，服务端并发翻译
+
+        Returns:
+            与texts一一对应的列表，每项为{"text": 译文, "target": 目标语言}或{"error": 错误信息}
+        """
+        return self.call("translate_batch", texts=texts, target=target)
+
+    def stats(self):
+        return self.call("stats")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="通过常驻的翻译服务翻译文本")
+    parser.add_argument("text", nargs="*", help="要翻译的文本，省略时从标准输入读取")
+    parser.add_argument("--target", default="auto", choices=["auto", "en", "zh-Hans"],
+                        help="目标语言，auto表示中文译为英文、其他译为简体中文")
+    parser.add_argument("--batch", action="store_true", help="标准输入的每个非空行作为一段文本批量翻译")
+    parser.add_argument("--stats", action="store_true", help="显示服务的统计信息")
+    parser.add_argument("--socket", default=DAEMON_SOCKET, help=f"套接字路径 (默认: {DAEMON_SOCKET})")
+    args = parser.parse_args(argv)
+
+    try:
+        with DaemonClient(args.socket) as client:
+            if args.stats:
+                print(json.dumps(client.stats(), ensure_ascii=False, indent=2))
+            elif args.batch:
+                texts = [line.rstrip("\n") for line in sys.stdin if line.strip()]
+                failed = 0
+                for item in client.translate_batch(texts, args.target):
+                    if "error" in item:
+                        failed += 1
+                        print(f"翻译失败: {item['error']}", file=sys.stderr)
+                        print()
+                    else:
+                        print(item["text"])
+                return 1 if failed else 0
+            else:
+                text = " ".join(args.text) if args.text else sys.stdin.read().rstrip("\n")
+                print(client.translate(text, args.target)["text"])
+    except DaemonError as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SpaceTrans剪贴板监测模块
+
+用剪贴板变化检测代替固定的time.sleep等待：模拟复制后以很短的间隔轮询，
+剪贴板一变化立即返回，并按应用记录剪贴板就绪耗时，用来估算粘贴后需要等待多久。
+"""
+
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+from collections import deque
+
+from config_manager import CONFIG_DIR
+from lazy_import import lazy_import
+
+pyperclip = lazy_import("pyperclip")
+# pynput在X11上依赖python-xlib，Linux上用它查询前台窗口
+xdisplay = lazy_import("Xlib.display")
+
+# 每个应用的就绪耗时统计保存位置
+SETTLE_STATS_FILE = os.path.join(CONFIG_DIR, "clipboard_stats.json")
+
+# 每个应用保留的最近样本数
+SAMPLE_WINDOW = 20
+
+# 没有统计数据时粘贴后的等待时间（秒），与原先的固定等待一致
+DEFAULT_PASTE_WAIT = 0.1
+
+# 粘贴后的最短等待时间（秒）
+MIN_PASTE_WAIT = 0.02
+
+
+def _load_sequence_reader():
+    """
+    返回读取剪贴板序列号的函数，当前平台不支持时返回None
+    """
+    system = platform.system()
+    if system == "Windows":
+        try:
+            import ctypes
+            user32 = ctypes.windll.user32
+            return lambda: user32.GetClipboardSequenceNumber()
+        except Exception:
+            return None
+    if system == "Darwin":
+        try:
+            from AppKit import NSPasteboard
+            pasteboard = NSPasteboard.generalPasteboard()
+            return lambda: pasteboard.changeCount()
+        except Exception:
+            return None
+    return None
+
+
+class X11ActiveWindow:
+    """
+    通过常驻的X连接读取活动窗口的WM_CLASS，每次查询只是一次本地往返，
+    不需要像xprop那样每次启动两个子进程
+    """
+    def __init__(self):
+        self._display = None
+        self._active_atom = None
+        self._lock = threading.Lock()
+
+    def app_name(self):
+        """
+        Returns:
+            活动窗口的应用名称，没有活动窗口时返回"unknown"
+
+        Raises:
+            ImportError: 未安装python-xlib
+        """
+        with self._lock:
+            try:
+                if self._display is None:
+                    self._display = xdisplay.Display()
+                    self._active_atom = self._display.intern_atom("_NET_ACTIVE_WINDOW")
+                root = self._display.screen().root
+                # 0即X.AnyPropertyType
+                active = root.get_full_property(self._active_atom, 0)
+                if not active or not active.value or not active.value[0]:
+                    return "unknown"
+                window = self._display.create_resource_object("window", active.value[0])
+                wm_class = window.get_wm_class()
+            except ImportError:
+                raise
+            except Exception:
+                # 窗口已关闭或连接断开，下次重新连接
+                self._close()
+                return "unknown"
+        return wm_class[-1] if wm_class else "unknown"
+
+    def _close(self):
+        if self._display is not None:
+            try:
+                self._display.close()
+            except Exception:
+                pass
+        self._display = None
+
+
+_x11_window = X11ActiveWindow()
+_xlib_available = True
+
+
+def _xprop_foreground_app():
+    # 未安装python-xlib时的后备方式，每次启动两个xprop子进程
+    window = subprocess.run(
+        ["xprop", "-root", "_NET_ACTIVE_WINDOW"],
+        capture_output=True, text=True, timeout=0.2
+    ).stdout.strip().split()[-1]
+    wm_class = subprocess.run(
+        ["xprop", "-id", window, "WM_CLASS"],
+        capture_output=True, text=True, timeout=0.2
+    ).stdout
+    return wm_class.split("=")[-1].split(",")[-1].strip().strip('"') or "unknown"
+
+
+def get_foreground_app():
+    """
+    获取当前前台应用的名称，用于按应用区分统计，获取失败时返回"unknown"
+    """
+    system = platform.system()
+    try:
+        if system == "Darwin":
+            from AppKit import NSWorkspace
+            app = NSWorkspace.sharedWorkspace().frontmostApplication()
+            return str(app.localizedName())
+        if system == "Windows":
+            import ctypes
+            from ctypes import wintypes
+            user32 = ctypes.windll.user32
+            kernel32 = ctypes.windll.kernel32
+            hwnd = user32.GetForegroundWindow()
+            pid = wintypes.DWORD()
+            user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+            # PROCESS_QUERY_LIMITED_INFORMATION
+            handle = kernel32.OpenProcess(0x1000, False, pid.value)
+            if not handle:
+                return "unknown"
+            try:
+                size = wintypes.DWORD(260)
+                buffer = ctypes.create_unicode_buffer(size.value)
+                if kernel32.QueryFullProcessImageNameW(handle, 0, buffer, ctypes.byref(size)):
+                    return os.path.basename(buffer.value)
+            finally:
+                kernel32.CloseHandle(handle)
+            return "unknown"
+        # Linux/X11：读取活动窗口的WM_CLASS
+        global _xlib_available
+        if not os.environ.get("DISPLAY"):
+            return "unknown"
+        if _xlib_available:
+            try:
+                return _x11_window.app_name()
+            except ImportError:
+                _xlib_available = False
+        return _xprop_foreground_app()
+    except Exception:
+        return "unknown"
+
+
+class ClipboardMonitor:
+    """
+    剪贴板监测器 - 等待剪贴板真正变化，并学习每个应用的响应速度
+    """
+    def __init__(self, poll_interval=0.005, deadline=1.0, stats_path=SETTLE_STATS_FILE, sequence_reader=None):
+        """
+        Args:
+            poll_interval: 轮询剪贴板的间隔（秒）
+            deadline: 等待剪贴板变化的最长时间（秒）
+            stats_path: 就绪耗时统计的保存路径，为None时不保存
+            sequence_reader: 读取剪贴板序列号的函数，默认按平台自动选择
+        """
+        self.poll_interval = poll_interval
+        self.deadline = deadline
+        self.stats_path = stats_path
+
+        # 序列号读取函数在第一次复制时才初始化（macOS上需要导入AppKit）
+        self._read_sequence = sequence_reader
+        self._sequence_loaded = sequence_reader is not None
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._dirty = False
+        self._load()
+
+    def copy_selection(self, send_copy, app="unknown"):
+        """
+        触发复制并等待剪贴板更新
+
+        Args:
+            send_copy: 发送复制快捷键的函数
+            app: 前台应用名称
+
+        Returns:
+            复制到的文本，超时未变化时返回None
+        """
+        self.sequence()
+        start_time = time.perf_counter()
+        if self._read_sequence is not None:
+            before = self._read_sequence()
+            changed = lambda: self._read_sequence() != before
+        else:
+            # 不支持序列号的平台先清空剪贴板，出现内容即说明复制已完成
+            pyperclip.copy("")
+            changed = lambda: pyperclip.paste() != ""
+
+        send_copy()
+
+        while True:
+            if changed():
+                self.record(app, time.perf_counter() - start_time)
+                return pyperclip.paste()
+            if time.perf_counter() - start_time >= self.deadline:
+                print(f"等待剪贴板更新超时 ({app})")
+                return None
+            time.sleep(self.poll_interval)
+
+    def sequence(self):
+        """
+        当前剪贴板的变化序列号，用于判断剪贴板是否被改动过；当前平台不支持时返回None
+        """
+        if not self._sequence_loaded:
+            self._read_sequence = _load_sequence_reader()
+            self._sequence_loaded = True
+        if self._read_sequence is None:
+            return None
+        return self._read_sequence()
+
+    def paste_wait(self, app="unknown"):
+        """
+        估算粘贴后应等待的时间：目标应用读取剪贴板之前不能覆盖或恢复剪贴板
+
+        Returns:
+            等待时间（秒）
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(app, ()))
+        if not samples:
+            return DEFAULT_PASTE_WAIT
+        p90 = samples[min(int(len(samples) * 0.9), len(samples) - 1)]
+        return min(max(MIN_PASTE_WAIT, p90 * 2), self.deadline)
+
+    def record(self, app, settle_time):
+        """
+        记录一次剪贴板就绪耗时
+        """
+        with self._lock:
+            if app not in self._samples:
+                self._samples[app] = deque(maxlen=SAMPLE_WINDOW)
+            self._samples[app].append(settle_time)
+            self._dirty = True
+
+    def stats(self):
+        """
+        获取每个应用的就绪耗时统计
+
+        Returns:
+            {应用名: {"samples": 样本数, "median": 中位数, "max": 最大值}}
+        """
+        with self._lock:
+            result = {}
+            for app, samples in self._samples.items():
+                ordered = sorted(samples)
+                result[app] = {
+                    "samples": len(ordered),
+                    "median": ordered[len(ordered) // 2],
+                    "max": ordered[-1]
+                }
+            return result
+
+    def save(self):
+        """
+        保存统计数据，没有新样本时不写文件
+        """
+        if not self.stats_path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {app: list(samples) for app, samples in self._samples.items()}
+            self._dirty = False
+        try:
+            with open(self.stats_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+        except Exception as e:
+            print(f"保存剪贴板统计出错: {e}")
+
+    def _load(self):
+        if not self.stats_path or not os.path.exists(self.stats_path):
+            return
+        try:
+            with open(self.stats_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for app, samples in data.items():
+                self._samples[app] = deque(samples, maxlen=SAMPLE_WINDOW)
+        except Exception as e:
+            print(f"加载剪贴板统计出错: {e}")
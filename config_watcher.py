@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SpaceTrans配置监视模块
+
+在后台线程中定期检查配置文件的修改时间，文件变化后重新读取并校验，
+校验通过才把新配置交给回调，有误时继续使用当前配置。
+翻译过程只读取内存中的配置，不会重复读取配置文件。
+"""
+
+import os
+import threading
+
+from config_manager import CONFIG_FILE, read_config, validate_config
+
+
+class ConfigWatcher:
+    """
+    配置文件监视器
+    """
+    def __init__(self, on_change, path=CONFIG_FILE, interval=1.0):
+        """
+        Args:
+            on_change: 配置变化且校验通过时调用 on_change(新配置)
+            path: 配置文件路径
+            interval: 检查间隔（秒）
+        """
+        self.on_change = on_change
+        self.path = path
+        self.interval = interval
+        self.reloads = 0
+        # 最近一次检查失败的原因，成功或没有变化时为None
+        self.last_error = None
+        self._signature = self._stat()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def _stat(self):
+        # 同一秒内的两次保存在部分文件系统上修改时间相同，文件大小一起比较
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def start(self):
+        if self._thread is None and self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name="config-watcher")
+            self._thread.daemon = True
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+
+    def check(self, force=False):
+        """
+        立即检查一次配置文件
+
+        Args:
+            force: 为True时不比较修改时间，直接重新读取
+
+        Returns:
+            是否应用了新配置，失败的原因见last_error
+        """
+        with self._lock:
+            signature = self._stat()
+            if signature is None and force:
+                self.last_error = f"找不到配置文件: {self.path}"
+                return False
+            if signature is None or (signature == self._signature and not force):
+                self.last_error = None
+                return False
+            self._signature = signature
+
+            try:
+                config = read_config(self.path)
+            except (OSError, ValueError) as e:
+                # 编辑器保存到一半时可能读到不完整的文件，下次修改后会再次检查
+                return self._fail(f"读取配置文件出错: {e}")
+            errors = validate_config(config)
+            if errors:
+                return self._fail(f"配置文件有误: {'；'.join(errors)}")
+
+            try:
+                self.on_change(config)
+            except Exception as e:
+                return self._fail(f"应用新配置出错: {e}")
+            self.last_error = None
+            self.reloads += 1
+            return True
+
+    def _fail(self, message):
+        self.last_error = message
+        print(f"{message}，继续使用当前配置")
+        return False
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.check()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SpaceTrans常驻翻译服务
+
+在后台常驻一个已预热的TranslationEngine（连接池、翻译缓存、语言识别模型），
+通过本机Unix套接字提供逐行JSON的请求/响应接口，编辑器和脚本不必每次启动新进程。
+协议见client.py，命令行客户端为 python client.py。
+
+用法:
+    python daemon.py [--socket ~/.spacetrans/daemon.sock]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import threading
+
+from client import DAEMON_SOCKET
+from config_manager import load_config
+from config_watcher import ConfigWatcher
+from http_client import APIError
+from lazy_import import warm_up_in_background
+from rate_limiter import BATCH, request_priority
+from translation_engine import TARGET_LANGUAGES, TranslationEngine
+
+# 单个请求的最大字节数
+MAX_REQUEST_BYTES = 16 * 1024 * 1024
+
+
+class TranslationDaemon:
+    """
+    常驻翻译服务 - 每个连接可以依次发送多个请求，批量请求中的文本并发翻译
+    """
+    def __init__(self, config, path=DAEMON_SOCKET):
+        """
+        Args:
+            config: 配置字典，见config_manager.DEFAULT_CONFIG
+            path: 套接字路径
+        """
+        self.config = config
+        self.path = path
+        self.engine = TranslationEngine(config)
+        self.config_watcher = ConfigWatcher(self.apply_config, interval=config["CONFIG_WATCH_INTERVAL"])
+        self.requests = 0
+        self.connections = 0
+        # serve运行的事件循环，异步翻译在这里执行
+        self.loop = None
+
+    def apply_config(self, config):
+        """
+        配置文件修改后换用新引擎，旧引擎在翻译超时时间过后释放
+        """
+        old_engine, old_config = self.engine, self.config
+        engine = TranslationEngine(config)
+        if self.loop is not None:
+            engine.bind_loop(self.loop)
+        self.engine, self.config = engine, config
+        warm_up_in_background(engine.warm_up_tasks())
+        retire = threading.Timer(old_config["TRANSLATE_TIMEOUT"], old_engine.close)
+        retire.daemon = True
+        retire.start()
+        print("配置已更新")
+
+    async def translate(self, text, target="auto"):
+        """
+        翻译一段文本
+
+        Returns:
+            {"text": 译文, "target": 目标语言}，目标语言总是解析后的语言代码，不会是auto
+
+        Raises:
+            APIError: API服务返回错误
+            ValueError: 参数错误
+        """
+        engine = self.engine
+        if not isinstance(text, str):
+            raise ValueError("text必须是字符串")
+        if target != "auto" and target not in TARGET_LANGUAGES:
+            raise ValueError(f"不支持的目标语言: {target}")
+        if not text.strip():
+            # 空白文本原样返回，不必识别语言：不含中文，按识别规则应译为简体中文
+            return {"text": text, "target": "zh-Hans" if target == "auto" else target}
+        if target == "auto":
+            target, _, _, _ = await asyncio.to_thread(engine.detect_target_language, text)
+        terms = engine.match_terms(text, target)
+        if not engine.API_KEY and not engine.use_local(text, target, terms):
+            raise ValueError("请先设置API_KEY")
+        translated = await asyncio.wait_for(
+            engine.translate_async(text, target, terms), self.config["TRANSLATE_TIMEOUT"]
+        )
+        return {"text": translated, "target": target}
+
+    async def translate_batch(self, texts, target="auto"):
+        """
+        并发翻译多段文本，同时在途的请求数不超过CHUNK_WORKERS，单段失败不影响其他段。
+        批量请求以BATCH优先级排队，单条translate请求总是先被放行
+
+        Returns:
+            与texts一一对应的列表
+        """
+        if not isinstance(texts, list):
+            raise ValueError("texts必须是列表")
+        semaphore = asyncio.Semaphore(self.config["CHUNK_WORKERS"])
+
+        async def run(text):
+            async with semaphore:
+                try:
+                    with request_priority(BATCH):
+                        return await self.translate(text, target)
+                except APIError as e:
+                    return {"error": e.message}
+                except asyncio.TimeoutError:
+                    return {"error": "翻译超时"}
+                except Exception as e:
+                    return {"error": str(e)}
+
+        return await asyncio.gather(*(run(text) for text in texts))
+
+    def stats(self):
+        engine = self.engine
+        stats = {
+            "connections": self.connections,
+            "requests": self.requests,
+            "http": engine.http_client.stats(),
+            "language_detection": engine.language_detector.stats(),
+            "tokens": {"prompt": engine.prompt_tokens, "completion": engine.completion_tokens}
+        }
+        if engine.cache is not None:
+            stats["cache"] = engine.cache.stats()
+        if engine.local is not None:
+            stats["local"] = engine.local.stats()
+        stats["rate_limit"] = {provider.name: provider.limiter.stats() for provider in engine.providers}
+        return stats
+
+    async def dispatch(self, request):
+        method = request.get("method")
+        if method == "translate":
+            return await self.translate(request.get("text"), request.get("target", "auto"))
+        if method == "translate_batch":
+            return await self.translate_batch(request.get("texts"), request.get("target", "auto"))
+        if method == "stats":
+            return self.stats()
+        if method == "ping":
+            return "pong"
+        raise ValueError(f"未知的方法: {method}")
+
+    async def handle_connection(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # 超过MAX_REQUEST_BYTES的请求无法继续解析，直接断开
+                    writer.write(b'{"ok": false, "error": "request too large"}\n')
+                    break
+                if not line:
+                    break
+                self.requests += 1
+                request_id = None
+                try:
+                    request = json.loads(line)
+                    request_id = request.get("id")
+                    response = {"id": request_id, "ok": True, "result": await self.dispatch(request)}
+                except APIError as e:
+                    response = {"id": request_id, "ok": False, "error": e.message}
+                except asyncio.TimeoutError:
+                    response = {"id": request_id, "ok": False, "error": "翻译超时"}
+                except Exception as e:
+                    response = {"id": request_id, "ok": False, "error": str(e)}
+                writer.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def claim_socket(self):
+        """
+        清理上次异常退出留下的套接字文件，已有服务在运行时返回False
+        """
+        if not os.path.exists(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            return True
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.path)
+        except OSError:
+            os.unlink(self.path)
+            return True
+        finally:
+            probe.close()
+        return False
+
+    async def serve(self):
+        if not self.claim_socket():
+            print(f"翻译服务已在运行: {self.path}")
+            return 1
+        server = await asyncio.start_unix_server(self.handle_connection, self.path, limit=MAX_REQUEST_BYTES)
+        # 只允许当前用户连接
+        os.chmod(self.path, 0o600)
+        self.loop = asyncio.get_running_loop()
+        self.engine.bind_loop(self.loop)
+        warm_up_in_background(self.engine.warm_up_tasks())
+        self.config_watcher.start()
+        print(f"翻译服务已启动: {self.path}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.config_watcher.stop()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+        return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SpaceTrans常驻翻译服务")
+    parser.add_argument("--socket", default=DAEMON_SOCKET, help=f"套接字路径 (默认: {DAEMON_SOCKET})")
+    args = parser.parse_args(argv)
+
+    if not hasattr(socket, "AF_UNIX"):
+        print("当前平台不支持Unix套接字")
+        return 1
+
+    daemon = TranslationDaemon(load_config(), args.socket)
+    try:
+        return asyncio.run(daemon.serve())
+    except KeyboardInterrupt:
+        print("\n翻译服务已退出")
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SpaceTrans术语表模块
+
+术语表文件（默认~/.spacetrans/glossary.txt）每行一对术语:
+    原文术语 = 译文术语
+    # 井号开头的行是注释；只有一个词的行表示该词保持原样，例如产品名
+两边的术语都可以出现在原文中，命中哪一边就把哪一边译为另一边；
+只加入对应术语属于目标语言的术语对，例如译为英文时不会加入"API = 接口"。
+
+术语表编译成Aho-Corasick自动机，每次翻译只对原文扫描一遍，耗时与原文长度和命中数成正比，
+与术语表的条目数无关；只把命中的术语对加入用户消息。文件修改后在后台重新编译，编译完成前继续使用旧的自动机。
+
+直接运行本模块可以测量不同规模术语表的编译和扫描耗时:
+    python glossary.py [--entries 1000 10000 50000] [--chars 500]
+"""
+
+import argparse
+import os
+import random
+import string
+import threading
+import time
+
+from config_manager import CONFIG_DIR
+from lang_detect import HAN_RANGES
+
+# 默认术语表文件
+GLOSSARY_FILE = os.path.join(CONFIG_DIR, "glossary.txt")
+
+# 检查文件是否修改的最小间隔（秒）
+RELOAD_INTERVAL = 1.0
+
+
+def parse_glossary(lines):
+    """
+    解析术语表，跳过空行和注释
+
+    Returns:
+        [(术语, 对应术语)]
+    """
+    pairs = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if "\t" in line:
+            source, target = line.split("\t", 1)
+        elif "=" in line:
+            source, target = line.split("=", 1)
+        else:
+            source, target = line, line
+        source, target = source.strip(), target.strip()
+        if source and target:
+            pairs.append((source, target))
+    return pairs
+
+
+def _is_word_char(char):
+    return char.isascii() and char.isalnum()
+
+
+def _is_chinese(term):
+    return any(low <= ord(char) <= high for char in term for low, high in HAN_RANGES)
+
+
+def suits_target(source, target, target_lang):
+    """
+    术语对是否适合加入译为target_lang的请求：对应术语应当属于目标语言，保持原样的术语总是适合
+
+    Args:
+        target_lang: 目标语言代码，为None时不做检查
+    """
+    if target_lang is None or source == target:
+        return True
+    return _is_chinese(target) == (target_lang == "zh-Hans")
+
+
+class Automaton:
+    """
+    Aho-Corasick自动机，不区分大小写地查找所有模式串
+    """
+    def __init__(self, patterns):
+        """
+        Args:
+            patterns: 模式串列表，匹配结果为模式串的下标
+        """
+        self.patterns = patterns
+        self.lengths = [len(pattern) for pattern in patterns]
+        # 每个状态的转移、失败指针、在该状态结束的模式串，以及沿失败指针最近的有输出的状态
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        self.link = [0]
+
+        for index, pattern in enumerate(patterns):
+            state = 0
+            for char in pattern.lower():
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.link.append(0)
+                state = next_state
+            self.output[state].append(index)
+
+        # 按层次遍历计算失败指针
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[next_state] = target
+                self.link[next_state] = target if self.output[target] else self.link[target]
+
+    @property
+    def states(self):
+        return len(self.goto)
+
+    def search(self, text):
+        """
+        扫描文本
+
+        Returns:
+            [(开始位置, 结束位置, 模式串下标)]，按结束位置排序
+        """
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # 少数字符转小写后长度会变，此时按原文区分大小写匹配，保证位置正确
+            lowered = text
+        goto, fail, output, link, lengths = self.goto, self.fail, self.output, self.link, self.lengths
+        matches = []
+        state = 0
+        for end, char in enumerate(lowered, 1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            hit = state if output[state] else link[state]
+            while hit:
+                for index in output[hit]:
+                    matches.append((end - lengths[index], end, index))
+                hit = link[hit]
+        return matches
+
+
+class Glossary:
+    """
+    术语表 - 文件修改后自动重新编译，为每段原文挑出命中的术语对
+    """
+    def __init__(self, path="", max_terms=30):
+        """
+        Args:
+            path: 术语表文件，为空时使用~/.spacetrans/glossary.txt
+            max_terms: 每次翻译最多加入的术语对数，0表示不使用术语表
+        """
+        self.path = path or GLOSSARY_FILE
+        self.max_terms = max_terms
+        # (自动机, 术语对) 整体替换，读取时不需要加锁
+        self._compiled = None
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._compiling = False
+
+    def load(self):
+        """
+        读取并编译术语表，用于后台预热。文件不存在时术语表为空
+        """
+        self._checked_at = time.monotonic()
+        mtime = self._stat()
+        with self._lock:
+            self._mtime = mtime
+        self._compile(mtime)
+
+    def __len__(self):
+        compiled = self._compiled
+        return len(compiled[1]) if compiled else 0
+
+    def _stat(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _compile(self, mtime):
+        pairs = []
+        if mtime is not None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    pairs = parse_glossary(f)
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"读取术语表失败: {e}")
+                if self._compiled is None:
+                    self._compiled = (Automaton([]), [])
+                return
+        # 两边的术语都作为模式串，命中后换成另一边
+        patterns = [source for source, _ in pairs] + [target for source, target in pairs if target != source]
+        replacements = [target for _, target in pairs] + [source for source, target in pairs if target != source]
+        automaton = Automaton(patterns)
+        self._compiled = (automaton, replacements)
+        if pairs:
+            print(f"术语表已加载: {len(pairs)} 条，{automaton.states} 个状态")
+
+    def _recompile(self, mtime):
+        try:
+            self._compile(mtime)
+        finally:
+            with self._lock:
+                self._compiling = False
+
+    def refresh(self):
+        """
+        检查文件是否修改，修改后在后台线程中重新编译
+        """
+        now = time.monotonic()
+        if self._compiled is None:
+            self.load()
+            return
+        if now - self._checked_at < RELOAD_INTERVAL:
+            return
+        self._checked_at = now
+        mtime = self._stat()
+        with self._lock:
+            if mtime == self._mtime or self._compiling:
+                return
+            self._mtime = mtime
+            self._compiling = True
+        thread = threading.Thread(target=self._recompile, args=(mtime,), name="glossary")
+        thread.daemon = True
+        thread.start()
+
+    def match(self, text, target_lang=None):
+        """
+        找出原文中出现的术语。重叠时取最靠前、最长的一个，英文术语只按整词匹配
+
+        Args:
+            target_lang: 目标语言代码，只保留对应术语属于目标语言的术语对，为None时全部保留
+
+        Returns:
+            [(原文中的术语, 对应术语)]，按出现顺序排列，最多max_terms项
+        """
+        if not self.max_terms:
+            return []
+        self.refresh()
+        automaton, replacements = self._compiled
+        if not replacements:
+            return []
+
+        matches = sorted(automaton.search(text), key=lambda match: (match[0], -match[1]))
+        terms = []
+        seen = set()
+        covered = 0
+        for start, end, index in matches:
+            if not suits_target(automaton.patterns[index], replacements[index], target_lang):
+                continue
+            if start < covered:
+                continue
+            if _is_word_char(text[start]) and start > 0 and _is_word_char(text[start - 1]):
+                continue
+            if _is_word_char(text[end - 1]) and end < len(text) and _is_word_char(text[end]):
+                continue
+            covered = end
+            pattern = automaton.patterns[index]
+            if pattern.lower() in seen:
+                continue
+            seen.add(pattern.lower())
+            terms.append((pattern, replacements[index]))
+            if len(terms) >= self.max_terms:
+                break
+        return terms
+
+
+def format_terms(terms):
+    """
+    把命中的术语对格式化为用户消息的前缀，没有命中时为空字符串
+    """
+    if not terms:
+        return ""
+    lines = "\n".join(f"{source} = {target}" for source, target in terms)
+    return f"Use these term translations:\n{lines}\n\n"
+
+
+def _random_term(rng):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 12)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="测量不同规模术语表的编译和扫描耗时")
+    parser.add_argument("--entries", type=int, nargs="+", default=[1000, 10000, 50000],
+                        help="术语表条目数 (默认: 1000 10000 50000)")
+    parser.add_argument("--chars", type=int, default=500, help="扫描文本的字符数 (默认: 500)")
+    parser.add_argument("--runs", type=int, default=200, help="每种规模扫描的次数 (默认: 200)")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    words = [_random_term(rng) for _ in range(args.chars // 6 + 1)]
+    text = " ".join(words)[:args.chars]
+    for entries in args.entries:
+        # 每个规模都让文本命中5个术语，只改变术语表的大小
+        patterns = [_random_term(rng) for _ in range(entries - 5)] + words[:5]
+        start = time.perf_counter()
+        automaton = Automaton(patterns)
+        compile_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            matches = automaton.search(text)
+        scan_time = (time.perf_counter() - start) / args.runs
+        print(f"{entries:>7} 条: 编译 {compile_time * 1000:.0f} 毫秒，{automaton.states} 个状态；"
+              f"扫描{len(text)}字符 {scan_time * 1e6:.0f} 微秒，命中 {len(matches)} 处")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
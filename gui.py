@@ -132,6 +132,15 @@ class ConfigGUI:
         )
         self.refresh_button.pack(side=tk.LEFT, padx=5)
         
+        self.clear_cache_button = tk.Button(
+            button_frame, 
+            text="清空缓存", 
+            command=self.clear_cache, 
+            width=15,
+            cursor="hand2"
+        )
+        self.clear_cache_button.pack(side=tk.LEFT, padx=5)
+        
         self.start_button = tk.Button(
             button_frame, 
             text="启动翻译程序", 
@@ -141,9 +150,15 @@ class ConfigGUI:
         )
         self.start_button.pack(side=tk.RIGHT, padx=5)
     
-    def save_config(self):
+    def save_config(self, notify=True):
         """
         保存配置到文件
+        
+        Args:
+            notify: 保存成功后是否弹出提示
+        
+        Returns:
+            是否保存成功
         """
         # 获取所有配置项的值
         for key in self.config_entries:
@@ -159,12 +174,12 @@ class ConfigGUI:
             self.config["TEMPERATURE"] = float(self.config["TEMPERATURE"])
         except ValueError as e:
             messagebox.showerror("错误", f"数值转换错误: {e}\n请确保数值字段输入正确的数字")
-            return
+            return False
         
         # 验证必填项
-        if not self.config["API_KEY"].strip():
+        if not self.config["API_KEY"].strip() and self.config.get("ENGINE") != "local":
             messagebox.showerror("错误", "API密钥不能为空")
-            return
+            return False
         
         # 保存到文件
         try:
@@ -175,9 +190,12 @@ class ConfigGUI:
             with open(self.config_path, 'w', encoding='utf-8') as f:
                 json.dump(self.config, f, ensure_ascii=False, indent=4)
             
-            messagebox.showinfo("成功", f"配置已保存到 {self.config_path}")
+            if notify:
+                messagebox.showinfo("成功", f"配置已保存到 {self.config_path}")
+            return True
         except Exception as e:
             messagebox.showerror("错误", f"保存配置文件出错: {e}")
+            return False
     
     def refresh_config(self):
         """
@@ -200,6 +218,39 @@ class ConfigGUI:
         except Exception as e:
             messagebox.showerror("错误", f"刷新配置出错: {e}")
     
+    def clear_cache(self):
+        """
+        清空翻译缓存
+        """
+        from translation_cache import TranslationCache
+        
+        # 翻译程序已启动时直接清空它持有的缓存，内存中的条目也一并清除
+        translator = getattr(self, 'translator', None)
+        if translator is not None and translator.engine.cache is not None:
+            cache = translator.engine.cache
+            owned = False
+        else:
+            cache = TranslationCache()
+            owned = True
+        
+        try:
+            stats = cache.stats()
+            confirm = messagebox.askyesno(
+                "清空缓存",
+                f"当前缓存 {stats['disk_entries']} 条，"
+                f"命中 {stats['memory_hits'] + stats['disk_hits']} 次，未命中 {stats['misses']} 次\n"
+                "确定要清空翻译缓存吗？"
+            )
+            if not confirm:
+                return
+            cache.clear()
+            messagebox.showinfo("成功", "翻译缓存已清空")
+        except Exception as e:
+            messagebox.showerror("错误", f"清空缓存出错: {e}")
+        finally:
+            if owned:
+                cache.close()
+    
     def start_translator(self):
         """
         启动翻译程序
@@ -324,6 +375,11 @@ class ConfigGUI:
             # 停止键盘监听器
             if hasattr(self.translator, 'keyboard_listener') and self.translator.keyboard_listener.is_alive():
                 self.translator.keyboard_listener.stop()
+            self.translator.gesture_worker.stop()
+            self.translator.config_watcher.stop()
+            
+            # 取消未完成的翻译并停止事件循环
+            self.translator.core.stop()
             
             # 重置翻译器实例
             self.translator = None
@@ -332,7 +388,19 @@ class ConfigGUI:
         return False
     
     def restart_translator(self):
-        """重启翻译程序"""
+        """应用新配置，翻译程序已启动时直接热更新，不重建键盘监听器"""
+        translator = getattr(self, 'translator', None)
+        if translator is not None:
+            if not self.save_config(notify=False):
+                return
+            # 点击按钮时无论修改时间是否变化都重新读取
+            watcher = translator.config_watcher
+            if watcher.check(force=True):
+                messagebox.showinfo("成功", "新配置已生效")
+            else:
+                messagebox.showerror("错误", f"新配置未生效，继续使用当前配置:\n{watcher.last_error}")
+            return
+        
         # 先停止当前运行的翻译程序
         self.stop_translator()
         
@@ -390,7 +458,7 @@ class ConfigGUI:
         # 创建重启按钮
         restart_button = tk.Button(
             button_container,
-            text="🔄 重启翻译程序",
+            text="🔄 应用新配置",
             command=self.restart_translator,
             bg="#FF9800",
             fg="black",
@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SpaceTrans HTTP客户端模块
+
+为翻译请求提供长期存活的连接池客户端，复用与API_HOST之间的TCP/TLS连接，
+避免每次触发翻译都重新进行DNS解析和握手。
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
+import telemetry
+from lazy_import import lazy_import
+
+# requests只在创建客户端时导入，不拖慢程序启动
+requests = lazy_import("requests")
+
+try:
+    # httpx为可选依赖，仅在开启HTTP2时使用
+    import httpx
+except ImportError:
+    httpx = None
+
+
+# httpx建立连接的开始时间，按请求所在的线程或协程分别记录
+_connect_started = contextvars.ContextVar("spacetrans_connect_started", default=None)
+
+# 记录建连耗时的urllib3连接池类，首次创建客户端时生成
+_timed_pool_classes = None
+
+
+def _install_connect_timer(adapter):
+    """
+    把requests适配器使用的urllib3连接池换成记录建连耗时的子类，
+    每建立一条新连接记录一个http_connect片段（包含TLS握手）
+    """
+    global _timed_pool_classes
+    if _timed_pool_classes is None:
+        from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+        def timed(pool_class):
+            class TimedConnection(pool_class.ConnectionCls):
+                def connect(self):
+                    with telemetry.span("http_connect"):
+                        return super().connect()
+            return type(f"Timed{pool_class.__name__}", (pool_class,), {"ConnectionCls": TimedConnection})
+
+        _timed_pool_classes = {"http": timed(HTTPConnectionPool), "https": timed(HTTPSConnectionPool)}
+    adapter.poolmanager.pool_classes_by_scheme = _timed_pool_classes
+
+
+class APIError(Exception):
+    """
+    API服务返回错误时抛出
+    """
+    def __init__(self, message, status_code=None, retry_after=None):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        # 服务通过Retry-After要求等待的秒数
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value):
+    """
+    解析Retry-After响应头，支持秒数和HTTP日期两种格式
+
+    Returns:
+        需要等待的秒数，没有或无法解析时返回None
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _response_data(response):
+    # 解析响应体。出错的响应可能不是JSON（例如网关返回的429页面），统一整理为
+    # {"error": {"message": ...}}，并把Retry-After放进error中
+    try:
+        data = response.json()
+    except ValueError:
+        data = None
+    if response.status_code == 200 and isinstance(data, dict):
+        return data
+    if not isinstance(data, dict):
+        data = {"error": {"message": f"HTTP {response.status_code}: {response.text[:200]}"}}
+    if not isinstance(data.get("error"), dict):
+        data["error"] = {"message": str(data.get("error") or data.get("message") or "未知错误")}
+    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+    if retry_after is not None:
+        data["error"]["retry_after"] = retry_after
+    return data
+
+
+class StreamResponse:
+    """
+    流式响应的统一封装，屏蔽requests与httpx之间的差异
+    """
+    def __init__(self, response, http2):
+        self._response = response
+        self._http2 = http2
+        self.status_code = response.status_code
+        self.content_type = response.headers.get("Content-Type", "")
+        self.retry_after = parse_retry_after(response.headers.get("Retry-After"))
+
+    def iter_lines(self):
+        """
+        逐行读取响应体
+        """
+        if self._http2:
+            yield from self._response.iter_lines()
+        else:
+            # SSE响应通常不声明charset，requests会默认按ISO-8859-1解码
+            self._response.encoding = "utf-8"
+            yield from self._response.iter_lines(decode_unicode=True)
+
+    def json(self):
+        """
+        读取完整响应体并解析为JSON
+        """
+        if self._http2:
+            self._response.read()
+        return self._response.json()
+
+
+class PooledHTTPClient:
+    """
+    连接池HTTP客户端 - 由翻译器长期持有，保持与API服务的长连接
+    """
+    def __init__(self, base_url, connect_timeout=5, read_timeout=60,
+                 pool_size=4, http2=False, keepalive_interval=0, loop=None):
+        """
+        Args:
+            base_url: API服务地址，例如 https://api.siliconflow.cn
+            connect_timeout: 建立连接的超时时间（秒）
+            read_timeout: 等待响应数据的超时时间（秒）
+            pool_size: 连接池中保持的最大连接数
+            http2: 是否使用HTTP/2（需要安装httpx[http2]）
+            keepalive_interval: 空闲时定期预热连接的间隔（秒），0表示不定期预热
+            loop: post_json_async所在的事件循环，见bind_loop
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_size = pool_size
+        self.keepalive_interval = keepalive_interval
+
+        # 连接复用统计
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._new_connections = 0
+        self._last_used = 0.0
+        self._closed = threading.Event()
+
+        # 异步客户端在事件循环中首次使用时创建，只能在创建它的事件循环中关闭
+        self._async_client = None
+        self._async_loop = None
+        self._async_requests = 0
+        self._async_connections = 0
+        if loop is not None:
+            self.bind_loop(loop)
+
+        self.http2 = bool(http2 and httpx is not None)
+        if http2 and httpx is None:
+            print("未安装httpx，HTTP/2不可用，将使用HTTP/1.1长连接")
+
+        if self.http2:
+            self._client = httpx.Client(
+                http2=True,
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=pool_size,
+                    max_keepalive_connections=pool_size
+                )
+            )
+        else:
+            self._session = requests.Session()
+            self._adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            self._session.mount("https://", self._adapter)
+            self._session.mount("http://", self._adapter)
+            _install_connect_timer(self._adapter)
+
+        # 空闲保活线程
+        if self.keepalive_interval > 0:
+            keepalive_thread = threading.Thread(target=self._keepalive_loop)
+            keepalive_thread.daemon = True
+            keepalive_thread.start()
+
+    def post_json(self, path, payload, headers=None):
+        """
+        发送JSON POST请求
+
+        Returns:
+            (状态码, 解析后的JSON数据)
+        """
+        url = f"{self.base_url}{path}"
+        self._mark_used()
+        if self.http2:
+            response = self._client.post(
+                url, json=payload, headers=headers,
+                extensions={"trace": self._trace}
+            )
+        else:
+            response = self._session.post(url, json=payload, headers=headers, timeout=self.timeout)
+        self._update_counters()
+        return response.status_code, _response_data(response)
+
+    async def post_json_async(self, path, payload, headers=None):
+        """
+        在事件循环中发送JSON POST请求，等待响应时不占用线程
+        （未安装httpx时退化为在线程池中执行同步请求）
+
+        Returns:
+            (状态码, 解析后的JSON数据)
+        """
+        if httpx is None:
+            return await asyncio.to_thread(self.post_json, path, payload, headers)
+
+        client = self._ensure_async_client()
+        with self._lock:
+            self._last_used = time.monotonic()
+            self._async_requests += 1
+        response = await client.post(
+            f"{self.base_url}{path}", json=payload, headers=headers,
+            extensions={"trace": self._atrace}
+        )
+        return response.status_code, _response_data(response)
+
+    def bind_loop(self, loop):
+        """
+        指定post_json_async所在的事件循环。异步请求使用该循环中单独的连接池，
+        绑定后warm_up和空闲保活会同时预热这个连接池，而不只是同步请求的连接池
+        """
+        if httpx is not None and self._async_client is None:
+            self._async_loop = loop
+
+    def _ensure_async_client(self):
+        # 在事件循环中调用，首次使用时在当前循环中创建异步客户端。
+        # 异步客户端的连接属于创建它的事件循环，换了事件循环（例如多次asyncio.run）时重新创建
+        loop = asyncio.get_running_loop()
+        if self._async_client is not None and self._async_loop is not loop:
+            self._async_client = None
+        if self._async_client is None:
+            self._async_loop = loop
+            self._async_client = httpx.AsyncClient(
+                http2=self.http2,
+                timeout=httpx.Timeout(self.timeout[1], connect=self.timeout[0]),
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size
+                )
+            )
+        return self._async_client
+
+    def get_status(self, path, headers=None):
+        """
+        发送GET请求，只关心状态码，用于探测服务是否恢复
+
+        Returns:
+            状态码
+        """
+        url = f"{self.base_url}{path}"
+        self._mark_used()
+        if self.http2:
+            response = self._client.get(url, headers=headers, extensions={"trace": self._trace})
+        else:
+            response = self._session.get(url, headers=headers, timeout=self.timeout)
+        self._update_counters()
+        return response.status_code
+
+    @contextmanager
+    def stream_post(self, path, payload, headers=None):
+        """
+        发送流式POST请求，响应体在读取时才逐块到达
+
+        Yields:
+            StreamResponse对象
+        """
+        url = f"{self.base_url}{path}"
+        self._mark_used()
+        if self.http2:
+            with self._client.stream(
+                "POST", url, json=payload, headers=headers,
+                extensions={"trace": self._trace}
+            ) as response:
+                self._update_counters()
+                yield StreamResponse(response, True)
+        else:
+            response = self._session.post(
+                url, json=payload, headers=headers, timeout=self.timeout, stream=True
+            )
+            self._update_counters()
+            try:
+                yield StreamResponse(response, False)
+            finally:
+                response.close()
+
+    def warm_up(self, wait=False):
+        """
+        预先建立到API服务的连接，使下一次翻译请求直接复用已握手的连接
+
+        Args:
+            wait: 是否等待预热完成，默认在后台线程中进行
+        """
+        if not wait:
+            warmup_thread = threading.Thread(target=self.warm_up, kwargs={"wait": True})
+            warmup_thread.daemon = True
+            warmup_thread.start()
+            return
+
+        try:
+            # 只关心连接是否建立，响应内容和状态码无关紧要
+            self._mark_used()
+            if self.http2:
+                self._client.head(self.base_url, extensions={"trace": self._trace})
+            else:
+                self._session.head(self.base_url, timeout=self.timeout)
+            self._update_counters()
+        except Exception as e:
+            print(f"连接预热失败: {e}")
+
+        loop = self._async_loop
+        if loop is None or loop.is_closed() or self._closed.is_set():
+            return
+        try:
+            future = asyncio.run_coroutine_threadsafe(self._warm_up_async(), loop)
+        except RuntimeError:
+            # 事件循环恰好已经关闭
+            return
+        if not _in_loop(loop):
+            # 在事件循环所在的线程中调用时不能等待，否则会互相阻塞
+            future.result()
+
+    async def _warm_up_async(self):
+        # 在异步请求所用的连接池中预先建立连接
+        if self._closed.is_set():
+            return
+        try:
+            client = self._ensure_async_client()
+            with self._lock:
+                self._last_used = time.monotonic()
+            await client.head(self.base_url, extensions={"trace": self._atrace})
+        except Exception as e:
+            print(f"异步连接预热失败: {e}")
+
+    def warm_up_if_idle(self, min_idle):
+        """
+        连接空闲超过min_idle秒时在后台预热，刚用过的连接不重复预热
+
+        Returns:
+            是否发起了预热
+        """
+        with self._lock:
+            idle = time.monotonic() - self._last_used
+        if idle < min_idle:
+            return False
+        self.warm_up()
+        return True
+
+    def stats(self):
+        """
+        获取连接复用统计
+
+        Returns:
+            包含请求数、新建连接数、复用次数的字典
+        """
+        with self._lock:
+            requests_count = self._requests + self._async_requests
+            new_connections = self._new_connections + self._async_connections
+        return {
+            "requests": requests_count,
+            "new_connections": new_connections,
+            "reused": max(requests_count - new_connections, 0),
+            "http2": self.http2
+        }
+
+    def close(self):
+        """
+        关闭客户端并释放所有连接
+        """
+        self._closed.set()
+        if self.http2:
+            self._client.close()
+        else:
+            self._session.close()
+
+        async_client, self._async_client = self._async_client, None
+        loop, self._async_loop = self._async_loop, None
+        if async_client is not None and loop.is_running():
+            # 可能在其他线程中调用，交给所属的事件循环关闭；
+            # 在其他线程中调用时稍等关闭完成，事件循环随后停止也不会留下未关闭的连接
+            closing = async_client.aclose()
+            try:
+                future = asyncio.run_coroutine_threadsafe(closing, loop)
+            except RuntimeError:
+                # 事件循环恰好已经关闭
+                closing.close()
+                return
+            if not _in_loop(loop):
+                try:
+                    future.result(1)
+                except Exception:
+                    pass
+
+    def _mark_used(self):
+        with self._lock:
+            self._last_used = time.monotonic()
+            if self.http2:
+                self._requests += 1
+
+    def _update_counters(self):
+        # HTTP/1.1模式下直接读取urllib3连接池自身的计数
+        if self.http2:
+            return
+        pools = self._adapter.poolmanager.pools
+        requests_count = 0
+        new_connections = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                requests_count += pool.num_requests
+                new_connections += pool.num_connections
+        with self._lock:
+            self._requests = requests_count
+            self._new_connections = new_connections
+
+    def _trace(self, event_name, info):
+        # httpcore的trace回调，每建立一条新的TCP连接记一次
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self._new_connections += 1
+        _record_connect(event_name)
+
+    async def _atrace(self, event_name, info):
+        # 异步客户端的trace回调
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self._async_connections += 1
+        _record_connect(event_name)
+
+    def _keepalive_loop(self):
+        while not self._closed.wait(self.keepalive_interval):
+            with self._lock:
+                idle = time.monotonic() - self._last_used
+            if idle >= self.keepalive_interval:
+                self.warm_up(wait=True)
+
+
+def _in_loop(loop):
+    # 当前是否在该事件循环中运行
+    try:
+        return asyncio.get_running_loop() is loop
+    except RuntimeError:
+        return False
+
+
+def _record_connect(event_name):
+    # httpx下TCP连接和TLS握手分别记为http_connect和tls_handshake片段
+    if event_name in ("connection.connect_tcp.started", "connection.start_tls.started"):
+        _connect_started.set(time.perf_counter())
+    elif event_name in ("connection.connect_tcp.complete", "connection.start_tls.complete"):
+        started = _connect_started.get()
+        if started is not None:
+            name = "http_connect" if "connect_tcp" in event_name else "tls_handshake"
+            telemetry.record_span(name, time.perf_counter() - started, started)
+            _connect_started.set(None)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SpaceTrans增量翻译模块
+
+按会话（前台应用）记住最近一次的原文和逐句译文。再次触发时用difflib按句比较新旧原文，
+没有改动的句子直接沿用上次的译文，只把新增或修改的句子发给翻译服务，
+重新翻译的开销与改动的多少成正比，而与全文长度无关。
+多个待翻译的句子带上编号放在同一个请求中，按编号把译文对应回各句，句子中可以包含换行。
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from difflib import SequenceMatcher
+
+# 最多记住的会话数
+MAX_SESSIONS = 16
+
+# 单句的最大字符数，更长的句子继续切分
+SENTENCE_MAX_CHARS = 200
+
+# 句子编号，位于行首
+SEGMENT_MARKER = re.compile(r"^\[\[(\d+)\]\][ \t]*", re.MULTILINE)
+
+
+def number_segments(segments):
+    """
+    给每个句子加上行首编号[[1]]、[[2]]……拼成一段文本
+    """
+    return "\n".join(f"[[{number}]] {segment}" for number, segment in enumerate(segments, 1))
+
+
+def parse_numbered(text, count):
+    """
+    按编号从译文中取出各句，编号之间的全部内容（包括换行）属于前一个编号
+
+    Args:
+        count: 句子数
+
+    Returns:
+        长度为count的列表，缺失、重复或为空的编号对应None
+    """
+    results = [None] * count
+    matches = list(SEGMENT_MARKER.finditer(text))
+    for index, match in enumerate(matches):
+        end = matches[index + 1].start() if index + 1 < len(matches) else len(text)
+        number = int(match.group(1))
+        body = text[match.end():end].strip()
+        if 1 <= number <= count and body and results[number - 1] is None:
+            results[number - 1] = body
+    return results
+
+
+class TranslationMemory:
+    """
+    每个会话最近一次的逐句原文和译文
+    """
+    def __init__(self, max_sessions=MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.reused = 0
+        self.sent = 0
+
+    def diff(self, session, target_lang, sentences):
+        """
+        与会话上次的原文比较，找出可以沿用的译文
+
+        Args:
+            session: 会话标识，例如前台应用名称
+            target_lang: 目标语言代码，与上次不同时不沿用
+            sentences: 本次原文的句子列表
+
+        Returns:
+            与sentences一一对应的列表，可以沿用的位置为上次的译文，需要翻译的位置为None
+        """
+        translations = [None] * len(sentences)
+        with self._lock:
+            previous = self._sessions.get(session)
+        if previous is None or previous[0] != target_lang:
+            return translations
+
+        _, old_sentences, old_translations = previous
+        matcher = SequenceMatcher(None, old_sentences, sentences, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                translations[j1:j2] = old_translations[i1:i2]
+        return translations
+
+    def put(self, session, target_lang, sentences, translations, reused=0):
+        """
+        记住本次的逐句原文和译文
+
+        Args:
+            reused: 本次沿用的句子数，用于统计
+        """
+        with self._lock:
+            self._sessions[session] = (target_lang, list(sentences), list(translations))
+            self._sessions.move_to_end(session)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            self.reused += reused
+            self.sent += len(sentences) - reused
+
+    def forget(self, session):
+        with self._lock:
+            self._sessions.pop(session, None)
+
+    def stats(self):
+        """
+        获取统计
+
+        Returns:
+            {"sessions": 会话数, "reused": 沿用的句子数, "sent": 发送翻译的句子数}
+        """
+        with self._lock:
+            return {"sessions": len(self._sessions), "reused": self.reused, "sent": self.sent}
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SpaceTrans输入后端模块
+
+监听按键、模拟快捷键和确定平台主修饰键都通过同一个输入后端完成，
+进程中只保留一套输入钩子和线程。
+PynputBackend基于pynput（macOS上为Quartz事件，Windows上为低级键盘钩子，Linux上为Xlib），
+FakeInputBackend在内存中模拟按键，供性能测试和调试使用。
+
+直接运行本模块可以测量空闲时的线程唤醒次数和按键钩子延迟:
+    python input_backend.py [--idle 10] [--count 50] [--fake] [--legacy]
+"""
+
+import abc
+import argparse
+import platform
+import threading
+import time
+
+from lazy_import import lazy_import
+
+keyboard = lazy_import("pynput.keyboard")
+
+# 测量钩子延迟时模拟按下的键，不会向输入框输入字符
+PROBE_KEY = "shift"
+
+
+def primary_modifier():
+    """
+    当前平台快捷键使用的修饰键，macOS为cmd，其他平台为ctrl
+    """
+    return "cmd" if platform.system() == "Darwin" else "ctrl"
+
+
+class InputBackend(abc.ABC):
+    """
+    输入后端接口，子类必须实现listener和press_and_release
+    """
+    def __init__(self):
+        self.modifier = primary_modifier()
+
+    @abc.abstractmethod
+    def listener(self, on_press, on_release):
+        """
+        创建按键监听器，回调在系统输入线程中调用
+
+        Returns:
+            具有start/stop/join/is_alive方法的监听器
+        """
+
+    @abc.abstractmethod
+    def press_and_release(self, combo):
+        """
+        模拟按下并松开快捷键
+
+        Args:
+            combo: 以+连接的键名，例如"cmd+v"、"shift"
+        """
+
+    def shortcut(self, key):
+        """
+        用平台主修饰键组合快捷键并模拟按下，例如shortcut("c")在macOS上为cmd+c
+        """
+        self.press_and_release(f"{self.modifier}+{key}")
+
+    def warm_up(self):
+        """
+        提前完成首次模拟按键前的初始化
+        """
+
+
+class PynputBackend(InputBackend):
+    """
+    基于pynput的输入后端，监听和模拟按键共用同一个库
+    """
+    def __init__(self):
+        super().__init__()
+        self._controller = None
+        # 多个线程同时模拟快捷键时，保证每组按键不会交错
+        self._lock = threading.Lock()
+
+    def listener(self, on_press, on_release):
+        return keyboard.Listener(on_press=on_press, on_release=on_release)
+
+    @property
+    def controller(self):
+        if self._controller is None:
+            with self._lock:
+                if self._controller is None:
+                    self._controller = keyboard.Controller()
+        return self._controller
+
+    def resolve(self, name):
+        """
+        把键名转换为pynput的按键，单个字符原样返回
+        """
+        name = name.strip().lower()
+        if len(name) == 1:
+            return name
+        try:
+            return keyboard.Key[name]
+        except KeyError:
+            raise ValueError(f"无法识别的按键: {name}") from None
+
+    def press_and_release(self, combo):
+        keys = [self.resolve(name) for name in combo.split("+")]
+        controller = self.controller
+        with self._lock:
+            for key in keys:
+                controller.press(key)
+            for key in reversed(keys):
+                controller.release(key)
+
+    def warm_up(self):
+        self.controller
+
+
+class FakeListener:
+    """
+    FakeInputBackend的监听器，启动后接收后端送入的按键
+    """
+    def __init__(self, backend, on_press, on_release):
+        self.backend = backend
+        self.on_press = on_press
+        self.on_release = on_release
+        self._alive = False
+
+    def start(self):
+        self._alive = True
+        self.backend._listeners.append(self)
+
+    def stop(self):
+        self._alive = False
+        if self in self.backend._listeners:
+            self.backend._listeners.remove(self)
+
+    def join(self, timeout=None):
+        pass
+
+    def is_alive(self):
+        return self._alive
+
+
+class FakeInputBackend(InputBackend):
+    """
+    内存中的输入后端：模拟的快捷键交给on_synthesize处理，
+    并像真实系统一样回送给正在运行的监听器
+    """
+    def __init__(self, on_synthesize=None, modifier="ctrl"):
+        """
+        Args:
+            on_synthesize: 模拟快捷键时调用的函数 on_synthesize(combo)，用于模拟目标应用的响应
+            modifier: 平台主修饰键
+        """
+        super().__init__()
+        self.modifier = modifier
+        self.on_synthesize = on_synthesize
+        self.sent = []
+        self._listeners = []
+
+    def listener(self, on_press, on_release):
+        return FakeListener(self, on_press, on_release)
+
+    def feed(self, key, pressed=True):
+        """
+        模拟用户按下或松开一个键
+        """
+        for listener in list(self._listeners):
+            callback = listener.on_press if pressed else listener.on_release
+            if callback is not None:
+                callback(key)
+
+    def press_and_release(self, combo):
+        self.sent.append(combo)
+        keys = combo.split("+")
+        for key in keys:
+            self.feed(key, True)
+        if self.on_synthesize is not None:
+            self.on_synthesize(combo)
+        for key in reversed(keys):
+            self.feed(key, False)
+
+
+def _context_switches():
+    import resource
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_nvcsw + usage.ru_nivcsw, usage.ru_utime + usage.ru_stime
+
+
+def measure_idle(backend, seconds):
+    """
+    启动监听器后空闲等待，统计进程的上下文切换次数（线程唤醒）和CPU时间
+
+    Returns:
+        {"wakeups_per_second": 每秒唤醒次数, "cpu_ms_per_second": 每秒CPU毫秒数}
+    """
+    listener = backend.listener(lambda key: None, lambda key: None)
+    listener.start()
+    try:
+        # 等监听器线程完成初始化后再开始统计
+        time.sleep(0.5)
+        switches, cpu = _context_switches()
+        time.sleep(seconds)
+        switches_after, cpu_after = _context_switches()
+    finally:
+        listener.stop()
+    return {
+        "wakeups_per_second": (switches_after - switches) / seconds,
+        "cpu_ms_per_second": (cpu_after - cpu) * 1000 / seconds
+    }
+
+
+def measure_hook_latency(backend, count, synthesize=None):
+    """
+    模拟按键并测量从发出到监听器回调的延迟
+
+    Args:
+        synthesize: 模拟按键的函数，默认使用backend.press_and_release
+
+    Returns:
+        [延迟（秒）]，按从小到大排序
+    """
+    synthesize = synthesize or backend.press_and_release
+    received = threading.Event()
+    arrivals = []
+
+    def on_press(key):
+        arrivals.append(time.perf_counter())
+        received.set()
+
+    listener = backend.listener(on_press, lambda key: None)
+    listener.start()
+    latencies = []
+    try:
+        time.sleep(0.5)
+        for _ in range(count):
+            received.clear()
+            arrivals.clear()
+            start = time.perf_counter()
+            synthesize(PROBE_KEY)
+            if received.wait(1):
+                latencies.append(arrivals[0] - start)
+            time.sleep(0.02)
+    finally:
+        listener.stop()
+    latencies.sort()
+    return latencies
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="测量输入后端的空闲唤醒次数和按键钩子延迟")
+    parser.add_argument("--idle", type=float, default=10, help="空闲统计时长（秒）(默认: 10)")
+    parser.add_argument("--count", type=int, default=50, help="测量钩子延迟的按键次数 (默认: 50)")
+    parser.add_argument("--fake", action="store_true", help="使用内存中的模拟后端")
+    parser.add_argument("--legacy", action="store_true",
+                        help="同时加载keyboard库并用它模拟按键，对比改造前两套输入库并存的情况")
+    args = parser.parse_args(argv)
+
+    backend = FakeInputBackend() if args.fake else PynputBackend()
+    synthesize = None
+    if args.legacy:
+        try:
+            import keyboard as legacy_keyboard
+        except ImportError:
+            print("未安装keyboard库，无法对比: pip install keyboard")
+            return 1
+        synthesize = legacy_keyboard.press_and_release
+        # 先模拟一次按键，让keyboard库完成初始化
+        synthesize(PROBE_KEY)
+
+    idle = measure_idle(backend, args.idle)
+    print(f"空闲{args.idle:g}秒: 每秒唤醒 {idle['wakeups_per_second']:.1f} 次，"
+          f"每秒CPU {idle['cpu_ms_per_second']:.2f} 毫秒")
+
+    latencies = measure_hook_latency(backend, args.count, synthesize)
+    if not latencies:
+        print("监听器没有收到模拟的按键，请检查输入监听权限")
+        return 1
+    p50 = latencies[len(latencies) // 2] * 1e6
+    p99 = latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1e6
+    print(f"按键钩子延迟: p50 {p50:.0f} 微秒，p99 {p99:.0f} 微秒（{len(latencies)}/{args.count}次收到）")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
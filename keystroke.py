@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SpaceTrans按键处理模块
+
+系统输入钩子的回调运行在操作系统的输入线程上，任何停顿都会让所有应用的输入变卡。
+因此回调只把(按键, 时间戳, 按下/松开)写入预先分配好的环形缓冲区，
+由单独的工作线程读取并匹配触发手势：连续按键（如space*3）、双击（如shift*2）和组合键（如ctrl+alt+t）。
+
+直接运行本模块可以测量每次按键在钩子线程上的开销:
+    python keystroke.py [--count 200000]
+"""
+
+import argparse
+import threading
+import time
+
+# 修饰键名称，组合键中除最后一个键外都必须是修饰键
+MODIFIERS = {"ctrl", "alt", "alt_gr", "shift", "cmd"}
+
+# 默认环形缓冲区大小（2的幂），足够容纳工作线程短暂落后时的全部按键
+DEFAULT_CAPACITY = 1024
+
+
+class KeyRingBuffer:
+    """
+    单生产者单消费者的环形缓冲区
+
+    push只在输入钩子线程中调用，只做数组写入和下标递增，不加锁、不分配内存；
+    工作线程空闲等待时才需要唤醒它
+    """
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        # 容量取2的幂，下标用位与代替取模
+        capacity = 1 << max(capacity - 1, 1).bit_length()
+        self.capacity = capacity
+        self._mask = capacity - 1
+        self._keys = [None] * capacity
+        self._times = [0.0] * capacity
+        self._pressed = [False] * capacity
+        self._write = 0
+        self._read = 0
+        self.dropped = 0
+        self._waiting = False
+        self._event = threading.Event()
+
+    def push(self, key, pressed=True, _clock=time.perf_counter):
+        """
+        写入一个按键事件（在输入钩子线程中调用）
+        """
+        index = self._write & self._mask
+        self._keys[index] = key
+        self._times[index] = _clock()
+        self._pressed[index] = pressed
+        self._write += 1
+        if self._waiting:
+            self._event.set()
+
+    def drain(self):
+        """
+        读出所有尚未处理的事件（在工作线程中调用）
+
+        Returns:
+            [(按键, 时间戳, 是否按下)]
+        """
+        write = self._write
+        if write - self._read > self.capacity:
+            # 工作线程落后超过一整圈，最早的事件已被覆盖
+            self.dropped += write - self._read - self.capacity
+            self._read = write - self.capacity
+        events = []
+        while self._read < write:
+            index = self._read & self._mask
+            events.append((self._keys[index], self._times[index], self._pressed[index]))
+            self._read += 1
+        return events
+
+    def wait(self, timeout=None):
+        """
+        没有新事件时阻塞等待（在工作线程中调用）
+
+        Returns:
+            是否有新事件
+        """
+        self._waiting = True
+        try:
+            if self._read == self._write:
+                self._event.wait(timeout)
+            self._event.clear()
+        finally:
+            self._waiting = False
+        return self._read != self._write
+
+    def wake(self):
+        """
+        唤醒等待中的工作线程，用于停止
+        """
+        self._event.set()
+
+
+def key_name(key):
+    """
+    把pynput的按键对象转换为统一的小写名称，左右修饰键不作区分
+
+    Returns:
+        例如 "space"、"esc"、"ctrl"、"a"，无法识别时返回None
+    """
+    name = getattr(key, "name", None)
+    if name:
+        if name.endswith(("_l", "_r")) and name[:-2] in MODIFIERS:
+            name = name[:-2]
+        return name
+
+    char = getattr(key, "char", None)
+    if char:
+        # 按住ctrl时部分平台返回控制字符，还原成对应的字母
+        if len(char) == 1 and ord(char) < 32:
+            return chr(ord(char) + 96)
+        return char.lower()
+
+    vk = getattr(key, "vk", None)
+    if vk is not None:
+        return f"vk{vk}"
+    if isinstance(key, str):
+        return key.lower()
+    return None
+
+
+def is_printable(name):
+    """
+    按下这个键是否会在文本框中输入一个字符，name为key_name的结果
+    """
+    return name == "space" or len(name) == 1
+
+
+class TapGesture:
+    """
+    同一个键在超时时间内连续按下若干次，例如space*3、shift*2
+    """
+    def __init__(self, spec, key, count, timeout):
+        self.spec = spec
+        self.key = key
+        self.count = count
+        self.timeout = timeout
+        # 空格和单个字符的按键会作为字符输入到文本框中，翻译前需要去掉
+        self.typed_chars = count if is_printable(key) else 0
+        # 只差最后一次按键即可触发
+        self.armed = False
+        self._taps = 0
+        self._last = 0.0
+
+    def feed(self, name, timestamp, pressed, held):
+        self.armed = False
+        if not pressed:
+            return False
+        if name != self.key:
+            self._taps = 0
+            return False
+        if self._taps and timestamp - self._last < self.timeout:
+            self._taps += 1
+        else:
+            self._taps = 1
+        self._last = timestamp
+        if self._taps == self.count:
+            self._taps = 0
+            return True
+        self.armed = self._taps == self.count - 1
+        return False
+
+    def reset(self):
+        self._taps = 0
+        self.armed = False
+
+
+class ChordGesture:
+    """
+    按住修饰键的同时按下某个键，例如ctrl+alt+t
+    """
+    def __init__(self, spec, modifiers, key):
+        self.spec = spec
+        self.modifiers = frozenset(modifiers)
+        self.key = key
+        self.typed_chars = 0
+        self.armed = False
+
+    def feed(self, name, timestamp, pressed, held):
+        return pressed and name == self.key and self.modifiers == held
+
+    def reset(self):
+        pass
+
+
+def parse_gesture(spec, timeout=0.5):
+    """
+    解析手势描述
+
+    Args:
+        spec: "space*3"（连续按3次）、"shift*2"（双击）、"ctrl+alt+t"（组合键）或单个键名"esc"
+        timeout: 连续按键之间的最大间隔（秒）
+
+    Raises:
+        ValueError: 描述无法解析
+    """
+    text = spec.strip().lower()
+    if not text:
+        raise ValueError("手势不能为空")
+    if "*" in text:
+        key, _, count = text.partition("*")
+        if not key or not count.isdigit() or int(count) < 1:
+            raise ValueError(f"无法解析手势: {spec}")
+        return TapGesture(spec, key.strip(), int(count), timeout)
+    parts = [part.strip() for part in text.split("+")]
+    if any(not part for part in parts):
+        raise ValueError(f"无法解析手势: {spec}")
+    modifiers, key = parts[:-1], parts[-1]
+    unknown = [m for m in modifiers if m not in MODIFIERS]
+    if unknown:
+        raise ValueError(f"{spec} 中的 {'、'.join(unknown)} 不是修饰键")
+    if not modifiers:
+        return TapGesture(spec, key, 1, timeout)
+    return ChordGesture(spec, modifiers, key)
+
+
+class GestureMatcher:
+    """
+    按顺序接收按键事件，跟踪按住的修饰键并匹配手势
+    """
+    def __init__(self, gestures):
+        """
+        Args:
+            gestures: [(手势, 动作名称)]
+        """
+        self.gestures = gestures
+        self.held = set()
+        # 本次按键后只差一次按键即可触发的手势
+        self.armed = []
+
+    def feed(self, key, timestamp, pressed):
+        """
+        Returns:
+            [(手势, 动作名称)]，没有匹配时为空列表
+        """
+        self.armed = []
+        name = key_name(key)
+        if name is None:
+            return []
+        if name in MODIFIERS:
+            if pressed:
+                self.held.add(name)
+            else:
+                self.held.discard(name)
+
+        held = frozenset(self.held - {name}) if name in MODIFIERS else frozenset(self.held)
+        matched = []
+        for gesture, action in self.gestures:
+            if gesture.feed(name, timestamp, pressed, held):
+                matched.append((gesture, action))
+        if matched:
+            for gesture, _ in self.gestures:
+                gesture.reset()
+        else:
+            self.armed = [(gesture, action) for gesture, action in self.gestures if gesture.armed]
+        return matched
+
+
+class GestureWorker:
+    """
+    手势匹配线程 - 从环形缓冲区读取按键，匹配到手势时调用回调
+    """
+    def __init__(self, buffer, matcher, on_gesture, on_armed=None):
+        """
+        Args:
+            buffer: KeyRingBuffer
+            matcher: GestureMatcher
+            on_gesture: 回调函数 on_gesture(动作名称, 手势, 按键时间戳)
+            on_armed: 手势只差最后一次按键时的回调，参数同on_gesture
+        """
+        self.buffer = buffer
+        self.matcher = matcher
+        self.on_gesture = on_gesture
+        self.on_armed = on_armed
+        self._stopped = False
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="gesture")
+            self._thread.daemon = True
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped = True
+        self.buffer.wake()
+
+    def process_pending(self):
+        """
+        处理缓冲区中的全部事件
+
+        Returns:
+            处理的事件数
+        """
+        events = self.buffer.drain()
+        for key, timestamp, pressed in events:
+            for gesture, action in self.matcher.feed(key, timestamp, pressed):
+                try:
+                    self.on_gesture(action, gesture, timestamp)
+                except Exception as e:
+                    print(f"处理手势 {gesture.spec} 出错: {e}")
+            if self.on_armed is not None:
+                for gesture, action in self.matcher.armed:
+                    try:
+                        self.on_armed(action, gesture, timestamp)
+                    except Exception as e:
+                        print(f"处理手势 {gesture.spec} 出错: {e}")
+        return len(events)
+
+    def _run(self):
+        while not self._stopped:
+            self.buffer.wait()
+            self.process_pending()
+
+
+def _inline_handler(core):
+    # 改造前on_key_press的写法：在钩子线程中计数，触发时直接向异步核心提交任务
+    state = {"count": 0, "last": 0.0}
+    space = "space"
+
+    async def translate():
+        pass
+
+    def on_key_press(key):
+        try:
+            if key == space:
+                now = time.time()
+                if now - state["last"] < 0.5:
+                    state["count"] += 1
+                else:
+                    state["count"] = 1
+                state["last"] = now
+                if state["count"] == 3:
+                    state["count"] = 0
+                    core.submit(translate())
+                    return True
+            else:
+                state["count"] = 0
+        except Exception as e:
+            print(f"按键处理错误: {e}")
+        return True
+
+    return on_key_press
+
+
+def _time_calls(func, keys):
+    # 逐次计时，返回每次调用的耗时（秒）
+    clock = time.perf_counter
+    durations = []
+    for key in keys:
+        start = clock()
+        func(key)
+        durations.append(clock() - start)
+    durations.sort()
+    return durations
+
+
+def _summary(durations):
+    count = len(durations)
+    return {
+        "mean_ns": sum(durations) / count * 1e9,
+        "p99_ns": durations[min(int(count * 0.99), count - 1)] * 1e9,
+        "max_ns": durations[-1] * 1e9
+    }
+
+
+def benchmark(count):
+    """
+    测量每次按键在钩子线程上的开销，以及从按键到手势被识别的延迟
+
+    Returns:
+        结果字典（纳秒/微秒）
+    """
+    from async_core import AsyncCore
+
+    keys = ["a", "space", "b", "space", "space", "space"] * (count // 6 + 1)
+    keys = keys[:count]
+
+    core = AsyncCore()
+    try:
+        inline = _summary(_time_calls(_inline_handler(core), keys))
+    finally:
+        core.stop()
+
+    # 工作线程运行时钩子线程上的全部开销：只写缓冲区
+    buffer = KeyRingBuffer()
+    matcher = GestureMatcher([(parse_gesture("space*3"), "translate")])
+    worker = GestureWorker(buffer, matcher, lambda action, gesture, timestamp: None).start()
+    push = _summary(_time_calls(buffer.push, keys))
+    worker.stop()
+
+    # 从第三次空格写入到手势回调的延迟
+    latencies = []
+    done = threading.Event()
+
+    def on_gesture(action, gesture, timestamp):
+        latencies.append(time.perf_counter() - timestamp)
+        done.set()
+
+    buffer = KeyRingBuffer()
+    matcher = GestureMatcher([(parse_gesture("space*3"), "translate")])
+    worker = GestureWorker(buffer, matcher, on_gesture).start()
+    for _ in range(200):
+        done.clear()
+        for _ in range(3):
+            buffer.push("space")
+        done.wait(1)
+        time.sleep(0.001)
+    worker.stop()
+
+    latencies.sort()
+    return {
+        "inline": inline,
+        "push": push,
+        "gesture_p50_us": latencies[len(latencies) // 2] * 1e6 if latencies else None,
+        "gesture_p99_us": latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1e6 if latencies else None
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="测量按键钩子的每次按键开销")
+    parser.add_argument("--count", type=int, default=200000, help="模拟的按键次数 (默认: 200000)")
+    args = parser.parse_args(argv)
+
+    result = benchmark(args.count)
+    for label, key in (("原先在钩子线程中处理", "inline"), ("只写入环形缓冲区", "push")):
+        item = result[key]
+        print(f"{label}: 平均 {item['mean_ns']:.0f} 纳秒，p99 {item['p99_ns']:.0f} 纳秒，"
+              f"最慢 {item['max_ns'] / 1000:.0f} 微秒")
+    if result["gesture_p50_us"] is not None:
+        print(f"按键到识别手势的延迟: p50 {result['gesture_p50_us']:.0f} 微秒，p99 {result['gesture_p99_us']:.0f} 微秒")
+
+
+if __name__ == "__main__":
+    main()
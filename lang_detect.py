@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SpaceTrans语言识别模块
+
+先按Unicode文字系统统计汉字、假名、谚文和拉丁字母的比例，常见的中英文情况
+直接判定；只有比例不明确的混合文本才交给py3langid做完整的n-gram识别。
+"""
+
+import threading
+
+from lazy_import import lazy_import
+
+# numpy是py3langid的依赖，两者都在首次识别时才导入
+np = lazy_import("numpy")
+langid = lazy_import("py3langid")
+
+# 各文字系统的码位范围（闭区间）
+HAN_RANGES = ((0x3400, 0x4DBF), (0x4E00, 0x9FFF), (0xF900, 0xFAFF), (0x20000, 0x2FA1F))
+KANA_RANGES = ((0x3040, 0x30FF), (0x31F0, 0x31FF))
+HANGUL_RANGES = ((0x1100, 0x11FF), (0x3130, 0x318F), (0xAC00, 0xD7AF))
+LATIN_RANGES = ((0x41, 0x5A), (0x61, 0x7A), (0xC0, 0xD6), (0xD8, 0xF6), (0xF8, 0x24F))
+OTHER_RANGES = (
+    (0x370, 0x3FF),    # 希腊字母
+    (0x400, 0x4FF),    # 西里尔字母
+    (0x590, 0x6FF),    # 希伯来文、阿拉伯文
+    (0x900, 0x97F),    # 天城文
+    (0xE00, 0xE7F),    # 泰文
+)
+
+# 平均一个英文单词约合4～5个字母，而一个汉字大致相当于一个词，
+# 比较比例前把拉丁字母数按这个系数折算
+LATIN_LETTERS_PER_UNIT = 4.0
+
+# 占比超过该阈值时直接判定，否则交给py3langid
+DECISIVE_RATIO = 0.8
+
+# 快速路径只能确定文字系统、确定不了具体语言时对外返回的语言代码
+UNKNOWN = "unknown"
+
+
+def _count_in_ranges(codepoints, ranges):
+    mask = np.zeros(codepoints.shape, dtype=bool)
+    for low, high in ranges:
+        mask |= (codepoints >= low) & (codepoints <= high)
+    return int(np.count_nonzero(mask))
+
+
+def script_counts(text):
+    """
+    一次性统计文本中各文字系统的字符数
+
+    Returns:
+        {"han": 汉字数, "kana": 假名数, "hangul": 谚文数, "latin": 拉丁字母数, "other": 其他文字数}
+    """
+    codepoints = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    return {
+        "han": _count_in_ranges(codepoints, HAN_RANGES),
+        "kana": _count_in_ranges(codepoints, KANA_RANGES),
+        "hangul": _count_in_ranges(codepoints, HANGUL_RANGES),
+        "latin": _count_in_ranges(codepoints, LATIN_RANGES),
+        "other": _count_in_ranges(codepoints, OTHER_RANGES)
+    }
+
+
+def classify_by_script(text):
+    """
+    仅根据文字系统比例判断语言
+
+    Returns:
+        (语言代码, 置信度)，比例不明确时返回None。
+        拉丁字母或其他文字为主的文本返回"latin"或"other"，LanguageDetector.classify对外统一返回"unknown"
+    """
+    counts = script_counts(text)
+    units = {
+        "zh": counts["han"],
+        "ja": counts["kana"],
+        "ko": counts["hangul"],
+        "latin": counts["latin"] / LATIN_LETTERS_PER_UNIT,
+        "other": counts["other"] / LATIN_LETTERS_PER_UNIT
+    }
+    total = sum(units.values())
+    if total == 0:
+        return None
+
+    # 日文常夹杂大量汉字，出现一定比例的假名就判定为日文
+    if units["ja"] and units["ja"] >= 0.2 * (units["zh"] + units["ja"]):
+        ratio = (units["zh"] + units["ja"]) / total
+        return ("ja", ratio) if ratio >= DECISIVE_RATIO else None
+
+    lang = max(units, key=units.get)
+    ratio = units[lang] / total
+    if ratio >= DECISIVE_RATIO:
+        return lang, ratio
+    return None
+
+
+class LanguageDetector:
+    """
+    语言识别器 - 文字系统快速判定在前，py3langid兜底
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._fast = 0
+        self._fallback = 0
+
+    def classify(self, text):
+        """
+        识别文本语言
+
+        Returns:
+            (语言代码, 置信度, 是否由快速路径判定)。
+            快速路径判定为拉丁字母或其他文字时语言代码为"unknown"，只说明不是中日韩文字
+        """
+        result = classify_by_script(text)
+        if result is not None:
+            with self._lock:
+                self._fast += 1
+            lang = UNKNOWN if result[0] in ("latin", "other") else result[0]
+            return lang, result[1], True
+
+        lang, confidence = langid.classify(text)
+        with self._lock:
+            self._fallback += 1
+        return lang, confidence, False
+
+    def is_english(self, text):
+        """
+        是否为英文。拉丁字母为主的文本还要交给py3langid，与法文、德文等同样用拉丁字母的语言区分开
+        """
+        result = classify_by_script(text)
+        if result is not None and result[0] != "latin":
+            return False
+        lang, _ = langid.classify(text)
+        return lang == "en"
+
+    def warm_up(self):
+        """
+        导入numpy并加载py3langid模型
+        """
+        script_counts("warm up")
+        langid.classify("warm up")
+
+    def stats(self):
+        """
+        获取快速路径的判定统计
+
+        Returns:
+            包含快速判定次数、回退次数和快速判定占比的字典
+        """
+        with self._lock:
+            total = self._fast + self._fallback
+            return {
+                "fast_path": self._fast,
+                "fallback": self._fallback,
+                "fast_path_ratio": self._fast / total if total else 0.0
+            }
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SpaceTrans延迟导入模块
+
+重量级依赖（requests、pyperclip、py3langid等）在首次使用时才导入，
+监听器启动后再在后台线程中预热，同时记录各阶段耗时用于生成启动报告。
+"""
+
+import importlib
+import threading
+import time
+from contextlib import contextmanager
+
+# 进程启动的参考时间点，启动报告中的时间都相对于它
+_START_TIME = time.perf_counter()
+
+_lock = threading.Lock()
+_import_times = []
+_phases = []
+
+
+class LazyModule:
+    """
+    模块代理 - 第一次访问属性时才真正导入模块
+    """
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._load_lock = threading.Lock()
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<LazyModule {self._name} ({state})>"
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def load(self):
+        """
+        导入模块并返回，多个线程同时访问时只导入一次
+        """
+        module = self._module
+        if module is not None:
+            return module
+        with self._load_lock:
+            if self._module is None:
+                start = time.perf_counter()
+                module = importlib.import_module(self._name)
+                elapsed = time.perf_counter() - start
+                with _lock:
+                    _import_times.append((self._name, start - _START_TIME, elapsed,
+                                          threading.current_thread().name))
+                self._module = module
+        return self._module
+
+
+def lazy_import(name):
+    """
+    返回模块的延迟导入代理
+
+    Args:
+        name: 模块的完整名称，例如 "pynput.keyboard"
+    """
+    return LazyModule(name)
+
+
+@contextmanager
+def phase(name):
+    """
+    记录一个启动阶段的耗时
+
+    用法:
+        with phase("加载配置"):
+            ...
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with _lock:
+            _phases.append((name, start - _START_TIME, elapsed, threading.current_thread().name))
+
+
+def warm_up_in_background(tasks, on_done=None):
+    """
+    在后台线程中依次执行预热任务，单个任务失败不影响其他任务
+
+    Args:
+        tasks: (名称, 无参函数) 列表
+        on_done: 全部完成后的回调
+
+    Returns:
+        预热线程
+    """
+    def run():
+        for name, func in tasks:
+            try:
+                with phase(f"预热: {name}"):
+                    func()
+            except Exception as e:
+                print(f"预热{name}失败: {e}")
+        if on_done is not None:
+            on_done()
+
+    thread = threading.Thread(target=run, name="warm-up")
+    thread.daemon = True
+    thread.start()
+    return thread
+
+
+def startup_report():
+    """
+    生成启动报告，格式参考 python -X importtime
+
+    Returns:
+        报告文本
+    """
+    with _lock:
+        rows = [("import", *item) for item in _import_times] + [("phase", *item) for item in _phases]
+    rows.sort(key=lambda row: row[2])
+
+    lines = ["启动报告 (时间单位: 毫秒)",
+             f"{'类型':<8}| {'开始':>9} | {'耗时':>9} | {'线程':<12}| 名称"]
+    for kind, name, offset, elapsed, thread_name in rows:
+        lines.append(
+            f"{kind:<8}| {offset * 1000:>9.1f} | {elapsed * 1000:>9.1f} | {thread_name:<12}| {name}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SpaceTrans本地翻译模块
+
+用CTranslate2在CPU上运行Marian（opus-mt）中英互译模型，不需要网络。
+模型在首次使用或后台预热时加载一次并常驻内存；原文按句切分，
+同时到达的句子（包括并发的多次翻译）合并成一个批次推理。
+
+模型目录结构（默认位于~/.spacetrans/models）:
+    zh-en/  由Helsinki-NLP/opus-mt-zh-en转换，包含model.bin、source.spm、target.spm
+    en-zh/  由Helsinki-NLP/opus-mt-en-zh转换
+转换方法:
+    pip install ctranslate2 sentencepiece transformers
+    ct2-transformers-converter --model Helsinki-NLP/opus-mt-zh-en --output_dir zh-en \\
+        --copy_files source.spm target.spm
+"""
+
+import asyncio
+import importlib.util
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from config_manager import CONFIG_DIR
+from lang_detect import LanguageDetector
+from lazy_import import lazy_import
+from segmenter import join_translations, split_sentences
+
+# 两个依赖都是可选的，只在加载模型时导入
+ctranslate2 = lazy_import("ctranslate2")
+sentencepiece = lazy_import("sentencepiece")
+
+# 默认模型目录
+LOCAL_MODEL_DIR = os.path.join(CONFIG_DIR, "models")
+
+# 目标语言 -> 模型子目录
+MODEL_PAIRS = {
+    "en": "zh-en",
+    "zh-Hans": "en-zh"
+}
+
+# 多目标语言的模型需要在原文前加目标语言标记
+TARGET_TOKENS = {
+    "en-zh": ">>cmn_Hans<<"
+}
+
+# 单句的最大字符数，Marian模型的输入上限为512个token
+SENTENCE_MAX_CHARS = 200
+
+# 一个批次最多包含的句子数
+MAX_BATCH_SIZE = 32
+
+
+class LocalModel:
+    """
+    一个方向的CTranslate2模型和对应的SentencePiece分词器
+    """
+    def __init__(self, path, pair, threads=0):
+        self.pair = pair
+        self.translator = ctranslate2.Translator(path, device="cpu", intra_threads=threads)
+        self.source = sentencepiece.SentencePieceProcessor(model_file=os.path.join(path, "source.spm"))
+        self.target = sentencepiece.SentencePieceProcessor(model_file=os.path.join(path, "target.spm"))
+        self.prefix = [TARGET_TOKENS[pair]] if pair in TARGET_TOKENS else []
+
+    def translate_batch(self, sentences):
+        """
+        翻译一批句子
+
+        Returns:
+            与输入顺序相同的译文列表
+        """
+        tokens = [self.prefix + self.source.encode(s, out_type=str) + ["</s>"] for s in sentences]
+        # 贪心解码，延迟比束搜索低得多，短句的质量差别不大
+        results = self.translator.translate_batch(tokens, beam_size=1, max_batch_size=MAX_BATCH_SIZE)
+        return [self.target.decode(result.hypotheses[0]) for result in results]
+
+
+class LocalTranslator:
+    """
+    本地翻译器 - 管理各方向的模型，并在后台线程中按批次推理
+    """
+    def __init__(self, model_dir="", threads=0, detector=None):
+        """
+        Args:
+            model_dir: 模型目录，为空时使用~/.spacetrans/models
+            threads: 每次推理使用的CPU线程数，0表示由CTranslate2决定
+            detector: 语言识别器，用于判断原文是否为英文，默认新建一个
+        """
+        self.model_dir = model_dir or LOCAL_MODEL_DIR
+        self.threads = threads
+        self.detector = detector or LanguageDetector()
+        self._models = {}
+        self._load_lock = threading.Lock()
+        self._unavailable = {}
+
+        # 待翻译的句子：每项为 [(句子, 目标语言, Future)]，一次翻译的所有句子一起放入
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self.closed = False
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.sentences = 0
+        self.busy_time = 0.0
+
+    def unavailable_reason(self, target_lang):
+        """
+        检查某个方向能否本地翻译
+
+        Returns:
+            不可用的原因，可用时返回None
+        """
+        if target_lang in self._unavailable:
+            return self._unavailable[target_lang]
+        pair = MODEL_PAIRS.get(target_lang)
+        if pair is None:
+            reason = f"没有译为{target_lang}的本地模型"
+        elif importlib.util.find_spec("ctranslate2") is None or importlib.util.find_spec("sentencepiece") is None:
+            reason = "未安装本地翻译依赖: pip install ctranslate2 sentencepiece"
+        elif not os.path.isfile(os.path.join(self.model_dir, pair, "model.bin")):
+            reason = f"未找到本地模型: {os.path.join(self.model_dir, pair)}"
+        else:
+            reason = None
+        self._unavailable[target_lang] = reason
+        return reason
+
+    def supports(self, text, target_lang):
+        """
+        是否可以本地翻译这段文本。译为中文的模型只认英文，法文、德文等其他语言的原文交给远程服务
+        """
+        if self.closed or self.unavailable_reason(target_lang) is not None:
+            return False
+        if target_lang == "zh-Hans":
+            return self.detector.is_english(text)
+        return True
+
+    def model(self, target_lang):
+        """
+        获取某个方向的模型，首次调用时加载
+        """
+        model = self._models.get(target_lang)
+        if model is None:
+            with self._load_lock:
+                model = self._models.get(target_lang)
+                if model is None:
+                    pair = MODEL_PAIRS[target_lang]
+                    model = LocalModel(os.path.join(self.model_dir, pair), pair, self.threads)
+                    self._models[target_lang] = model
+        return model
+
+    def load(self):
+        """
+        加载所有可用方向的模型并启动推理线程，用于后台预热
+        """
+        for target_lang in MODEL_PAIRS:
+            if self.unavailable_reason(target_lang) is None:
+                self.model(target_lang)
+        self._ensure_worker()
+
+    def submit(self, text, target_lang):
+        """
+        按句切分并提交翻译
+
+        Returns:
+            concurrent.futures.Future，结果为完整译文
+
+        Raises:
+            RuntimeError: 翻译器已关闭
+        """
+        parts = split_sentences(text, SENTENCE_MAX_CHARS)
+        items = [(part, target_lang, Future()) for part, translatable in parts if translatable]
+        # 检查和入队都在锁内进行，关闭后不会再有句子排在结束标记之后无人处理
+        with self._worker_lock:
+            if self.closed:
+                raise RuntimeError("本地翻译器已关闭")
+            self._start_worker()
+            if items:
+                self._queue.put(items)
+
+        result = Future()
+        pending = {"count": len(items)}
+        lock = threading.Lock()
+
+        def assemble():
+            return join_translations(parts, [future.result() for _, _, future in items], target_lang)
+
+        def on_done(future):
+            # 任一句失败时整段失败，全部完成后按原顺序拼接
+            with lock:
+                pending["count"] -= 1
+                if result.done():
+                    return
+                if future.exception() is not None:
+                    result.set_exception(future.exception())
+                    return
+                if pending["count"]:
+                    return
+            result.set_result(assemble())
+
+        if not items:
+            result.set_result(text)
+        for _, _, future in items:
+            future.add_done_callback(on_done)
+        return result
+
+    def translate(self, text, target_lang):
+        """
+        同步翻译文本
+        """
+        return self.submit(text, target_lang).result()
+
+    async def translate_async(self, text, target_lang):
+        """
+        在事件循环中等待翻译结果，推理在后台线程中进行
+        """
+        return await asyncio.wrap_future(self.submit(text, target_lang))
+
+    def stats(self):
+        """
+        获取推理统计
+
+        Returns:
+            {"batches": 批次数, "sentences": 句子数, "avg_batch": 平均批次大小, "avg_batch_ms": 平均批次耗时}
+        """
+        with self._stats_lock:
+            return {
+                "batches": self.batches,
+                "sentences": self.sentences,
+                "avg_batch": round(self.sentences / self.batches, 2) if self.batches else 0.0,
+                "avg_batch_ms": round(self.busy_time / self.batches * 1000, 1) if self.batches else 0.0
+            }
+
+    def close(self):
+        """
+        停止推理线程，已经提交的句子仍会翻译完；关闭后supports返回False，submit抛出RuntimeError
+        """
+        with self._worker_lock:
+            if self.closed:
+                return
+            self.closed = True
+            if self._worker is not None:
+                self._queue.put(None)
+                self._worker = None
+
+    def _ensure_worker(self):
+        with self._worker_lock:
+            if not self.closed:
+                self._start_worker()
+
+    def _start_worker(self):
+        # 在_worker_lock内调用
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name="local-engine")
+            self._worker.daemon = True
+            self._worker.start()
+
+    def _run(self):
+        # 取出一项后把队列中已在等待的句子一并取出，不为凑批次额外等待
+        while True:
+            items = self._queue.get()
+            if items is None:
+                return
+            while len(items) < MAX_BATCH_SIZE:
+                try:
+                    more = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if more is None:
+                    self._queue.put(None)
+                    break
+                items.extend(more)
+
+            by_target = {}
+            for item in items:
+                by_target.setdefault(item[1], []).append(item)
+            for target_lang, group in by_target.items():
+                start_time = time.perf_counter()
+                try:
+                    translations = self.model(target_lang).translate_batch([text for text, _, _ in group])
+                except Exception as e:
+                    for _, _, future in group:
+                        future.set_exception(e)
+                    continue
+                with self._stats_lock:
+                    self.batches += 1
+                    self.sentences += len(group)
+                    self.busy_time += time.perf_counter() - start_time
+                for (_, _, future), translated in zip(group, translations):
+                    future.set_result(translated)
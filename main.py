@@ -8,64 +8,227 @@ SpaceTransForMac - 一个macOS下的即时翻译工具
 使用AI API进行翻译。
 """
 
+from lazy_import import lazy_import, phase, startup_report, warm_up_in_background
+
+import sys
 import time
+import asyncio
 import threading
-import requests
-from pynput import keyboard
-import pyperclip
-import keyboard as newkeyboard
-import py3langid as langid
-import platform
+
+# 重量级依赖延迟到首次使用时导入，监听器启动后在后台预热
+pyperclip = lazy_import("pyperclip")
 
 # 导入配置管理模块
 from config_manager import load_config, get_config_path
+from config_watcher import ConfigWatcher
+from streaming import SentenceBuffer, StreamingUnsupportedError
+from clipboard_monitor import ClipboardMonitor, get_foreground_app
+from translation_engine import TranslationEngine
+from http_client import APIError
+from async_core import AsyncCore, StageTimeoutError
+from scheduler import TranslationScheduler
+from input_backend import PynputBackend
+from selection_source import create_selection_source
+from keystroke import KeyRingBuffer, GestureMatcher, GestureWorker, parse_gesture
+import telemetry
+
+# 配置在第一次使用时才加载，导入本模块不读取配置文件
+_config = None
+
+# 预判触发时，连接空闲超过该时间（秒）才预热，刚用过的连接一定还在
+SPECULATIVE_IDLE = 5
+
+# 只影响按键和剪贴板处理的配置项，修改这些配置项时不需要重建翻译引擎
+TRANSLATOR_KEYS = (
+    "SPACE_TIMEOUT", "SPACE_TRIGGER_COUNT", "TRIGGER_GESTURES", "CANCEL_GESTURE", "SPECULATIVE_ENABLED",
+    "CLIPBOARD_POLL_INTERVAL", "CLIPBOARD_TIMEOUT", "CAPTURE_TIMEOUT", "TRANSLATE_TIMEOUT", "PASTE_TIMEOUT",
+    "TELEMETRY_ENABLED", "METRICS_PORT", "CONFIG_WATCH_INTERVAL", "SELECTION_SOURCE"
+)
+
+
+def get_config():
+    """
+    获取配置，首次调用时读取配置文件
+    """
+    global _config
+    if _config is None:
+        with phase("加载配置"):
+            _config = load_config()
+    return _config
 
-# 加载配置
-config = load_config()
 
 class SpaceTranslator:
     """
     SpaceTranslator类 - 监听空格键并触发翻译
     """
-    def __init__(self):
+    def __init__(self, input_backend=None):
+        """
+        Args:
+            input_backend: 输入后端，负责监听和模拟按键，默认使用pynput
+        """
         # 从配置文件加载配置
-        self.API_KEY = config["API_KEY"]
-        self.API_HOST = config["API_HOST"]
-        self.MODEL = config["MODEL"]
-        if platform.system() == "Darwin":
-            self.CTRL_KEY = "cmd"
-        else:
-            self.CTRL_KEY = "ctrl"
+        config = get_config()
+        self.config = config
+        
+        # 监听和模拟按键共用同一个输入后端，快捷键的修饰键由后端按平台确定
+        self.input = input_backend or PynputBackend()
         
-        # 空格键监听相关变量
-        self.space_count = 0
-        self.last_space_time = 0
+        # 翻译引擎：连接池、缓存、语言识别和长文本分片
+        self.engine = TranslationEngine(config)
+        
+        # 异步核心：所有翻译任务在同一个事件循环线程中执行，可随时取消
+        self.core = AsyncCore()
+        self.engine.bind_loop(self.core.loop)
+        
+        # 任务调度：翻译进行中的触发排队执行，相同原文只请求一次
+        self.scheduler = TranslationScheduler()
+        
+        # 触发手势：钩子回调只把按键写入环形缓冲区，由手势线程识别
         self.SPACE_TIMEOUT = config["SPACE_TIMEOUT"]
         self.SPACE_TRIGGER_COUNT = config["SPACE_TRIGGER_COUNT"]
+        self.key_buffer = KeyRingBuffer()
+        self.gesture_worker = GestureWorker(
+            self.key_buffer, GestureMatcher(self.load_gestures()), self.on_gesture, self.on_armed
+        )
         
-        # 创建键盘监听器
-        self.keyboard_listener = keyboard.Listener(
-            on_press=self.on_key_press,
-            on_release=self.on_key_release
+        # 预判触发：只差最后一次按键时提前读取剪贴板快照并预热连接（可选）
+        self.speculative = config["SPECULATIVE_ENABLED"]
+        self._speculation = None
+        
+        # 创建键盘监听器（监听器必须尽快就绪，pynput在这里导入）
+        with phase("导入pynput"):
+            self.keyboard_listener = self.input.listener(self.on_key_press, self.on_key_release)
+        
+        # 剪贴板监测：等待剪贴板真正变化，代替固定延迟
+        self.clipboard_monitor = ClipboardMonitor(
+            poll_interval=config["CLIPBOARD_POLL_INTERVAL"],
+            deadline=config["CLIPBOARD_TIMEOUT"]
         )
+        self.current_app = "unknown"
+        
+        # 选区读取：Linux上可以直接读取PRIMARY选区，不可用时回退到全选并复制
+        self.selection_source = create_selection_source(config["SELECTION_SOURCE"])
+        self.check_selection_source()
         
         # 翻译状态
-        self.is_translating = False
         self.original_text = ""
         
+        self.warm_up_thread = None
+        
+        # 配置热更新：配置文件修改后在下一次触发时生效，不重建键盘监听器
+        self.config_watcher = ConfigWatcher(self.apply_config, interval=config["CONFIG_WATCH_INTERVAL"])
+        
+        # 性能监测：每次翻译的分阶段耗时写入~/.spacetrans/telemetry.jsonl
+        if config["TELEMETRY_ENABLED"]:
+            telemetry.configure()
+        telemetry.metrics.add_collector("spacetrans_queue", self.scheduler.stats)
+        self.register_engine_metrics()
+        
         print(f"SpaceTransForMac已启动，配置文件位置: {get_config_path()}")
-        print(f"连续按下{self.SPACE_TRIGGER_COUNT}次空格键即可触发翻译")
+        print(f"按下{'、'.join(self.trigger_specs)}即可触发翻译")
+        if self.selection_source is not None and self.selection_triggers:
+            print(f"按下{'、'.join(self.selection_triggers)}时直接翻译高亮的文本")
+    
+    def register_engine_metrics(self):
+        """
+        把当前引擎的统计注册到指标中，替换引擎后重新注册
+        """
+        telemetry.metrics.add_collector("spacetrans_hedge", self.engine.hedge_stats)
+        telemetry.metrics.add_collector("spacetrans_ratelimit", self.engine.providers[0].limiter.stats)
+        if self.engine.cache is not None:
+            telemetry.metrics.add_collector("spacetrans_cache", self.engine.cache.stats)
+        if self.engine.local is not None:
+            telemetry.metrics.add_collector("spacetrans_local", self.engine.local.stats)
+        if self.engine.memory is not None:
+            telemetry.metrics.add_collector("spacetrans_incremental", self.engine.memory.stats)
+    
+    def apply_config(self, config):
+        """
+        应用新配置（在配置监视线程中调用）。新的引擎和手势都准备好之后再替换，
+        已经发出的请求继续使用旧引擎的连接，旧引擎在翻译超时时间过后释放
+        """
+        global _config
+        old_config = self.config
+        changed = sorted(key for key in config if config[key] != old_config.get(key))
+        if not changed:
+            return
+        
+        engine = self.engine
+        if any(key not in TRANSLATOR_KEYS for key in changed):
+            engine = TranslationEngine(config)
+            engine.bind_loop(self.core.loop)
+        
+        self.config = config
+        self.SPACE_TIMEOUT = config["SPACE_TIMEOUT"]
+        self.SPACE_TRIGGER_COUNT = config["SPACE_TRIGGER_COUNT"]
+        matcher = GestureMatcher(self.load_gestures())
+        
+        # 各项引用依次替换，每一项的赋值都是原子的，按键仍在环形缓冲区中排队，不会丢失
+        old_engine, self.engine = self.engine, engine
+        self.gesture_worker.matcher = matcher
+        self.speculative = config["SPECULATIVE_ENABLED"]
+        self.clipboard_monitor.poll_interval = config["CLIPBOARD_POLL_INTERVAL"]
+        self.clipboard_monitor.deadline = config["CLIPBOARD_TIMEOUT"]
+        self.config_watcher.interval = config["CONFIG_WATCH_INTERVAL"]
+        if config["SELECTION_SOURCE"] != old_config.get("SELECTION_SOURCE"):
+            self.selection_source = create_selection_source(config["SELECTION_SOURCE"])
+        self.check_selection_source()
+        _config = config
+        
+        if config["TELEMETRY_ENABLED"]:
+            telemetry.configure()
+        if config["METRICS_PORT"]:
+            telemetry.serve_metrics(config["METRICS_PORT"])
+        if engine is not old_engine:
+            self.register_engine_metrics()
+            warm_up_in_background(engine.warm_up_tasks())
+            retire = threading.Timer(old_config["TRANSLATE_TIMEOUT"], old_engine.close)
+            retire.daemon = True
+            retire.start()
+        print(f"配置已更新: {', '.join(changed)}")
     
-    def start(self, from_gui=False):
+    def check_selection_source(self):
+        """
+        开启了读取选区但所有触发手势都会输入字符时提示用户，否则选区读取永远不会生效
+        """
+        if self.selection_source is not None and not self.selection_triggers:
+            print(f"SELECTION_SOURCE为{self.selection_source.name}，但触发手势{'、'.join(self.trigger_specs)}"
+                  "都会输入字符并替换高亮的文本，只会使用全选并复制。"
+                  "请在TRIGGER_GESTURES中加入不输入字符的手势，例如\"ctrl+alt+t\"或\"shift*2\"")
+    
+    @property
+    def is_translating(self):
+        """
+        是否有尚未完成的翻译任务
+        """
+        return self.scheduler.busy
+    
+    def start(self, from_gui=False, show_startup_report=False):
         """
         启动监听器
         
         Args:
             from_gui: 是否从GUI启动，如果是则不阻塞主线程
+            show_startup_report: 预热完成后是否打印启动报告
         """
+        # 手势线程先于监听器启动，避免丢失最早的按键
+        self.gesture_worker.start()
+        
         # 确保监听器已启动
         if not self.keyboard_listener.is_alive():
-            self.keyboard_listener.start()
+            with phase("启动监听器"):
+                self.keyboard_listener.start()
+        
+        self.config_watcher.start()
+        
+        # 可选的本机指标服务
+        if self.config["METRICS_PORT"]:
+            telemetry.serve_metrics(self.config["METRICS_PORT"])
+        
+        # 监听器就绪后再在后台导入其余依赖并预热连接
+        if self.warm_up_thread is None:
+            on_done = (lambda: print(startup_report())) if show_startup_report else None
+            self.warm_up_thread = self.warm_up(on_done)
         
         # 如果不是从GUI启动，则阻塞主线程以保持程序运行
         if not from_gui:
@@ -74,75 +237,195 @@ class SpaceTranslator:
             except Exception as e:
                 print(f"监听器异常: {e}")
                 # 尝试重新启动监听器
-                self.keyboard_listener = keyboard.Listener(
-                    on_press=self.on_key_press,
-                    on_release=self.on_key_release
-                )
+                self.keyboard_listener = self.input.listener(self.on_key_press, self.on_key_release)
                 self.keyboard_listener.start()
                 self.keyboard_listener.join()
     
-    def on_key_press(self, key):
+    def warm_up(self, on_done=None):
         """
-        按键按下事件处理
+        在后台线程中导入剩余依赖、加载语言识别模型并建立API连接
+        
+        Returns:
+            预热线程
         """
-        try:
-            # 检测空格键
-            if key == keyboard.Key.space:
-                current_time = time.time()
-                
-                # 检查是否在超时时间内
-                if current_time - self.last_space_time < self.SPACE_TIMEOUT:
-                    self.space_count += 1
-                else:
-                    self.space_count = 1
-                
-                self.last_space_time = current_time
-                
-                # 如果连续按下指定次数的空格
-                if self.space_count == self.SPACE_TRIGGER_COUNT and not self.is_translating:
-                    # 重置计数器
-                    self.space_count = 0
-                    
-                    # 启动翻译线程
-                    threading.Thread(target=self.translate_selected_text).start()
-                    return True
-            else:
-                # 其他键重置空格计数
-                self.space_count = 0
-        except Exception as e:
-            print(f"按键处理错误: {e}")
+        return warm_up_in_background([
+            ("按键模拟", self.input.warm_up),
+            ("pyperclip", pyperclip.load)
+        ] + self.engine.warm_up_tasks(), on_done=on_done)
+    
+    def load_gestures(self):
+        """
+        根据配置创建触发和取消手势，无法解析的手势会被忽略
         
+        Returns:
+            [(手势, 动作名称)]
+        """
+        specs = self.config["TRIGGER_GESTURES"] or [f"space*{self.SPACE_TRIGGER_COUNT}"]
+        gestures = []
+        for spec, action in [(spec, "translate") for spec in specs] + [(self.config["CANCEL_GESTURE"], "cancel")]:
+            if not spec:
+                continue
+            try:
+                gestures.append((parse_gesture(spec, self.SPACE_TIMEOUT), action))
+            except ValueError as e:
+                print(f"手势配置错误: {e}")
+        self.trigger_specs = [gesture.spec for gesture, action in gestures if action == "translate"]
+        # 会输入字符的手势触发时高亮的文本已被替换，只有其余手势才读取选区
+        self.selection_triggers = [
+            gesture.spec for gesture, action in gestures if action == "translate" and not gesture.typed_chars
+        ]
+        return gestures
+    
+    def on_key_press(self, key):
+        """
+        按键按下事件处理（在系统输入线程中调用，只记录按键，不做任何处理）
+        """
+        self.key_buffer.push(key, True)
         return True
     
     def on_key_release(self, key):
         """
-        按键释放事件处理
+        按键释放事件处理，用于跟踪按住的修饰键
         """
-        # if key == keyboard.Key.esc:
-        #     print("SpaceTransForMac已退出")
-        #     return False
-        
+        self.key_buffer.push(key, False)
         return True
     
-    def get_selected_text(self):
+    def on_gesture(self, action, gesture, timestamp):
         """
-        获取当前选中的文本
+        识别到手势时在手势线程中调用
+        
+        Args:
+            action: "translate"或"cancel"
+            gesture: 匹配到的手势
+            timestamp: 最后一次按键的time.perf_counter()
         """
-        # 保存当前剪贴板内容
-        old_clipboard = pyperclip.paste()
+        if action == "translate":
+            # 提交到异步核心执行，翻译进行中的触发会排队而不是被丢弃
+            speculation = self.take_speculation(gesture, timestamp)
+            self.core.submit(self.translate_selected_text_async(timestamp, gesture.typed_chars, speculation))
+        elif action == "cancel" and self.is_translating:
+            self.cancel_translation()
+    
+    def on_armed(self, action, gesture, timestamp):
+        """
+        触发手势只差最后一次按键时在手势线程中调用，开启预判时提前做准备工作
+        """
+        if action != "translate" or not self.speculative:
+            return
+        self._speculation = (gesture, timestamp, self.core.submit(self.prepare_capture()))
+    
+    def take_speculation(self, gesture, timestamp):
+        """
+        取出与本次触发对应的预判结果，手势不同或间隔超时的预判直接丢弃
+        
+        Returns:
+            预判任务的Future，没有可用的预判时返回None
+        """
+        speculation, self._speculation = self._speculation, None
+        if speculation is None:
+            return None
+        armed_gesture, armed_at, future = speculation
+        if armed_gesture is not gesture or timestamp - armed_at > gesture.timeout:
+            future.cancel()
+            return None
+        return future
+    
+    async def prepare_capture(self):
+        """
+        预判即将触发翻译：预热空闲的连接，读取剪贴板快照和前台应用。
+        只读取不修改，手势没有完成时结果直接丢弃
+        
+        Returns:
+            {"clipboard": 剪贴板内容, "app": 前台应用, "sequence": 剪贴板序列号}
+        """
+        self.engine.router.ranked()[0].http_client.warm_up_if_idle(SPECULATIVE_IDLE)
+        return await asyncio.to_thread(self.take_clipboard_snapshot)
+    
+    def take_clipboard_snapshot(self):
+        """
+        读取剪贴板快照，序列号用于在使用前确认剪贴板没有被改动
+        """
+        sequence = self.clipboard_monitor.sequence()
+        return {"clipboard": pyperclip.paste(), "app": get_foreground_app(), "sequence": sequence}
+    
+    def snapshot_current(self, snapshot):
+        """
+        预判时的剪贴板快照是否仍然可用：只有平台提供序列号且序列号没有变化时，才能确认剪贴板没有被改动
+        """
+        if snapshot is None or snapshot["sequence"] is None:
+            return False
+        return snapshot["sequence"] == self.clipboard_monitor.sequence()
+    
+    def cancel_translation(self):
+        """
+        取消正在进行的翻译，尚未粘贴的译文会被丢弃
+        """
+        cancelled = self.core.cancel_all()
+        # 合并后的请求被多个任务共享，需要单独取消
+        self.core.loop.call_soon_threadsafe(self.scheduler.cancel_all)
+        if cancelled:
+            print(f"已取消{cancelled}个翻译任务")
+    
+    def capture_selection(self, snapshot=None, typed_chars=0, cancelled=None):
+        """
+        获取要翻译的文本：优先直接读取选区，否则全选并复制当前输入框中的文本
         
-        # 模拟Command+C复制选中文本
-        newkeyboard.press_and_release(self.CTRL_KEY + '+c')
+        Args:
+            snapshot: 预判时读取的剪贴板快照
+            typed_chars: 触发手势输入的字符数，输入的字符已经替换了高亮的文本，此时只能全选
+            cancelled: 取消标记（threading.Event），置位后不再模拟按键，直接返回None
+        """
+        if self.selection_source is not None and not typed_chars:
+            with telemetry.span("selection_read", source=self.selection_source.name) as attrs:
+                selected_text = self.selection_source.read()
+                attrs["hit"] = bool(selected_text and not selected_text.isspace())
+            if attrs["hit"]:
+                # 选区仍然高亮，粘贴时直接替换选中的部分
+                self.current_app = get_foreground_app()
+                return selected_text
         
-        # 等待剪贴板更新
-        time.sleep(0.1)
+        # 先模拟按下Command+A全选文本
+        # 按键事件在目标应用中按顺序处理，无需等待，复制时会等到剪贴板更新为止
+        if cancelled is not None and cancelled.is_set():
+            return None
+        with telemetry.span("select_all"):
+            self.input.shortcut("a")
         
         # 获取选中的文本
-        selected_text = pyperclip.paste()
+        return self.get_selected_text(snapshot, cancelled)
+    
+    def get_selected_text(self, snapshot=None, cancelled=None):
+        """
+        获取当前选中的文本
         
-        # 恢复原始剪贴板内容
+        Args:
+            snapshot: 预判时读取的剪贴板快照，剪贴板在此之后没有变化时直接使用
+            cancelled: 取消标记（threading.Event），置位后不再模拟复制，直接返回None
+        """
+        if self.snapshot_current(snapshot):
+            old_clipboard = snapshot["clipboard"]
+            self.current_app = snapshot["app"]
+        else:
+            # 保存当前剪贴板内容
+            old_clipboard = pyperclip.paste()
+            
+            # 记录前台应用，剪贴板就绪耗时按应用分别统计
+            self.current_app = get_foreground_app()
+        
+        if cancelled is not None and cancelled.is_set():
+            return None
+        
+        # 模拟Command+C复制选中文本，并等待剪贴板实际发生变化
+        with telemetry.span("clipboard_copy", app=self.current_app):
+            selected_text = self.clipboard_monitor.copy_selection(
+                lambda: self.input.shortcut("c"),
+                self.current_app
+            )
+        
+        # 恢复原始剪贴板内容（即使已被取消，调度器在本线程退出前不会开始下一次获取）
         if (type(old_clipboard) == str):
-            pyperclip.copy(old_clipboard)
+            with telemetry.span("clipboard_restore"):
+                pyperclip.copy(old_clipboard)
         
         return selected_text
     
@@ -153,112 +436,260 @@ class SpaceTranslator:
         print("替换选中的文本")
         # 保存当前剪贴板内容
         old_clipboard = pyperclip.paste()
-        # 复制新文本到剪贴板
-        pyperclip.copy(new_text)
-        # 模拟Command+V粘贴
-        newkeyboard.press_and_release(self.CTRL_KEY + '+v')
-        time.sleep(0.1)
+        self.paste_text(new_text)
         # 恢复原始剪贴板内容
-        pyperclip.copy(old_clipboard)
+        with telemetry.span("clipboard_restore"):
+            pyperclip.copy(old_clipboard)
+    
+    def paste_text(self, text):
+        """
+        通过剪贴板把文本粘贴到当前光标处（有选中内容时替换选中内容）
+        """
+        with telemetry.span("paste", app=self.current_app):
+            # 复制新文本到剪贴板
+            pyperclip.copy(text)
+            # 模拟Command+V粘贴
+            self.input.shortcut("v")
+            # 等待目标应用读取剪贴板，等待时长根据该应用以往的响应速度估算
+            time.sleep(self.clipboard_monitor.paste_wait(self.current_app))
+    
+    def copy_result(self, text):
+        """
+        光标可能已经离开原输入框时，把译文放到剪贴板而不是粘贴
+        """
+        pyperclip.copy(text)
+        print(f"输入框已切换，译文已复制到剪贴板: {text[:30]}...")
     
     def translate_text(self, text):
         """
         调用AI API翻译文本
         """
-        if not self.API_KEY:
-            return "错误：请先设置API_KEY"
+        return self.engine.translate_text(text)
+    
+    def stream_translate_and_paste(self, text, cache_key=None, cancel_event=None):
+        """
+        流式翻译，并按句子增量粘贴到当前输入框
+        
+        Args:
+            text: 发送给模型的用户消息
+            cache_key: 完整译文写入缓存时使用的键，为None时不写缓存
+            cancel_event: 被设置时停止接收和粘贴
+        
+        Returns:
+            是否已处理完毕；返回False表示还未粘贴任何内容，调用方应回退到普通翻译
+        """
+        start_time = time.time()
+        buffer = SentenceBuffer()
+        pasted = []
         
+        # 整个流式过程只保存和恢复一次剪贴板
+        old_clipboard = pyperclip.paste()
+        stream = {}
         try:
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.API_KEY}"
-            }
-            
-            payload = {
-                "model": self.MODEL,
-                "messages": [
-                    {"role": "system", "content": config["SYSTEM_PROMPT"]},
-                    {"role": "user", "content": text}
-                ],
-                "temperature": config["TEMPERATURE"]
-            }
+            for delta in self.engine.translate_text_stream(text, stream):
+                if cancel_event is not None and cancel_event.is_set():
+                    print("流式翻译已取消")
+                    return True
+                piece = buffer.feed(delta)
+                if piece:
+                    if not pasted:
+                        print(f"首段译文用时: {time.time() - start_time:.2f}秒")
+                    # 第一段替换全选的原文，之后的片段追加在光标处
+                    self.paste_text(piece)
+                    pasted.append(piece)
             
-            response = requests.post(f"{self.API_HOST}/v1/chat/completions", headers=headers, json=payload)
-            response_data = response.json()
+            piece = buffer.flush()
+            if piece:
+                self.paste_text(piece)
+                pasted.append(piece)
             
-            if response.status_code == 200 and "choices" in response_data:
-                translated_text = response_data["choices"][0]["message"]["content"]
-                return translated_text.strip()
-            else:
-                error_message = response_data.get("error", {}).get("message", "未知错误")
-                return f"翻译失败: {error_message}"
-        
+            # 只有完整接收的译文才写入缓存
+            if pasted:
+                self.engine.cache_result(cache_key, stream["provider"], "".join(pasted))
+        except StreamingUnsupportedError as e:
+            print(f"API不支持流式输出，已切换为普通模式: {e}")
+            self.engine.stream_enabled = False
+            return False
         except Exception as e:
-            return f"翻译出错: {str(e)}"
+            if not pasted:
+                print(f"流式翻译出错，回退到普通模式: {e}")
+                return False
+            print(f"流式翻译中断: {e}")
+        finally:
+            if isinstance(old_clipboard, str):
+                with telemetry.span("clipboard_restore"):
+                    pyperclip.copy(old_clipboard)
+        
+        translated_text = "".join(pasted)
+        if translated_text:
+            print(f"翻译完成: {translated_text[:30]}...")
+        else:
+            print("翻译结果为空")
+        return True
     
-    def translate_selected_text(self):
+    def translate_selected_text(self, speculation=None):
         """
-        翻译选中的文本并替换
+        翻译选中的文本并替换（阻塞直到完成，供同步代码调用）
         """
-        if self.is_translating:
-            return
+        try:
+            self.core.run(self.translate_selected_text_async(speculation=speculation))
+        except asyncio.CancelledError:
+            pass
+    
+    async def translate_selected_text_async(self, trigger_time=None, typed_chars=None, speculation=None):
+        """
+        翻译选中的文本并替换，每个阶段都有单独的超时，粘贴开始前可随时取消
         
-        self.is_translating = True
+        Args:
+            trigger_time: 触发时的time.perf_counter()，用于统计排队时间
+            typed_chars: 触发手势输入到文本末尾的字符数，翻译前去掉；默认为连续空格的次数
+            speculation: 预判任务的Future，结果为剪贴板快照
+        """
+        if typed_chars is None:
+            typed_chars = self.SPACE_TRIGGER_COUNT
+        depth = self.scheduler.enter()
+        if depth > 1:
+            print(f"已有{depth - 1}个翻译任务在进行，本次触发已排队")
+        trace = telemetry.start_trace("translation")
         
         try:
-            # 先模拟按下Command+A全选文本
-            newkeyboard.press_and_release(self.CTRL_KEY + '+a')
-            
-            # 短暂延迟确保全选完成
-            time.sleep(0.1)
+            # 预判任务通常已经完成，失败时按未预判处理
+            snapshot = None
+            if speculation is not None:
+                try:
+                    snapshot = await asyncio.wrap_future(speculation)
+                except Exception as e:
+                    print(f"预判失败: {e}")
+                trace.set(speculative=snapshot is not None)
             
-            # 获取选中的文本
-            selected_text = self.get_selected_text()
+            # 全选并复制在线程中进行，不阻塞事件循环；多个任务依次获取
+            selected_text, generation = await self.scheduler.capture(
+                lambda cancelled: self.capture_selection(snapshot, typed_chars, cancelled),
+                self.config["CAPTURE_TIMEOUT"]
+            )
             
             if not selected_text or selected_text.isspace():
+                trace.status = "empty"
                 print("没有选中文本或选中的是空白文本")
-                self.is_translating = False
                 return
             
             self.original_text = selected_text
             print(f"正在翻译: {selected_text[:30]}...")
-            selected_text = selected_text[:-3]
-            # 识别内容语言，补充文本
-            lang , trust_level = langid.classify(selected_text)
-            print(lang,trust_level)
-            if lang == "zh":
-                selected_text = f"Translate into English: {selected_text}"
-            else:
-                selected_text = f"Translate into Simplified Chinese: {selected_text}"
-
-            # 调用API翻译文本
-            translated_text = self.translate_text(selected_text) # 去掉3个空格
+            if typed_chars:
+                selected_text = selected_text[:-typed_chars]
+            # 识别内容语言，确定目标语言
+            target_lang, lang, trust_level, fast_path = await asyncio.to_thread(
+                self.engine.detect_target_language, selected_text
+            )
+            print(lang, trust_level, "快速判定" if fast_path else "py3langid")
+            trace.set(chars=len(selected_text), target=target_lang, lang=lang, fast_path=fast_path)
+            
+            # 流式模式下边接收边粘贴，失败时回退到普通模式；
+            # 需要切分的长文本走并发翻译，缓存命中时直接粘贴
+            translated_text = None
+            terms = self.engine.match_terms(selected_text, target_lang)
+            local = self.engine.use_local(selected_text, target_lang, terms)
+            trace.set(engine="local" if local else "remote")
+            incremental = self.engine.memory is not None and not local
+            if (self.engine.stream_enabled and self.engine.API_KEY and not local and not incremental
+                    and len(selected_text) <= self.config["CHUNK_MAX_CHARS"]
+                    and self.scheduler.streaming_allowed()):
+                message, key, translated_text = self.engine.lookup_cache(selected_text, target_lang, terms)
+                trace.set(stream=True, cache_hit=translated_text is not None)
+                if translated_text is None:
+                    handled = await self.scheduler.exclusive(
+                        lambda cancelled: self.stream_translate_and_paste(message, key, cancelled),
+                        self.config["TRANSLATE_TIMEOUT"]
+                    )
+                    if handled:
+                        return
+            
+            # 调用API翻译文本，相同原文正在翻译时共享同一个请求
+            job_key = (selected_text, target_lang)
+            if translated_text is None:
+                if not self.engine.API_KEY and not local:
+                    translated_text = "错误：请先设置API_KEY"
+                else:
+                    if incremental:
+                        # 增量翻译：与同一应用中上次的原文比较，只翻译改动的句子
+                        translate = lambda: self.engine.translate_incremental_async(
+                            selected_text, target_lang, self.current_app
+                        )
+                    else:
+                        translate = lambda: self.engine.translate_async(selected_text, target_lang, terms)
+                    try:
+                        translated_text = await self.scheduler.translate(
+                            job_key,
+                            translate,
+                            generation,
+                            self.config["TRANSLATE_TIMEOUT"]
+                        )
+                    except APIError as e:
+                        trace.status = "error"
+                        translated_text = f"翻译失败: {e.message}"
             
             # 替换选中的文本
             if translated_text and translated_text != "错误：请先设置API_KEY":
-                # 确保文本已被选中
-                self.replace_selected_text(translated_text)
-                print(f"翻译完成: {translated_text[:30]}...")
+                if self.scheduler.superseded(job_key, generation):
+                    # 之后又触发了相同的原文，由那个任务负责粘贴，避免重复粘贴
+                    return
+                if self.scheduler.is_latest(generation):
+                    await self.scheduler.paste(
+                        lambda: self.replace_selected_text(translated_text), self.config["PASTE_TIMEOUT"]
+                    )
+                    print(f"翻译完成: {translated_text[:30]}...")
+                else:
+                    await self.scheduler.paste(lambda: self.copy_result(translated_text))
+                print(f"连接统计: {self.engine.http_client.stats()}")
+                if self.engine.cache is not None:
+                    print(f"缓存统计: {self.engine.cache.stats()}")
+                print(f"语言识别统计: {self.engine.language_detector.stats()}")
+                if self.engine.local is not None:
+                    print(f"本地翻译统计: {self.engine.local.stats()}")
+                if self.engine.memory is not None:
+                    print(f"增量翻译统计: {self.engine.memory.stats()}")
+                if self.engine.hedge_enabled:
+                    print(f"对冲统计: {self.engine.hedge_stats()}")
+                if len(self.engine.providers) > 1:
+                    print(f"服务状态: {self.engine.router.stats()}")
+                if trigger_time is not None:
+                    print(f"触发到完成用时: {time.perf_counter() - trigger_time:.2f}秒")
+                print(f"排队统计: {self.scheduler.stats()}")
             else:
+                trace.status = "error"
                 print(f"翻译失败: {translated_text}")
         
+        except asyncio.CancelledError:
+            trace.status = "cancelled"
+            print("翻译已取消，原文保持不变")
+            raise
+        
+        except StageTimeoutError as e:
+            trace.status = "timeout"
+            trace.set(stage=e.stage)
+            print(f"翻译过程超时: {e}")
+        
         except Exception as e:
+            trace.status = "error"
             print(f"翻译过程出错: {e}")
         
         finally:
-            self.is_translating = False
-
+            trace.finish()
+            self.clipboard_monitor.save()
+            self.scheduler.leave()
 
-def main(from_gui=False):
+def main(from_gui=False, show_startup_report=False):
     """
     主函数
     
     Args:
         from_gui: 是否从GUI启动，如果是则不捕获KeyboardInterrupt
+        show_startup_report: 是否在预热完成后打印启动耗时报告
     """
     try:
-        translator = SpaceTranslator()
-        translator.start(from_gui=from_gui)
+        with phase("创建翻译器"):
+            translator = SpaceTranslator()
+        translator.start(from_gui=from_gui, show_startup_report=show_startup_report)
         if from_gui:
             # 如果从GUI启动，返回translator实例以便GUI可以控制它
             return translator
@@ -272,4 +703,4 @@ def main(from_gui=False):
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(show_startup_report="--startup-report" in sys.argv)
\ No newline at end of file
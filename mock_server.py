@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SpaceTrans本地模拟API服务
+
+实现兼容OpenAI接口的/v1/chat/completions（含流式输出）和/v1/models，
+首字延迟、生成速度和抖动都可以配置，用于无网络环境下的性能测试。
+指定每分钟请求数上限时，超出的请求返回429和Retry-After，用于检验客户端限流。
+返回的"译文"就是原文本身，按约4个字符一个token的速度输出，超出请求中的max_tokens时截断。
+
+用法:
+    python mock_server.py [--port 8000] [--latency 0.3] [--token-rate 80] [--jitter 0.1] [--rpm 60]
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 估算token数时每个token对应的字符数
+CHARS_PER_TOKEN = 4
+
+
+def split_tokens(text):
+    """
+    把文本按固定字符数切成模拟的token
+    """
+    return [text[i:i + CHARS_PER_TOKEN] for i in range(0, len(text), CHARS_PER_TOKEN)] or [""]
+
+
+class MockOpenAIServer:
+    """
+    模拟API服务 - 在后台线程中运行的本地HTTP服务
+    """
+    def __init__(self, port=0, latency=0.3, token_rate=80, jitter=0.0, error_rate=0.0, rpm=0):
+        """
+        Args:
+            port: 监听端口，0表示自动分配
+            latency: 收到请求到输出第一个token的时间（秒）
+            token_rate: 每秒输出的token数，0表示不限速
+            jitter: 首字延迟的随机波动比例，0.1表示±10%
+            error_rate: 随机返回503的比例
+            rpm: 每分钟请求数上限，0表示不限制
+        """
+        self.latency = latency
+        self.token_rate = token_rate
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rpm = rpm
+        self.requests = 0
+        self.rate_limited = 0
+        # 接受的TCP连接数，用于检验连接复用
+        self.connections = 0
+        # 最近一分钟内被接受的请求时间
+        self._accepted = deque()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        """
+        服务地址，可直接作为API_HOST使用
+        """
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-server")
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def first_token_delay(self):
+        """
+        本次请求的首字延迟
+        """
+        if not self.jitter:
+            return self.latency
+        return max(self.latency * (1 + random.uniform(-self.jitter, self.jitter)), 0.0)
+
+    def admit(self):
+        """
+        按每分钟请求数上限决定是否接受请求
+
+        Returns:
+            0表示接受；正数表示拒绝，为客户端需要等待的秒数
+        """
+        if not self.rpm:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            while self._accepted and now - self._accepted[0] >= 60:
+                self._accepted.popleft()
+            if len(self._accepted) >= self.rpm:
+                self.rate_limited += 1
+                return 60 - (now - self._accepted[0])
+            self._accepted.append(now)
+        return 0
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # 关闭Nagle算法，避免小包与延迟确认叠加出约40毫秒的额外延迟
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def do_GET(self):
+                if self.path.rstrip("/") == "/v1/models":
+                    self._send_json(200, {"object": "list", "data": [{"id": "mock", "object": "model"}]})
+                else:
+                    self._send_json(404, {"error": {"message": "not found"}})
+
+            def do_HEAD(self):
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                with server._lock:
+                    server.requests += 1
+
+                if self.path.rstrip("/") != "/v1/chat/completions":
+                    self._send_json(404, {"error": {"message": "not found"}})
+                    return
+                if server.error_rate and random.random() < server.error_rate:
+                    self._send_json(503, {"error": {"message": "mock overloaded"}})
+                    return
+                retry_after = server.admit()
+                if retry_after:
+                    self._send_json(429, {"error": {"message": "mock rate limit exceeded"}},
+                                    {"Retry-After": str(max(int(retry_after + 0.999), 1))})
+                    return
+
+                user_message = payload["messages"][-1]["content"]
+                # 去掉术语和"Translate into ...: "前缀，原文即译文
+                text = user_message.split("Translate into ", 1)[-1]
+                text = text.split(": ", 1)[1] if ": " in text else text
+                tokens = split_tokens(text)
+                finish_reason = "stop"
+                if payload.get("max_tokens") and len(tokens) > payload["max_tokens"]:
+                    tokens = tokens[:payload["max_tokens"]]
+                    text = "".join(tokens)
+                    finish_reason = "length"
+                usage = {
+                    "prompt_tokens": sum(len(m["content"]) for m in payload["messages"]) // CHARS_PER_TOKEN,
+                    "completion_tokens": len(tokens)
+                }
+
+                time.sleep(server.first_token_delay())
+                if payload.get("stream"):
+                    self._send_stream(tokens, payload.get("model", "mock"))
+                else:
+                    if server.token_rate:
+                        time.sleep(len(tokens) / server.token_rate)
+                    self._send_json(200, {
+                        "object": "chat.completion",
+                        "model": payload.get("model", "mock"),
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                                     "finish_reason": finish_reason}],
+                        "usage": usage
+                    })
+
+            def _send_json(self, status, data, headers=None):
+                body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_stream(self, tokens, model):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                interval = 1 / server.token_rate if server.token_rate else 0
+                for token in tokens:
+                    chunk = {"object": "chat.completion.chunk", "model": model,
+                             "choices": [{"index": 0, "delta": {"content": token}}]}
+                    self._write_chunk(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n")
+                    if interval:
+                        time.sleep(interval)
+                self._write_chunk("data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _write_chunk(self, text):
+                data = text.encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SpaceTrans本地模拟API服务")
+    parser.add_argument("--port", type=int, default=8000, help="监听端口 (默认: 8000)")
+    parser.add_argument("--latency", type=float, default=0.3, help="首字延迟（秒）(默认: 0.3)")
+    parser.add_argument("--token-rate", type=float, default=80, help="每秒输出的token数，0表示不限速 (默认: 80)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="首字延迟的随机波动比例 (默认: 0)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="随机返回503的比例 (默认: 0)")
+    parser.add_argument("--rpm", type=int, default=0, help="每分钟请求数上限，超出时返回429，0表示不限制 (默认: 0)")
+    args = parser.parse_args(argv)
+
+    server = MockOpenAIServer(
+        args.port, args.latency, args.token_rate, args.jitter, args.error_rate, args.rpm
+    ).start()
+    print(f"模拟API服务已启动: {server.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SpaceTrans翻译服务提供方模块
+
+除主配置中的API_HOST/MODEL外，还可以在PROVIDERS中配置备用的API服务。
+每个服务持有自己的连接池客户端，并记录最近请求的耗时和成败。
+ProviderRouter按健康状况为每个请求排序服务：连续失败的服务会被熔断，
+冷却后在后台探测，恢复后重新参与路由。
+"""
+
+import threading
+import time
+from collections import deque
+
+from http_client import PooledHTTPClient, APIError
+from prompt_budget import OutputTruncatedError
+from rate_limiter import RateLimiter
+
+# 每个服务保留最近多少次请求的耗时
+SAMPLE_WINDOW = 50
+
+# 样本少于该数量时百分位数不可靠，使用配置中的固定延迟
+MIN_SAMPLES = 5
+
+# 按错误率惩罚耗时：错误率为10%的服务，排序时耗时按1 + 0.1 * ERROR_PENALTY倍计算
+ERROR_PENALTY = 10
+
+# 熔断器状态
+CLOSED = "closed"
+OPEN = "open"
+
+
+class LatencyWindow:
+    """
+    最近若干次请求耗时的滑动窗口
+    """
+    def __init__(self, size=SAMPLE_WINDOW):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q):
+        """
+        获取耗时的百分位数
+
+        Args:
+            q: 0～1之间的分位点，例如0.9表示p90
+
+        Returns:
+            对应的耗时（秒），样本不足时返回None
+        """
+        with self._lock:
+            if len(self._samples) < MIN_SAMPLES:
+                return None
+            samples = sorted(self._samples)
+        return samples[min(int(len(samples) * q), len(samples) - 1)]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._samples)
+
+
+class Provider:
+    """
+    一个兼容OpenAI接口的翻译服务
+    """
+    def __init__(self, name, api_host, api_key, model, config, rpm=None, tpm=None):
+        """
+        Args:
+            name: 服务名称，用于日志和统计
+            api_host: API地址
+            api_key: API密钥
+            model: 模型名称
+            config: 配置字典，连接池和限流参数从这里读取
+            rpm: 每分钟请求数配额，默认取RATE_LIMIT_RPM
+            tpm: 每分钟token数配额，默认取RATE_LIMIT_TPM
+        """
+        self.name = name
+        self.api_host = api_host
+        self.api_key = api_key
+        self.model = model
+        self.config = config
+        self.latency = LatencyWindow()
+        self.limiter = RateLimiter(
+            config["RATE_LIMIT_RPM"] if rpm is None else rpm,
+            config["RATE_LIMIT_TPM"] if tpm is None else tpm,
+            config["RATE_LIMIT_HEADROOM"]
+        )
+
+        # 健康状况：最近请求的成败、连续失败次数和熔断状态
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=SAMPLE_WINDOW)
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+
+        # 连接池客户端在首次使用或后台预热时创建
+        self._http_client = None
+        self._http_client_lock = threading.Lock()
+        # 异步请求所在的事件循环，见bind_loop
+        self.loop = None
+        self._closed = False
+
+    @property
+    def http_client(self):
+        """
+        长期持有的连接池客户端，复用与该服务的连接
+        """
+        if self._http_client is None:
+            with self._http_client_lock:
+                if self._closed:
+                    # 引擎已被替换并关闭，不再为它重新建立连接池
+                    raise APIError(f"服务{self.name}已关闭")
+                if self._http_client is None:
+                    self._http_client = PooledHTTPClient(
+                        self.api_host,
+                        connect_timeout=self.config["CONNECT_TIMEOUT"],
+                        read_timeout=self.config["READ_TIMEOUT"],
+                        pool_size=self.config["POOL_SIZE"],
+                        http2=self.config["HTTP2"],
+                        keepalive_interval=self.config["KEEPALIVE_INTERVAL"],
+                        loop=self.loop
+                    )
+        return self._http_client
+
+    def bind_loop(self, loop):
+        """
+        指定异步请求所在的事件循环，连接池预热时一并预热该循环中的异步连接
+        """
+        with self._http_client_lock:
+            self.loop = loop
+            if self._http_client is not None:
+                self._http_client.bind_loop(loop)
+
+    def close(self):
+        """
+        关闭已创建的连接池，之后不再创建新的连接池
+        """
+        with self._http_client_lock:
+            self._closed = True
+            if self._http_client is not None:
+                self._http_client.close()
+                self._http_client = None
+
+    def headers(self):
+        """
+        请求头
+        """
+        return {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        }
+
+    def error_rate(self):
+        """
+        最近请求中失败的比例
+        """
+        with self._lock:
+            if not self._outcomes:
+                return 0.0
+            return self._outcomes.count(False) / len(self._outcomes)
+
+    def score(self):
+        """
+        路由排序用的分数，越小越好：耗时中位数按错误率加权。样本不足时返回None
+        """
+        median = self.latency.percentile(0.5)
+        if median is None:
+            return None
+        return median * (1 + self.error_rate() * ERROR_PENALTY)
+
+    def stats(self):
+        """
+        获取该服务的健康状况
+        """
+        median = self.latency.percentile(0.5)
+        p90 = self.latency.percentile(0.9)
+        return {
+            "state": self.state,
+            "p50": round(median, 3) if median is not None else None,
+            "p90": round(p90, 3) if p90 is not None else None,
+            "error_rate": round(self.error_rate(), 3),
+            "samples": len(self.latency)
+        }
+
+
+def is_provider_failure(error):
+    """
+    判断错误是否说明服务本身不可用，应当熔断并切换到其他服务。
+    请求内容有误（400）或译文超出本地设定的max_tokens，换一个服务也一样会失败，不计入
+    """
+    if isinstance(error, OutputTruncatedError):
+        return False
+    if isinstance(error, APIError):
+        return error.status_code != 400
+    return True
+
+
+class ProviderRouter:
+    """
+    服务路由 - 按健康状况排序服务，管理熔断器并在后台探测熔断的服务
+    """
+    def __init__(self, providers, failure_threshold=3, cooldown=30):
+        """
+        Args:
+            providers: Provider列表，排在前面的服务在分数相同时优先
+            failure_threshold: 连续失败多少次后熔断
+            cooldown: 熔断后多久开始探测（秒）
+        """
+        self.providers = providers
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+
+        # 探测线程只在有服务被熔断时才工作，close后退出
+        self._wake = threading.Condition()
+        self._probe_thread = None
+        self._closed = False
+
+    def ranked(self):
+        """
+        按健康状况排序的可用服务。还没有足够样本的服务保持配置中的位置，
+        不会抢在已知健康的主服务之前；有样本的服务在它们所占的位置之间按分数排序。
+        全部熔断时仍按熔断先后返回，保证总有服务可用
+
+        Returns:
+            [Provider]
+        """
+        available = [p for p in self.providers if p.state == CLOSED]
+        if not available:
+            return sorted(self.providers, key=lambda p: p.opened_at)
+
+        scores = [p.score() for p in available]
+        sampled = sorted(
+            (score, index) for index, score in enumerate(scores) if score is not None
+        )
+        ranked = list(available)
+        slots = [index for index, score in enumerate(scores) if score is not None]
+        for slot, (_, index) in zip(slots, sampled):
+            ranked[slot] = available[index]
+        return ranked
+
+    def record_success(self, provider, seconds=None):
+        """
+        记录一次成功的请求
+
+        Args:
+            seconds: 请求耗时，不计入耗时统计时为None
+        """
+        if seconds is not None:
+            provider.latency.add(seconds)
+        with provider._lock:
+            provider._outcomes.append(True)
+            provider.consecutive_failures = 0
+
+    def record_failure(self, provider, error):
+        """
+        记录一次失败的请求，连续失败达到阈值时熔断该服务
+        """
+        if not is_provider_failure(error):
+            return
+        with provider._lock:
+            provider._outcomes.append(False)
+            provider.consecutive_failures += 1
+            if provider.state == CLOSED and provider.consecutive_failures >= self.failure_threshold:
+                provider.state = OPEN
+                provider.opened_at = time.monotonic()
+                print(f"服务{provider.name}连续失败{provider.consecutive_failures}次，已暂停使用: {error}")
+            elif provider.state == OPEN:
+                provider.opened_at = time.monotonic()
+            else:
+                return
+        self._ensure_probe_thread()
+        with self._wake:
+            self._wake.notify()
+
+    def probe(self, provider):
+        """
+        探测熔断的服务是否恢复：请求模型列表，返回2xx即视为恢复
+        """
+        try:
+            status_code = provider.http_client.get_status("/v1/models", headers=provider.headers())
+        except Exception as e:
+            status_code = None
+            error = e
+        else:
+            error = APIError(f"探测返回状态码{status_code}", status_code)
+
+        if status_code is not None and 200 <= status_code < 300:
+            with provider._lock:
+                provider.state = CLOSED
+                provider.consecutive_failures = 0
+            print(f"服务{provider.name}已恢复")
+            return True
+
+        with provider._lock:
+            provider.opened_at = time.monotonic()
+        print(f"服务{provider.name}仍不可用: {error}")
+        return False
+
+    def stats(self):
+        """
+        获取所有服务的健康状况
+
+        Returns:
+            {服务名称: 健康状况}
+        """
+        return {provider.name: provider.stats() for provider in self.providers}
+
+    def close(self):
+        """
+        停止探测线程，用于替换为新配置的引擎之后
+        """
+        with self._wake:
+            self._closed = True
+            self._wake.notify_all()
+
+    def _ensure_probe_thread(self):
+        with self._wake:
+            if self._probe_thread is None and not self._closed:
+                self._probe_thread = threading.Thread(target=self._probe_loop, name="provider-probe")
+                self._probe_thread.daemon = True
+                self._probe_thread.start()
+
+    def _probe_loop(self):
+        # 没有熔断的服务时一直休眠，否则睡到最早一个冷却结束；close后退出
+        while not self._closed:
+            now = time.monotonic()
+            due = [p for p in self.providers if p.state == OPEN and now - p.opened_at >= self.cooldown]
+            for provider in due:
+                if self._closed:
+                    return
+                self.probe(provider)
+
+            with self._wake:
+                # 在锁内检查状态，避免错过检查之后、等待之前发出的通知
+                if self._closed:
+                    return
+                opened = [p.opened_at for p in self.providers if p.state == OPEN]
+                if opened:
+                    self._wake.wait(max(min(opened) + self.cooldown - time.monotonic(), 0.1))
+                else:
+                    self._wake.wait()
+
+
+def load_providers(config):
+    """
+    根据配置创建服务列表，第一个是主配置中的服务，其后是PROVIDERS中的备用服务。
+    备用服务未填写API_KEY、MODEL、RATE_LIMIT_RPM或RATE_LIMIT_TPM时沿用主配置
+
+    Returns:
+        [Provider]
+    """
+    providers = [Provider("primary", config["API_HOST"], config["API_KEY"], config["MODEL"], config)]
+    for index, entry in enumerate(config.get("PROVIDERS") or []):
+        if not entry.get("API_HOST"):
+            print(f"PROVIDERS中第{index + 1}项缺少API_HOST，已忽略")
+            continue
+        providers.append(Provider(
+            entry.get("NAME") or entry["API_HOST"],
+            entry["API_HOST"],
+            entry.get("API_KEY") or config["API_KEY"],
+            entry.get("MODEL") or config["MODEL"],
+            config,
+            rpm=entry.get("RATE_LIMIT_RPM"),
+            tpm=entry.get("RATE_LIMIT_TPM")
+        ))
+    return providers
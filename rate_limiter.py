@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SpaceTrans限流模块
+
+按服务的每分钟请求数（RPM）和每分钟token数（TPM）在本地限流，
+两个令牌桶的速率都留出一定余量，持续翻译时吞吐量稳定在配额之下，而不是反复触发429后停顿。
+等待中的请求按优先级排队：键盘触发的翻译总是先于批量翻译和预取。
+服务返回429时按Retry-After暂停该服务的全部请求，没有Retry-After时按带抖动的指数退避等待。
+"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+# 请求优先级，数值越小越优先
+INTERACTIVE = 0
+BATCH = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+# 令牌桶最多积攒多少秒的额度。桶容量加上一分钟的补充量不超过配额，
+# 空闲后的突发请求也不会超限
+BURST_SECONDS = 6
+
+# 指数退避的初始等待和上限（秒）
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+
+# 当前请求的优先级，通过contextvars传递，asyncio.to_thread中执行的代码同样可以读取
+_priority = contextvars.ContextVar("spacetrans_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def request_priority(priority):
+    """
+    在这段代码中发出的翻译请求使用指定的优先级
+
+    用法:
+        with request_priority(BATCH):
+            engine.translate_segment(text, target_lang)
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority():
+    return _priority.get()
+
+
+def backoff_delay(attempt, retry_after=None):
+    """
+    第attempt次重试前的等待时间（秒）
+
+    Args:
+        attempt: 重试次数，从0开始
+        retry_after: 服务返回的Retry-After，有值时至少等待这么久
+    """
+    if retry_after is not None:
+        return retry_after
+    delay = min(BACKOFF_BASE * (2 ** attempt), BACKOFF_MAX)
+    # 一半固定一半随机，避免多个请求在同一时刻重试
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class TokenBucket:
+    """
+    令牌桶，额度可以透支，透支后等待补足
+    """
+    def __init__(self, per_minute, headroom=0.9, minimum=1):
+        """
+        Args:
+            per_minute: 每分钟的配额
+            headroom: 实际使用的配额比例
+            minimum: 桶容量的下限，保证单个请求总能通过
+        """
+        self.rate = per_minute * headroom / 60
+        self.capacity = max(self.rate * BURST_SECONDS, minimum)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """
+        额度补足到amount需要等待的时间，amount超过桶容量时按桶容量计算
+        """
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount):
+        self.level -= amount
+
+    def give_back(self, amount):
+        self.level = min(self.capacity, self.level + amount)
+
+
+class _Waiter:
+    # 排队等待额度的一个请求，线程中用Event等待，事件循环中用Future等待
+    def __init__(self, cost, loop=None):
+        self.cost = cost
+        self.loop = loop
+        self.event = threading.Event() if loop is None else None
+        self.future = None
+
+    def wake(self):
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if self.future is not None and not self.future.done():
+            self.future.set_result(None)
+
+
+class RateLimiter:
+    """
+    一个服务的限流器，线程和事件循环中都可以使用
+    """
+    def __init__(self, rpm=0, tpm=0, headroom=0.9):
+        """
+        Args:
+            rpm: 每分钟请求数配额，0表示不限制
+            tpm: 每分钟token数配额（输入加输出），0表示不限制
+            headroom: 实际使用的配额比例，留出余量给估算误差和其他客户端
+        """
+        self.requests = TokenBucket(rpm, headroom) if rpm else None
+        self.tokens = TokenBucket(tpm, headroom) if tpm else None
+        self._lock = threading.Lock()
+        self._queue = []
+        self._counter = itertools.count()
+        self._blocked_until = 0.0
+
+        self.granted = {name: 0 for name in PRIORITY_NAMES.values()}
+        self.wait_seconds = 0.0
+        self.throttled = 0
+
+    @property
+    def enabled(self):
+        return self.requests is not None or self.tokens is not None
+
+    def _enqueue(self, waiter, priority):
+        entry = (priority, next(self._counter), waiter)
+        heapq.heappush(self._queue, entry)
+        return entry
+
+    def _remove(self, entry):
+        # 放弃等待（取消或出错）时移出队列，并让新的队首重新检查
+        if entry in self._queue:
+            self._queue.remove(entry)
+            heapq.heapify(self._queue)
+            if self._queue:
+                self._queue[0][2].wake()
+
+    def _try_grant(self, entry):
+        """
+        在锁内检查队首请求能否放行
+
+        Returns:
+            0表示已放行；正数表示队首还需等待的秒数；None表示不在队首，等待被唤醒
+        """
+        if self._queue[0] is not entry:
+            return None
+        now = time.monotonic()
+        wait = self._blocked_until - now
+        cost = entry[2].cost
+        for bucket, amount in ((self.requests, 1), (self.tokens, cost)):
+            if bucket is not None:
+                bucket.refill(now)
+                wait = max(wait, bucket.wait_time(amount))
+        if wait > 0:
+            return wait
+
+        for bucket, amount in ((self.requests, 1), (self.tokens, cost)):
+            if bucket is not None:
+                bucket.take(amount)
+        heapq.heappop(self._queue)
+        self.granted[PRIORITY_NAMES[entry[0]]] += 1
+        if self._queue:
+            self._queue[0][2].wake()
+        return 0
+
+    def acquire(self, cost=0, priority=None):
+        """
+        在线程中等待额度
+
+        Args:
+            cost: 本次请求预计消耗的token数
+            priority: 优先级，默认取当前上下文的优先级
+        """
+        if not self.enabled and not self.blocked_for():
+            return
+        priority = current_priority() if priority is None else priority
+        waiter = _Waiter(cost)
+        start = time.monotonic()
+        with self._lock:
+            entry = self._enqueue(waiter, priority)
+        try:
+            while True:
+                with self._lock:
+                    wait = self._try_grant(entry)
+                    if wait == 0:
+                        break
+                    waiter.event.clear()
+                waiter.event.wait(wait)
+        except BaseException:
+            with self._lock:
+                self._remove(entry)
+            raise
+        self._record_wait(start)
+
+    async def acquire_async(self, cost=0, priority=None):
+        """
+        acquire的异步版本，等待时不占用线程，可以被取消
+        """
+        if not self.enabled and not self.blocked_for():
+            return
+        priority = current_priority() if priority is None else priority
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(cost, loop)
+        start = time.monotonic()
+        with self._lock:
+            entry = self._enqueue(waiter, priority)
+        try:
+            while True:
+                with self._lock:
+                    wait = self._try_grant(entry)
+                    if wait == 0:
+                        break
+                    waiter.future = loop.create_future()
+                await asyncio.wait({waiter.future}, timeout=wait)
+        except BaseException:
+            with self._lock:
+                self._remove(entry)
+            raise
+        self._record_wait(start)
+
+    def _record_wait(self, start):
+        with self._lock:
+            self.wait_seconds += time.monotonic() - start
+
+    def settle(self, reserved, actual):
+        """
+        请求完成后按实际用量修正token桶：预留多了退回，少了补扣
+        """
+        if self.tokens is None or actual is None:
+            return
+        with self._lock:
+            self.tokens.refill(time.monotonic())
+            if actual < reserved:
+                self.tokens.give_back(reserved - actual)
+            else:
+                self.tokens.take(actual - reserved)
+
+    def throttle(self, delay):
+        """
+        服务返回429后，在delay秒内暂停放行该服务的所有请求（包括未配置配额时）
+        """
+        with self._lock:
+            self.throttled += 1
+            self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+
+    def blocked_for(self):
+        """
+        距离暂停结束还有多少秒
+        """
+        with self._lock:
+            return max(self._blocked_until - time.monotonic(), 0.0)
+
+    def stats(self):
+        """
+        获取统计
+
+        Returns:
+            {"interactive"/"batch": 各优先级放行数, "waiting": 排队数,
+             "wait_seconds": 累计等待秒数, "throttled": 收到429的次数}
+        """
+        with self._lock:
+            stats = dict(self.granted)
+            stats.update(
+                waiting=len(self._queue),
+                wait_seconds=round(self.wait_seconds, 3),
+                throttled=self.throttled
+            )
+        return stats
@@ -113,6 +113,32 @@ a = Analysis(
         'tkinter.messagebox',
         'config_manager', 
         'main',
+        'http_client',
+        'streaming',
+        'translation_cache',
+        'clipboard_monitor',
+        'lang_detect',
+        'segmenter',
+        'translation_engine',
+        'async_core',
+        'scheduler',
+        'providers',
+        'telemetry',
+        'input_backend',
+        'prompt_budget',
+        'local_engine',
+        'glossary',
+        'config_watcher',
+        'selection_source',
+        'incremental',
+        'rate_limiter',
+        'keystroke',
+        'numpy',
+        'lazy_import',
+        'requests',
+        'pyperclip',
+        'py3langid',
+        'sqlite3',
         'threading',
         'json',
         'os',
@@ -207,7 +233,7 @@ def main():
     print("=== SpaceTransForMac启动器 ===")
     
     # 检查必要的依赖
-    required_modules = ["pynput", "pyperclip", "requests", "tkinter","py3langid","keyboard"]
+    required_modules = ["pynput", "pyperclip", "requests", "tkinter","py3langid"]
     missing_modules = [m for m in required_modules if not check_dependency(m)]
     
     if missing_modules:
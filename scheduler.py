@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SpaceTrans翻译任务调度模块
+
+翻译进行中再次触发时不再丢弃：每次触发都作为一个任务排队执行。
+获取选中文本和粘贴分别串行进行，API请求可以并发；
+相同原文的任务合并为一次API请求，共享同一个结果。
+所有方法都在AsyncCore的事件循环中调用，统计信息可以从任意线程读取。
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager
+
+import telemetry
+from async_core import run_stage
+
+
+class TranslationScheduler:
+    """
+    翻译任务调度器 - 排队、合并重复请求并统计排队情况
+    """
+    def __init__(self):
+        self._capture_lock = asyncio.Lock()
+        self._paste_lock = asyncio.Lock()
+
+        # 每次获取选中文本后加一，用来判断输入焦点是否可能已经移到别处
+        self._generation = 0
+
+        # 正在进行的翻译请求：(原文, 目标语言) -> Task
+        self._inflight = {}
+        
+        # 每个原文最近一次被触发时的获取序号，用于判断结果由哪个任务粘贴
+        self._claims = {}
+
+        self._lock = threading.Lock()
+        self._depth = 0
+        self._max_depth = 0
+        self._jobs = 0
+        self._coalesced = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    @property
+    def busy(self):
+        """
+        是否有未完成的任务
+        """
+        with self._lock:
+            return self._depth > 0
+
+    def enter(self):
+        """
+        登记一个新任务，触发时在监听线程中调用
+        """
+        with self._lock:
+            self._depth += 1
+            self._jobs += 1
+            self._max_depth = max(self._max_depth, self._depth)
+            return self._depth
+
+    def leave(self):
+        """
+        任务结束（无论成功、失败还是取消）时调用
+        """
+        with self._lock:
+            self._depth -= 1
+            if self._depth == 0:
+                self._claims.clear()
+
+    async def capture(self, func, timeout=None):
+        """
+        串行获取选中文本，前面的任务还在复制或粘贴时等待
+
+        Args:
+            func: 在线程中执行的函数，参数为取消标记threading.Event。超时或被取消后标记置位，
+                func应在每次模拟按键前检查，尽快退出
+
+        Returns:
+            (选中的文本, 本次获取的序号)
+        """
+        async with self._waiting(self._capture_lock):
+            result = await _run_thread("获取选中文本", func, timeout, threading.Event())
+            self._generation += 1
+            return result, self._generation
+
+    def is_latest(self, generation):
+        """
+        判断该次获取之后是否没有再获取过其他输入框的文本，
+        只有最新的任务才能确定光标仍停留在原来的输入框中
+        """
+        return generation == self._generation
+
+    def superseded(self, key, generation):
+        """
+        判断之后是否又有任务触发了相同的原文，此时结果交给那个任务粘贴
+        """
+        with self._lock:
+            return self._claims.get(key, generation) > generation
+
+    async def translate(self, key, factory, generation, timeout=None):
+        """
+        执行翻译请求，相同key的请求正在进行时直接等待它的结果
+
+        Args:
+            key: 用于合并请求的键，通常是(原文, 目标语言)
+            factory: 无参数函数，返回执行翻译的协程
+            generation: 本任务获取选中文本时的序号
+            timeout: 本任务等待结果的超时时间，超时不影响其他等待同一请求的任务
+        """
+        with self._lock:
+            self._claims[key] = max(self._claims.get(key, 0), generation)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            with self._lock:
+                self._coalesced += 1
+            print("相同的文本正在翻译，等待已有请求的结果")
+        # shield保证一个任务超时或被取消时不会中断其他任务共享的请求
+        return await run_stage("翻译", asyncio.shield(task), timeout)
+
+    async def paste(self, func, timeout=None):
+        """
+        串行粘贴，粘贴开始后不再响应取消；超时时等粘贴线程结束后才释放锁并报告超时
+        """
+        async with self._waiting(self._paste_lock):
+            return await _run_thread("粘贴", func, timeout)
+
+    async def exclusive(self, func, timeout=None):
+        """
+        同时占用获取和粘贴，流式翻译边接收边粘贴时使用
+
+        Args:
+            func: 在线程中执行的函数，参数为取消标记threading.Event，用法同capture
+        """
+        async with self._waiting(self._capture_lock), self._waiting(self._paste_lock):
+            return await _run_thread("翻译", func, timeout, threading.Event())
+
+    def streaming_allowed(self):
+        """
+        流式翻译会持续占用输入框，只在没有其他任务排队时使用
+        """
+        with self._lock:
+            return self._depth <= 1
+
+    def cancel_all(self):
+        """
+        取消所有正在进行的翻译请求
+        """
+        for task in list(self._inflight.values()):
+            task.cancel()
+
+    def stats(self):
+        """
+        获取排队统计
+
+        Returns:
+            包含当前和最大排队数、任务数、合并次数和等待时间的字典
+        """
+        with self._lock:
+            return {
+                "queue_depth": self._depth,
+                "max_queue_depth": self._max_depth,
+                "jobs": self._jobs,
+                "coalesced": self._coalesced,
+                "avg_wait": self._wait_total / self._jobs if self._jobs else 0.0,
+                "max_wait": self._wait_max
+            }
+
+    @asynccontextmanager
+    async def _waiting(self, lock):
+        # 获取锁，并把排队等待的时间计入统计
+        start = time.perf_counter()
+        async with lock:
+            waited = time.perf_counter() - start
+            telemetry.record_span("queue_wait", waited, start)
+            with self._lock:
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            yield
+
+
+async def _run_thread(stage, func, timeout, cancelled=None):
+    """
+    在线程中执行func并等待。超时或被取消时先置位取消标记，等线程退出后再抛出异常，
+    调用方持有的锁一直保留到线程退出，它还没发出的按键和剪贴板恢复不会与下一个任务交错
+
+    Args:
+        cancelled: 取消标记，不为None时作为参数传给func
+    """
+    args = () if cancelled is None else (cancelled,)
+    future = asyncio.ensure_future(asyncio.to_thread(func, *args))
+    try:
+        return await run_stage(stage, asyncio.shield(future), timeout)
+    except BaseException:
+        if cancelled is not None:
+            cancelled.set()
+        while not future.done():
+            try:
+                await asyncio.wait({future})
+            except asyncio.CancelledError:
+                pass
+        if not future.cancelled():
+            future.exception()
+        raise
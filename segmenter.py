@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SpaceTrans文本切分模块
+
+把长文本按段落、行、句子切分成适合单独翻译的片段，片段之间的空白和换行
+原样保留，译文按原顺序拼接后格式与原文一致。
+"""
+
+import re
+
+# 段落分隔：包含空行的空白
+PARAGRAPH_SEP = re.compile(r"(\s*\n[ \t\r\f\v]*\n\s*)")
+
+# 行分隔
+LINE_SEP = re.compile(r"(\s*\n\s*)")
+
+# 句子分隔：英文标点后的空白，或中文标点之后（中文句子之间通常没有空白）
+SENTENCE_SEP = re.compile(r"((?<=[.!?;])\s+|(?<=[。！？；])\s*)")
+
+# 硬切分时优先在空白处断开
+WORD_SEP = re.compile(r"(\s+)")
+
+
+def _split_keep(text, pattern):
+    # 按分隔符切分，返回 [(片段, 是否为正文)]，空片段被丢弃
+    parts = []
+    for i, part in enumerate(pattern.split(text)):
+        if part:
+            parts.append((part, i % 2 == 0))
+    return parts
+
+
+def _split_long(body, max_chars, patterns):
+    # 依次用更细的分隔符切分过长的正文
+    if len(body) <= max_chars:
+        return [(body, True)]
+    if not patterns:
+        return [(body[i:i + max_chars], True) for i in range(0, len(body), max_chars)]
+
+    result = []
+    for part, is_body in _split_keep(body, patterns[0]):
+        if is_body:
+            result.extend(_split_long(part, max_chars, patterns[1:]))
+        else:
+            result.append((part, False))
+    return result
+
+
+def segment_text(text, max_chars=1500):
+    """
+    把文本切分成不超过max_chars的片段
+
+    Args:
+        text: 原文
+        max_chars: 单个片段的最大字符数
+
+    Returns:
+        [(片段文本, 是否需要翻译)] 列表，所有片段按顺序拼接后与原文完全相同。
+        需要翻译的片段首尾不含空白
+    """
+    units = _split_long(text, max_chars, [PARAGRAPH_SEP, LINE_SEP, SENTENCE_SEP, WORD_SEP])
+    stripped = _strip_edges(units)
+
+    # 相邻的小片段合并成一个请求，合并后的片段内部格式由模型保留
+    segments = []
+    pending = []
+    pending_len = 0
+    for part, is_body in stripped:
+        if is_body and pending and pending_len + len(part) > max_chars:
+            segments.extend(_flush(pending))
+            pending = []
+            pending_len = 0
+        if not is_body and not pending:
+            segments.append((part, False))
+            continue
+        pending.append((part, is_body))
+        pending_len += len(part)
+    segments.extend(_flush(pending))
+    return segments
+
+
+def split_sentences(text, max_chars=200):
+    """
+    按行和句子切分文本，相邻的短句不合并，供逐句翻译的本地模型使用
+
+    Args:
+        text: 原文
+        max_chars: 单句的最大字符数，更长的句子继续切分
+
+    Returns:
+        [(片段文本, 是否需要翻译)] 列表，格式同segment_text
+    """
+    units = []
+    for line, is_body in _split_keep(text, LINE_SEP):
+        if not is_body:
+            units.append((line, False))
+            continue
+        for sentence, is_sentence in _split_keep(line, SENTENCE_SEP):
+            if is_sentence and len(sentence) > max_chars:
+                units.extend(segment_text(sentence, max_chars))
+            else:
+                units.append((sentence, is_sentence))
+    return _strip_edges(units)
+
+
+def join_translations(parts, translations, target_lang):
+    """
+    把逐句译文按原文的分隔符拼接
+
+    Args:
+        parts: split_sentences的结果
+        translations: 与parts中需要翻译的片段一一对应的译文
+        target_lang: 目标语言代码
+
+    Returns:
+        完整译文
+    """
+    translations = iter(translations)
+    pieces = []
+    previous_body = False
+    for part, translatable in parts:
+        if not translatable:
+            pieces.append(part)
+            previous_body = False
+            continue
+        if previous_body and target_lang == "en":
+            # 中文句子之间没有空白，译成英文后需要补上空格
+            pieces.append(" ")
+        pieces.append(next(translations))
+        previous_body = True
+    return "".join(pieces)
+
+
+def _strip_edges(units):
+    # 把首尾空白从正文中剥离出来，作为分隔符原样保留
+    stripped = []
+    for part, is_body in units:
+        if not is_body or not part.strip():
+            stripped.append((part, False))
+            continue
+        body = part.strip()
+        start = part.index(body)
+        if start:
+            stripped.append((part[:start], False))
+        stripped.append((body, True))
+        if start + len(body) < len(part):
+            stripped.append((part[start + len(body):], False))
+    return stripped
+
+
+def _flush(pending):
+    # 合并待处理的片段，末尾的分隔符单独保留，保证片段首尾没有空白
+    tail = []
+    while pending and not pending[-1][1]:
+        tail.insert(0, pending.pop())
+    if not pending:
+        return tail
+    return [("".join(part for part, _ in pending), True)] + tail
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SpaceTrans选区读取模块
+
+Linux上高亮的文本会立即成为PRIMARY选区，可以直接读取，
+不需要模拟全选、复制再等待剪贴板更新，也不会改动用户的剪贴板。
+X11下通过xclip或xsel读取，Wayland下通过wl-paste读取；
+读取失败或选区为空时，由调用方回退到全选并复制的剪贴板方式。
+
+直接运行本模块可以检查PRIMARY选区是否可用并测量读取耗时，可以在Xvfb中运行:
+    xvfb-run -a python selection_source.py --check [--count 20]
+"""
+
+import argparse
+import os
+import platform
+import shutil
+import subprocess
+import time
+
+# 选区来源：clipboard为全选并复制，primary为优先读取PRIMARY选区
+SELECTION_SOURCES = ("clipboard", "primary")
+
+# 读取和写入PRIMARY选区的命令，按顺序选择第一个可用的
+X11_COMMANDS = (
+    (["xclip", "-o", "-selection", "primary"], ["xclip", "-i", "-selection", "primary"]),
+    (["xsel", "--primary", "--output"], ["xsel", "--primary", "--input"])
+)
+WAYLAND_COMMANDS = (
+    (["wl-paste", "--primary", "--no-newline"], ["wl-copy", "--primary"]),
+)
+
+# 读取选区的超时时间（秒），选区所有者没有响应时放弃
+READ_TIMEOUT = 0.5
+
+
+class SelectionSource:
+    """
+    选区读取接口
+    """
+    name = "none"
+
+    def read(self):
+        """
+        读取当前选中的文本
+
+        Returns:
+            选中的文本，无法读取或没有选中文本时返回None
+        """
+        return None
+
+
+class PrimarySelection(SelectionSource):
+    """
+    通过命令行工具读取PRIMARY选区
+    """
+    name = "primary"
+
+    def __init__(self, read_command, write_command=None, timeout=READ_TIMEOUT):
+        """
+        Args:
+            read_command: 把选区内容输出到标准输出的命令
+            write_command: 从标准输入设置选区内容的命令，只用于检查
+            timeout: 读取超时时间（秒）
+        """
+        self.read_command = read_command
+        self.write_command = write_command
+        self.timeout = timeout
+
+    def read(self):
+        try:
+            result = subprocess.run(self.read_command, capture_output=True, timeout=self.timeout)
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        if result.returncode != 0 or not result.stdout:
+            return None
+        return result.stdout.decode("utf-8", errors="replace")
+
+    def write(self, text):
+        """
+        设置选区内容，用于检查读取是否正常
+        """
+        # xclip和xsel会在后台保持选区所有权，不等待它们退出
+        process = subprocess.Popen(
+            self.write_command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        process.communicate(text.encode("utf-8"), timeout=self.timeout)
+
+
+def find_primary_selection():
+    """
+    按当前桌面环境查找可用的PRIMARY选区读取方式
+
+    Returns:
+        PrimarySelection，当前平台不支持或未安装工具时返回None
+    """
+    if platform.system() != "Linux":
+        return None
+    candidates = []
+    if os.environ.get("WAYLAND_DISPLAY"):
+        candidates.extend(WAYLAND_COMMANDS)
+    if os.environ.get("DISPLAY"):
+        candidates.extend(X11_COMMANDS)
+    for read_command, write_command in candidates:
+        if shutil.which(read_command[0]) and shutil.which(write_command[0]):
+            return PrimarySelection(read_command, write_command)
+    return None
+
+
+def create_selection_source(source):
+    """
+    根据配置创建选区读取方式
+
+    Args:
+        source: SELECTION_SOURCE配置项
+
+    Returns:
+        SelectionSource，使用剪贴板方式时返回None
+    """
+    if source not in SELECTION_SOURCES:
+        print(f"未知的SELECTION_SOURCE: {source}，使用clipboard")
+        return None
+    if source == "clipboard":
+        return None
+    selection = find_primary_selection()
+    if selection is None:
+        print("当前环境无法读取PRIMARY选区（需要Linux及xclip、xsel或wl-clipboard），使用剪贴板方式")
+    return selection
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="检查PRIMARY选区是否可用并测量读取耗时")
+    parser.add_argument("--check", action="store_true", help="先写入一段测试文本再读取并核对")
+    parser.add_argument("--count", type=int, default=20, help="读取次数 (默认: 20)")
+    args = parser.parse_args(argv)
+
+    selection = find_primary_selection()
+    if selection is None:
+        print("当前环境无法读取PRIMARY选区（需要Linux及xclip、xsel或wl-clipboard）")
+        return 1
+    print(f"读取命令: {' '.join(selection.read_command)}")
+
+    expected = None
+    if args.check:
+        expected = f"SpaceTrans选区测试 {time.time()}"
+        selection.write(expected)
+
+    durations = []
+    text = None
+    for _ in range(args.count):
+        start = time.perf_counter()
+        text = selection.read()
+        durations.append(time.perf_counter() - start)
+    durations.sort()
+    print(f"读取{args.count}次: p50 {durations[len(durations) // 2] * 1000:.1f} 毫秒，"
+          f"最大 {durations[-1] * 1000:.1f} 毫秒")
+    print(f"选区内容: {text[:50] if text else '（空）'}")
+    if expected is not None and text != expected:
+        print("读取到的内容与写入的不一致")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
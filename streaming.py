@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SpaceTrans流式翻译模块
+
+负责解析 /v1/chat/completions 的SSE（server-sent events）响应，
+并把逐token到达的译文切分成按句粘贴的增量片段。
+"""
+
+import json
+import re
+
+from http_client import APIError
+
+# 句子结束符：中文标点直接断句，英文标点后需跟空白才算断句（避免拆开小数和缩写）
+SENTENCE_END = re.compile(r"[。！？；\n]|[.!?;](?=\s)")
+
+
+class StreamingUnsupportedError(Exception):
+    """
+    API服务不支持流式输出时抛出，调用方应回退到普通请求
+    """
+    pass
+
+
+def iter_sse_data(lines):
+    """
+    解析SSE事件流，逐个返回事件的data字段
+
+    Args:
+        lines: 响应体的行迭代器
+
+    Yields:
+        每个事件的data字符串，遇到 [DONE] 时结束
+    """
+    data_lines = []
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        if not line:
+            # 空行表示一个事件结束
+            if data_lines:
+                data = "\n".join(data_lines)
+                data_lines = []
+                if data.strip() == "[DONE]":
+                    return
+                yield data
+            continue
+        if line.startswith(":"):
+            # 注释行（常用作心跳），忽略
+            continue
+        if line.startswith("data:"):
+            data_lines.append(line[5:].lstrip(" "))
+
+    if data_lines:
+        data = "\n".join(data_lines)
+        if data.strip() != "[DONE]":
+            yield data
+
+
+def iter_completion_deltas(lines, result=None):
+    """
+    从chat completions的SSE流中提取增量文本
+
+    Args:
+        result: 传入字典时，流中带usage的chunk（通常是最后一个）会把用量写入result["usage"]
+
+    Yields:
+        每个chunk中的增量译文
+    """
+    for data in iter_sse_data(lines):
+        chunk = json.loads(data)
+        if "error" in chunk:
+            raise APIError(chunk["error"].get("message", "未知错误"))
+        if result is not None and chunk.get("usage"):
+            result["usage"] = chunk["usage"]
+        choices = chunk.get("choices") or []
+        if not choices:
+            continue
+        content = (choices[0].get("delta") or {}).get("content")
+        if content:
+            yield content
+
+
+class SentenceBuffer:
+    """
+    句子缓冲区 - 累积流式到达的文本，凑满完整句子后再交给粘贴
+    """
+    def __init__(self, min_chars=1):
+        """
+        Args:
+            min_chars: 一次输出的最少字符数，避免过于频繁地粘贴
+        """
+        self.min_chars = min_chars
+        self._buffer = ""
+        self._started = False
+
+    def feed(self, text):
+        """
+        写入新到达的文本
+
+        Returns:
+            可以立即粘贴的完整句子，没有则返回空字符串
+        """
+        self._buffer += text
+        if not self._started:
+            # 与非流式模式的strip()保持一致，丢弃开头的空白
+            self._buffer = self._buffer.lstrip()
+            if not self._buffer:
+                return ""
+
+        last_end = -1
+        for match in SENTENCE_END.finditer(self._buffer):
+            last_end = match.end()
+        if last_end < self.min_chars:
+            return ""
+
+        # 句末之后的空白留在缓冲区，最后一段时可以被去掉
+        ready = self._buffer[:last_end]
+        self._buffer = self._buffer[last_end:]
+        self._started = True
+        return ready
+
+    def flush(self):
+        """
+        取出缓冲区中剩余的全部文本
+        """
+        rest = self._buffer.rstrip()
+        self._buffer = ""
+        if rest:
+            self._started = True
+        return rest
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SpaceTrans性能监测模块
+
+把每次翻译拆分成若干计时片段（全选、复制、语言识别、建立连接、首个token、生成、粘贴、恢复剪贴板等），
+每次翻译结束后写一行JSON到~/.spacetrans下的滚动日志，同时累计到直方图和计数器中，
+可选地在本机端口上以Prometheus文本格式提供。
+
+当前翻译通过contextvars传递，asyncio.to_thread中执行的代码也能把片段记到同一次翻译上。
+"""
+
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging.handlers import RotatingFileHandler
+
+from config_manager import CONFIG_DIR
+
+# 计时日志文件
+TELEMETRY_FILE = os.path.join(CONFIG_DIR, "telemetry.jsonl")
+
+# 单个日志文件的最大字节数和保留的旧文件数
+TELEMETRY_MAX_BYTES = 1024 * 1024
+TELEMETRY_BACKUPS = 3
+
+# 直方图的桶上限（秒）
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# 当前正在进行的翻译
+_current_trace = contextvars.ContextVar("spacetrans_trace", default=None)
+
+# 日志记录器，调用configure之后才写文件。
+# 是否已开启以自己添加的处理器为准，其他代码（例如pytest）也可能向记录器添加处理器
+_logger = logging.getLogger("spacetrans.telemetry")
+_logger.propagate = False
+_handler = None
+
+# 已启动的指标服务：端口 -> 服务对象
+_servers = {}
+
+
+class Histogram:
+    """
+    累计直方图
+    """
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    计数器和直方图的集合，可以渲染为Prometheus文本格式
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._collectors = {}
+
+    def observe(self, name, value, **labels):
+        """
+        向直方图记录一个值
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        """
+        计数器加一
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def add_collector(self, prefix, func):
+        """
+        注册一个在导出时调用的统计函数，返回字典中的数值作为gauge导出。
+        同一前缀重复注册时替换之前的函数
+
+        Args:
+            prefix: 指标名前缀，例如spacetrans_cache
+            func: 无参数函数，返回 {名称: 数值}
+        """
+        with self._lock:
+            self._collectors[prefix] = func
+
+    def render(self):
+        """
+        渲染为Prometheus文本格式
+        """
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+            collectors = sorted(self._collectors.items())
+            snapshots = [
+                (key, list(h.buckets), list(h.counts), h.total, h.count) for key, h in histograms
+            ]
+
+        declared = set()
+        for (name, labels), value in counters:
+            if name not in declared:
+                lines.append(f"# TYPE {name} counter")
+                declared.add(name)
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        for (name, labels), buckets, counts, total, count in snapshots:
+            if name not in declared:
+                lines.append(f"# TYPE {name} histogram")
+                declared.add(name)
+            for bound, bucket_count in zip(buckets, counts):
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', repr(bound)),))} {bucket_count}")
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+        for prefix, func in collectors:
+            try:
+                values = func()
+            except Exception as e:
+                lines.append(f"# {prefix} 统计失败: {e}")
+                continue
+            for key, value in sorted(values.items()):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                lines.append(f"# TYPE {prefix}_{key} gauge")
+                lines.append(f"{prefix}_{key} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+# 全局指标
+metrics = MetricsRegistry()
+
+
+class Trace:
+    """
+    一次翻译的计时记录
+    """
+    def __init__(self, name):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.timestamp = time.time()
+        self.start = time.perf_counter()
+        self.attrs = {}
+        self.status = "ok"
+        self.spans = []
+        self._lock = threading.Lock()
+        self._token = None
+
+    def set(self, **attrs):
+        """
+        附加属性，例如原文长度、目标语言
+        """
+        with self._lock:
+            self.attrs.update(attrs)
+
+    def add_span(self, name, start, duration, attrs=None):
+        with self._lock:
+            span = {"name": name, "offset": round(start - self.start, 6), "duration": round(duration, 6)}
+            if attrs:
+                span.update(attrs)
+            self.spans.append(span)
+
+    def finish(self, status=None):
+        """
+        结束本次翻译，写入日志并累计总耗时
+        """
+        if status is not None:
+            self.status = status
+        duration = time.perf_counter() - self.start
+        if self._token is not None:
+            try:
+                _current_trace.reset(self._token)
+            except ValueError:
+                # 在其他上下文中结束时无法还原，直接清空
+                _current_trace.set(None)
+            self._token = None
+
+        metrics.observe("spacetrans_translation_seconds", duration)
+        metrics.inc("spacetrans_translations_total", status=self.status)
+
+        if _handler is not None:
+            with self._lock:
+                record = {
+                    "trace_id": self.trace_id,
+                    "name": self.name,
+                    "timestamp": self.timestamp,
+                    "duration": round(duration, 6),
+                    "status": self.status,
+                    "attrs": dict(self.attrs),
+                    "spans": sorted(self.spans, key=lambda span: span["offset"])
+                }
+            _logger.info(json.dumps(record, ensure_ascii=False))
+        return duration
+
+
+def start_trace(name):
+    """
+    开始记录一次翻译，之后在同一上下文（包括asyncio.to_thread）中记录的片段都归入这次翻译
+
+    Returns:
+        Trace对象，结束时调用finish()
+    """
+    trace = Trace(name)
+    trace._token = _current_trace.set(trace)
+    return trace
+
+
+def current_trace():
+    """
+    当前上下文中正在进行的翻译，没有时返回None
+    """
+    return _current_trace.get()
+
+
+def record_span(name, duration, start=None, **attrs):
+    """
+    记录一个已经测得耗时的片段
+
+    Args:
+        name: 片段名称
+        duration: 耗时（秒）
+        start: 开始时的time.perf_counter()，默认按现在减去耗时推算
+    """
+    if start is None:
+        start = time.perf_counter() - duration
+    metrics.observe("spacetrans_span_seconds", duration, span=name)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_span(name, start, duration, attrs)
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    对一段代码计时，代码中可以向返回的字典补充属性
+
+    用法:
+        with span("paste") as attrs:
+            ...
+            attrs["chars"] = len(text)
+    """
+    start = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        record_span(name, time.perf_counter() - start, start, **attrs)
+
+
+def configure(path=TELEMETRY_FILE, max_bytes=TELEMETRY_MAX_BYTES, backups=TELEMETRY_BACKUPS):
+    """
+    开启计时日志，每次翻译写一行JSON，文件超过max_bytes后滚动
+    """
+    global _handler
+    if _handler is not None:
+        return
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+    except OSError as e:
+        print(f"无法写入计时日志: {e}")
+        return
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    _logger.addHandler(handler)
+    _logger.setLevel(logging.INFO)
+    _handler = handler
+
+
+def serve_metrics(port, host="127.0.0.1"):
+    """
+    在本机端口上以Prometheus文本格式提供指标，访问 http://127.0.0.1:端口/metrics。
+    同一端口只启动一次
+
+    Returns:
+        HTTP服务对象，启动失败时返回None
+    """
+    if port in _servers:
+        return _servers[port]
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    try:
+        server = ThreadingHTTPServer((host, port), Handler)
+    except OSError as e:
+        print(f"指标服务启动失败: {e}")
+        return None
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="metrics")
+    thread.daemon = True
+    thread.start()
+    _servers[port] = server
+    print(f"指标服务已启动: http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+
+import pytest
+
+# 各模块都位于仓库根目录
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config_manager import DEFAULT_CONFIG  # noqa: E402
+from mock_server import MockOpenAIServer  # noqa: E402
+
+
+@pytest.fixture
+def server():
+    """
+    没有延迟的本地模拟API服务
+    """
+    server = MockOpenAIServer(latency=0, token_rate=0).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def make_engine(server):
+    """
+    创建连接到模拟服务的翻译引擎，不读写~/.spacetrans下的缓存
+    """
+    from translation_engine import TranslationEngine
+
+    engines = []
+
+    def make(**overrides):
+        config = dict(DEFAULT_CONFIG, API_KEY="test", API_HOST=server.url, CACHE_ENABLED=False,
+                      HEDGE_ENABLED=False, KEEPALIVE_INTERVAL=0)
+        config.update(overrides)
+        engine = TranslationEngine(config)
+        engines.append(engine)
+        return engine
+
+    yield make
+    for engine in engines:
+        engine.close()
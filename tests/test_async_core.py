@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import concurrent.futures
+import threading
+
+import pytest
+
+from async_core import AsyncCore, StageTimeoutError, run_stage
+
+
+@pytest.fixture
+def core():
+    core = AsyncCore(name="test-core")
+    yield core
+    core.stop()
+
+
+def test_coroutines_run_on_the_core_thread(core):
+    async def where():
+        return threading.current_thread().name, asyncio.get_running_loop()
+
+    assert core.loop.is_running()
+    assert core.run(where(), timeout=1) == ("test-core", core.loop)
+
+
+def test_submit_from_other_threads(core):
+    async def double(value):
+        await asyncio.sleep(0.01)
+        return value * 2
+
+    results = []
+    lock = threading.Lock()
+
+    def worker(value):
+        result = core.submit(double(value)).result(1)
+        with lock:
+            results.append(result)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(2)
+    assert sorted(results) == [i * 2 for i in range(8)]
+    assert core.pending() == 0
+
+
+def test_exception_reaches_the_caller(core):
+    async def fail():
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError, match="bad request"):
+        core.run(fail(), timeout=1)
+
+    future = core.submit(fail())
+    with pytest.raises(ValueError):
+        future.result(1)
+    # 出错后事件循环仍然可用
+    assert core.run(asyncio.sleep(0, result="ok"), timeout=1) == "ok"
+
+
+def test_cancel_all_cancels_pending_tasks(core):
+    started = threading.Event()
+    cancelled = threading.Event()
+
+    async def wait_forever():
+        started.set()
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    future = core.submit(wait_forever())
+    assert started.wait(1)
+    assert core.pending() == 1
+    assert core.cancel_all() == 1
+    with pytest.raises(concurrent.futures.CancelledError):
+        future.result(1)
+    assert cancelled.wait(1)
+    assert core.pending() == 0
+
+
+def test_stop_cancels_tasks_and_ends_the_thread():
+    core = AsyncCore(name="stopping-core")
+    future = core.submit(asyncio.sleep(60))
+    core.stop()
+    assert future.cancelled()
+    assert not core._thread.is_alive()
+    assert not core.loop.is_running()
+
+
+def test_run_stage_timeout(core):
+    async def stages():
+        assert await run_stage("fast", asyncio.sleep(0, result=1), 1) == 1
+        assert await run_stage("unlimited", asyncio.sleep(0.01, result=2), None) == 2
+        await run_stage("paste", asyncio.sleep(1), 0.01)
+
+    with pytest.raises(StageTimeoutError) as error:
+        core.run(stages(), timeout=2)
+    assert (error.value.stage, error.value.timeout) == ("paste", 0.01)
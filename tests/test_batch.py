@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+
+import pytest
+
+from batch import BatchTranslator, iter_srt_units, iter_text_units
+from http_client import APIError
+
+SOURCE = "".join(f"Paragraph {i} is here.\n\n" for i in range(1, 11))
+
+
+def test_text_units_reassemble_and_keep_code_blocks():
+    lines = ["Intro line.\n", "\n", "```\n", "code = 1\n", "\n", "```\n", "Outro.\n"]
+    units = list(iter_text_units(lines, 100, markdown=True))
+    assert "".join(text for text, _ in units) == "".join(lines)
+    assert [text for text, translatable in units if translatable] == ["Intro line.\n", "Outro.\n"]
+
+
+def test_srt_units_translate_only_subtitle_text():
+    lines = ["1\n", "00:00:01,000 --> 00:00:02,000\n", "Hello.\n", "\n", "2\n",
+             "00:00:03,000 --> 00:00:04,000\n", "World.\n", "Again.\n"]
+    units = list(iter_srt_units(lines))
+    assert "".join(text for text, _ in units) == "".join(lines)
+    assert [text for text, translatable in units if translatable] == ["Hello.\n", "World.\nAgain.\n"]
+
+
+def fail_on(engine, marker):
+    # 让包含marker的片段翻译失败，返回恢复原方法的函数
+    translate = engine.translate_segment
+
+    def failing(text, target_lang, terms=None):
+        if marker in text:
+            raise APIError("mock failure", 500)
+        return translate(text, target_lang, terms)
+
+    engine.translate_segment = failing
+    return lambda: setattr(engine, "translate_segment", translate)
+
+
+def test_interrupted_file_resumes_from_checkpoint(make_engine, server, tmp_path, monkeypatch):
+    monkeypatch.setattr("batch.CHECKPOINT_INTERVAL", 0)
+    src = tmp_path / "doc.txt"
+    src.write_text(SOURCE, encoding="utf-8")
+    dst = str(tmp_path / "out" / "doc.zh.txt")
+    engine = make_engine()
+
+    restore = fail_on(engine, "Paragraph 6 ")
+    translator = BatchTranslator(engine, target="zh-Hans", workers=1)
+    with pytest.raises(APIError):
+        translator.translate_file(str(src), dst)
+    # 等待已经开始的片段结束，避免它们计入第二次运行的请求数
+    translator.executor.shutdown(wait=True)
+    restore()
+
+    with open(dst + ".progress.json", encoding="utf-8") as f:
+        state = json.load(f)
+    assert state["units"] == 10
+    assert state["target"] == "zh-Hans"
+    with open(dst, encoding="utf-8") as f:
+        assert f.read() == SOURCE[:state["offset"]]
+
+    before = server.requests
+    translator = BatchTranslator(engine, target="zh-Hans", workers=2)
+    translator.translate_file(str(src), dst)
+    translator.close()
+    # 只翻译第6到第10段
+    assert server.requests - before == 5
+    with open(dst, encoding="utf-8") as f:
+        assert f.read() == SOURCE
+    assert not os.path.exists(dst + ".progress.json")
+
+
+def test_checkpoint_is_ignored_after_the_source_changes(make_engine, server, tmp_path):
+    src = tmp_path / "doc.txt"
+    src.write_text(SOURCE, encoding="utf-8")
+    dst = str(tmp_path / "doc.zh.txt")
+    with open(dst + ".progress.json", "w", encoding="utf-8") as f:
+        json.dump({"size": 1, "mtime": 0, "target": "zh-Hans", "units": 5, "offset": 3}, f)
+
+    translator = BatchTranslator(make_engine(), target="zh-Hans", workers=2)
+    translator.translate_file(str(src), dst)
+    translator.close()
+    assert server.requests == 10
+    with open(dst, encoding="utf-8") as f:
+        assert f.read() == SOURCE
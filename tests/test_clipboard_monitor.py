@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+import clipboard_monitor
+from clipboard_monitor import get_foreground_app
+
+
+def test_foreground_app_without_display_is_unknown_and_fast(monkeypatch):
+    monkeypatch.setattr(clipboard_monitor.platform, "system", lambda: "Linux")
+    monkeypatch.delenv("DISPLAY", raising=False)
+    start = time.perf_counter()
+    assert get_foreground_app() == "unknown"
+    assert time.perf_counter() - start < 0.05
+
+
+def test_foreground_app_falls_back_when_display_is_unreachable(monkeypatch):
+    monkeypatch.setattr(clipboard_monitor.platform, "system", lambda: "Linux")
+    monkeypatch.setenv("DISPLAY", ":spacetrans-test")
+    assert get_foreground_app() == "unknown"
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+
+from config_manager import DEFAULT_CONFIG, read_config, validate_config
+from config_watcher import ConfigWatcher
+
+
+def write_config(path, **overrides):
+    path.write_text(json.dumps(dict(DEFAULT_CONFIG, **overrides)), encoding="utf-8")
+
+
+def test_default_config_is_valid():
+    assert validate_config(dict(DEFAULT_CONFIG)) == []
+
+
+def test_validate_config_reports_types_and_ranges():
+    errors = validate_config(dict(DEFAULT_CONFIG, POOL_SIZE=0, STREAM="yes", SPACE_TIMEOUT=-1))
+    assert len(errors) == 3
+
+
+def test_validate_config_checks_provider_entries():
+    providers = [
+        {"NAME": "backup", "API_HOST": "https://api.example.com", "RATE_LIMIT_RPM": 60},
+        "https://api.example.com",
+        {"MODEL": 4},
+        {"API_HOST": "https://b.example.com", "RATE_LIMIT_TPM": -1}
+    ]
+    errors = validate_config(dict(DEFAULT_CONFIG, PROVIDERS=providers))
+    assert [e.split("项")[0] for e in errors] == [
+        "PROVIDERS中第2", "PROVIDERS中第3", "PROVIDERS中第3", "PROVIDERS中第4"
+    ]
+
+
+def test_read_config_fills_missing_keys(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text('{"API_KEY": "k"}', encoding="utf-8")
+    config = read_config(str(path))
+    assert config["API_KEY"] == "k"
+    assert config["MODEL"] == DEFAULT_CONFIG["MODEL"]
+
+
+def test_watcher_applies_changes_and_reports_errors(tmp_path):
+    path = tmp_path / "config.json"
+    write_config(path)
+    applied = []
+    watcher = ConfigWatcher(applied.append, str(path), interval=0)
+    assert watcher.check() is False and watcher.last_error is None
+
+    write_config(path, MODEL="other-model", PROVIDERS=[{"NAME": "no host"}])
+    os.utime(path, ns=(1, 1))
+    assert watcher.check() is False
+    assert "API_HOST" in watcher.last_error
+
+    write_config(path, MODEL="other-model")
+    assert watcher.check() is True
+    assert applied[-1]["MODEL"] == "other-model"
+    assert watcher.last_error is None
+
+
+def test_forced_check_rereads_an_unchanged_file(tmp_path):
+    path = tmp_path / "config.json"
+    write_config(path)
+    applied = []
+    watcher = ConfigWatcher(applied.append, str(path), interval=0)
+    assert watcher.check(force=True) is True
+    assert len(applied) == 1
+    watcher_missing = ConfigWatcher(applied.append, str(tmp_path / "missing.json"), interval=0)
+    assert watcher_missing.check(force=True) is False
+    assert "missing.json" in watcher_missing.last_error
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import json
+import os
+import socket
+import threading
+import time
+
+import pytest
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="需要Unix套接字")
+
+import daemon as daemon_module  # noqa: E402
+from client import DaemonClient, DaemonError  # noqa: E402
+from config_manager import DEFAULT_CONFIG  # noqa: E402
+
+
+@pytest.fixture
+def make_daemon(server, tmp_path):
+    """
+    创建连接到模拟服务的翻译服务，套接字放在临时目录中
+    """
+    daemons = []
+
+    def make(**overrides):
+        config = dict(DEFAULT_CONFIG, API_KEY="test", API_HOST=server.url, CACHE_ENABLED=False,
+                      HEDGE_ENABLED=False, KEEPALIVE_INTERVAL=0, CONFIG_WATCH_INTERVAL=0)
+        config.update(overrides)
+        daemon = daemon_module.TranslationDaemon(config, str(tmp_path / "daemon.sock"))
+        daemons.append(daemon)
+        return daemon
+
+    yield make
+    for daemon in daemons:
+        daemon.engine.close()
+
+
+@pytest.fixture
+def running(make_daemon):
+    """
+    在后台线程的事件循环中运行翻译服务
+    """
+    daemon = make_daemon()
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(daemon.serve())
+
+    def run():
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while not os.path.exists(daemon.path) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    yield daemon
+    loop.call_soon_threadsafe(task.cancel)
+    thread.join(5)
+    loop.close()
+
+
+def exchange(path, data):
+    # 发送原始字节，读取服务返回的所有响应行直到连接关闭
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(10)
+        sock.connect(path)
+        sock.sendall(data)
+        sock.shutdown(socket.SHUT_WR)
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return [json.loads(line) for line in b"".join(chunks).splitlines()]
+
+
+def test_requests_on_one_connection_are_answered_in_order(running):
+    requests = [{"id": 1, "method": "ping"}, {"id": "two", "method": "translate", "text": "Hello world."}]
+    responses = exchange(running.path, b"".join(json.dumps(r).encode() + b"\n" for r in requests))
+    assert responses[0] == {"id": 1, "ok": True, "result": "pong"}
+    assert responses[1]["id"] == "two"
+    assert responses[1]["result"] == {"text": "Hello world.", "target": "zh-Hans"}
+
+
+def test_errors_are_reported_without_closing_the_connection(running):
+    data = b"not json\n" + b'{"id": 2, "method": "nope"}\n' + b'{"id": 3, "method": "translate", "text": "a", "target": "fr"}\n' \
+        + b'{"id": 4, "method": "ping"}\n'
+    responses = exchange(running.path, data)
+    assert [r["ok"] for r in responses] == [False, False, False, True]
+    assert responses[0]["id"] is None
+    assert "nope" in responses[1]["error"]
+    assert "fr" in responses[2]["error"]
+
+
+def test_oversized_request_is_rejected(running):
+    data = b'{"method": "ping", "pad": "' + b"x" * (daemon_module.MAX_REQUEST_BYTES + 1) + b'"}\n'
+    responses = exchange(running.path, data)
+    assert responses == [{"ok": False, "error": "request too large"}]
+
+
+def test_client_translate_batch_and_stats(running):
+    with DaemonClient(running.path, timeout=10) as client:
+        assert client.translate("   ") == {"text": "   ", "target": "zh-Hans"}
+        assert client.translate("  ", "en") == {"text": "  ", "target": "en"}
+        results = client.translate_batch(["One.", "你好", 3])
+        assert results[0] == {"text": "One.", "target": "zh-Hans"}
+        assert results[1]["target"] == "en"
+        assert "error" in results[2]
+        with pytest.raises(DaemonError):
+            client.call("nope")
+        stats = client.stats()
+    assert stats["requests"] >= 5
+    assert "rate_limit" in stats
+
+
+def test_client_reports_missing_daemon(tmp_path):
+    with pytest.raises(DaemonError):
+        DaemonClient(str(tmp_path / "missing.sock")).translate("hi")
+
+
+def test_claim_socket_removes_stale_file(make_daemon):
+    daemon = make_daemon()
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(daemon.path)
+    stale.close()
+    assert os.path.exists(daemon.path)
+    assert daemon.claim_socket() is True
+    assert not os.path.exists(daemon.path)
+
+
+def test_claim_socket_refuses_a_running_daemon(running, make_daemon):
+    other = make_daemon()
+    assert other.path == running.path
+    assert other.claim_socket() is False
+    assert os.path.exists(running.path)
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+from glossary import Automaton, Glossary, format_terms, parse_glossary
+
+
+def test_parse_glossary_skips_comments_and_keeps_single_words():
+    pairs = parse_glossary(["# 注释", "", "Kubernetes = K8s", "pod\t容器组", "SpaceTrans", "broken ="])
+    assert pairs == [("Kubernetes", "K8s"), ("pod", "容器组"), ("SpaceTrans", "SpaceTrans")]
+
+
+def test_automaton_finds_overlapping_patterns_case_insensitively():
+    automaton = Automaton(["he", "she", "hers", "his"])
+    matches = sorted(automaton.search("uSHErs"))
+    assert matches == [(1, 4, 1), (2, 4, 0), (2, 6, 2)]
+
+
+def test_automaton_without_patterns_matches_nothing():
+    assert Automaton([]).search("anything") == []
+
+
+def make_glossary(tmp_path, lines, max_terms=30):
+    path = tmp_path / "glossary.txt"
+    path.write_text("\n".join(lines), encoding="utf-8")
+    return Glossary(str(path), max_terms)
+
+
+def test_match_prefers_longest_whole_word_terms(tmp_path):
+    glossary = make_glossary(tmp_path, ["API = 接口", "API gateway = API网关", "pod = 容器组"])
+    terms = glossary.match("The API gateway routes to each pod, not to a tripod.")
+    assert terms == [("API gateway", "API网关"), ("pod", "容器组")]
+
+
+def test_match_translates_either_side(tmp_path):
+    glossary = make_glossary(tmp_path, ["cache = 缓存"])
+    assert glossary.match("清空缓存") == [("缓存", "cache")]
+
+
+def test_match_orients_terms_towards_the_target_language(tmp_path):
+    glossary = make_glossary(tmp_path, ["API = 接口", "cache = 缓存", "SpaceTrans"])
+    # 中文原文里夹着英文术语，译为英文时不能要求把API译成"接口"
+    assert glossary.match("这个API会清空缓存", "en") == [("缓存", "cache")]
+    assert glossary.match("这个API会清空缓存", "zh-Hans") == [("API", "接口")]
+    assert glossary.match("Call the API of SpaceTrans", "zh-Hans") == [("API", "接口"), ("SpaceTrans", "SpaceTrans")]
+    assert glossary.match("调用SpaceTrans的接口", "en") == [("SpaceTrans", "SpaceTrans"), ("接口", "API")]
+
+
+def test_match_respects_max_terms(tmp_path):
+    glossary = make_glossary(tmp_path, ["a1 = x", "b2 = y", "c3 = z"], max_terms=2)
+    assert len(glossary.match("a1 b2 c3")) == 2
+    assert make_glossary(tmp_path, ["a1 = x"], max_terms=0).match("a1") == []
+
+
+def test_format_terms():
+    assert format_terms([]) == ""
+    assert format_terms([("pod", "容器组")]) == "Use these term translations:\npod = 容器组\n\n"
+
+
+def test_engine_matches_glossary_once_per_request(tmp_path, make_engine):
+    path = tmp_path / "glossary.txt"
+    path.write_text("pod = 容器组\n", encoding="utf-8")
+    engine = make_engine(GLOSSARY_FILE=str(path))
+    calls = []
+    match = engine.glossary.match
+    engine.glossary.match = lambda text, target_lang: calls.append((text, target_lang)) or match(text, target_lang)
+
+    result = engine.translate("Restart the pod.", "zh-Hans")
+    assert "Restart the pod." in result
+    assert calls == [("Restart the pod.", "zh-Hans")]
+    assert engine.user_prompt("Restart the pod.", "zh-Hans").startswith("Use these term translations:\npod = 容器组")
+    assert engine.user_prompt("Restart the pod.", "en").startswith("Translate into")
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+import time
+from email.utils import formatdate
+
+import pytest
+
+from async_core import AsyncCore
+from http_client import PooledHTTPClient, parse_retry_after
+
+PAYLOAD = {"model": "mock", "messages": [{"role": "user", "content": "Translate into English: hello"}]}
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("-1") == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    assert 0 < parse_retry_after(formatdate(time.time() + 30, usegmt=True)) <= 30
+
+
+def test_post_json_reuses_connection(server):
+    client = PooledHTTPClient(server.url, keepalive_interval=0)
+    try:
+        for _ in range(3):
+            status_code, data = client.post_json("/v1/chat/completions", PAYLOAD)
+            assert status_code == 200
+            assert data["choices"][0]["message"]["content"] == "hello"
+        assert client.stats()["new_connections"] == 1
+    finally:
+        client.close()
+
+
+def test_rate_limited_response_carries_retry_after(server):
+    server.rpm = 1
+    client = PooledHTTPClient(server.url, keepalive_interval=0)
+    try:
+        client.post_json("/v1/chat/completions", PAYLOAD)
+        status_code, data = client.post_json("/v1/chat/completions", PAYLOAD)
+        assert status_code == 429
+        assert 0 < data["error"]["retry_after"] <= 60
+    finally:
+        client.close()
+
+
+def test_close_releases_async_client(server):
+    pytest.importorskip("httpx")
+    core = AsyncCore()
+    client = PooledHTTPClient(server.url, keepalive_interval=0)
+    try:
+        status_code, _ = core.run(client.post_json_async("/v1/chat/completions", PAYLOAD), timeout=5)
+        assert status_code == 200
+        async_client = client._async_client
+        client.close()
+        assert client._async_client is None
+        deadline = time.monotonic() + 2
+        while not async_client.is_closed and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert async_client.is_closed
+    finally:
+        core.stop()
+
+
+def test_warm_up_reaches_the_pool_used_by_async_requests(server):
+    core = AsyncCore()
+    client = PooledHTTPClient(server.url, keepalive_interval=0, loop=core.loop)
+    try:
+        client.warm_up(wait=True)
+        warmed = server.connections
+        assert warmed >= 1
+        for _ in range(3):
+            status_code, _ = core.run(client.post_json_async("/v1/chat/completions", PAYLOAD), timeout=5)
+            assert status_code == 200
+        # 翻译请求复用预热时建立的连接，不再新建连接
+        assert server.connections == warmed
+    finally:
+        client.close()
+        core.stop()
+
+
+def test_engine_warm_up_uses_the_bound_loop(server, make_engine):
+    core = AsyncCore()
+    engine = make_engine()
+    engine.bind_loop(core.loop)
+    try:
+        for _, task in engine.warm_up_tasks():
+            task()
+        warmed = server.connections
+        assert core.run(engine.translate_async("Hello.", "zh-Hans"), timeout=5) == "Hello."
+        assert server.connections == warmed
+    finally:
+        engine.close()
+        core.stop()
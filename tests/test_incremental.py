@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+from incremental import TranslationMemory, number_segments, parse_numbered
+
+
+def test_numbered_segments_round_trip_with_newlines():
+    segments = ["First sentence.", "- item one\n- item two", "def f():\n    return 1"]
+    assert parse_numbered(number_segments(segments), 3) == segments
+
+
+def test_parse_numbered_tolerates_missing_and_duplicate_markers():
+    text = "[[2]] 第二句\n[[1]] 第一句\n[[2]] 重复\n[[9]] 越界"
+    assert parse_numbered(text, 3) == ["第一句", "第二句", None]
+    assert parse_numbered("没有编号的译文", 2) == [None, None]
+
+
+def test_memory_reuses_unchanged_sentences():
+    memory = TranslationMemory()
+    memory.put("app", "zh-Hans", ["A.", "B.", "C."], ["甲。", "乙。", "丙。"])
+    assert memory.diff("app", "zh-Hans", ["A.", "B2.", "C.", "D."]) == ["甲。", None, "丙。", None]
+    # 目标语言不同或会话不同时不沿用
+    assert memory.diff("app", "en", ["A."]) == [None]
+    assert memory.diff("other", "zh-Hans", ["A."]) == [None]
+
+
+def test_memory_evicts_oldest_session_and_counts():
+    memory = TranslationMemory(max_sessions=2)
+    for session in ("a", "b", "c"):
+        memory.put(session, "en", ["x"], ["y"])
+    assert memory.diff("a", "en", ["x"]) == [None]
+    assert memory.diff("c", "en", ["x"]) == ["y"]
+    memory.put("c", "en", ["x", "z"], ["y", "w"], reused=1)
+    memory.forget("c")
+    assert memory.stats() == {"sessions": 1, "reused": 1, "sent": 4}
+
+
+def test_engine_sends_only_edited_sentences(make_engine, server):
+    engine = make_engine(INCREMENTAL_ENABLED=True)
+    text = "First sentence here.\nSecond one:\n- a list item\nThird sentence."
+    assert asyncio.run(engine.translate_incremental_async(text, "en", "app")) == text
+    assert server.requests == 1
+
+    edited = text.replace("Third", "Changed third")
+    assert asyncio.run(engine.translate_incremental_async(edited, "en", "app")) == edited
+    assert server.requests == 2
+    assert engine.memory.stats()["reused"] > 0
+
+
+def test_engine_fills_in_sentences_missing_from_the_reply(make_engine, server, monkeypatch):
+    engine = make_engine(INCREMENTAL_ENABLED=True)
+
+    async def drop_second(text, target_lang):
+        return text.split("\n[[2]]")[0]
+
+    monkeypatch.setattr(engine, "translate_async", drop_second)
+    text = "One sentence. Another sentence."
+    assert asyncio.run(engine.translate_incremental_async(text, "en", "app")) == text
+    # 缺少的一句单独补译，不重新翻译全文
+    assert server.requests == 1
+    assert engine.memory.diff("app", "en", ["One sentence.", "Another sentence."]) == [
+        "One sentence.", "Another sentence."
+    ]
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+import threading
+
+import pytest
+
+from input_backend import FakeInputBackend, InputBackend
+from keystroke import GestureMatcher, GestureWorker, KeyRingBuffer, parse_gesture
+
+
+def test_input_backend_requires_listener_and_press_and_release():
+    with pytest.raises(TypeError):
+        InputBackend()
+
+    class ListenOnly(InputBackend):
+        def listener(self, on_press, on_release):
+            return None
+
+    with pytest.raises(TypeError):
+        ListenOnly()
+
+
+def test_fake_backend_delivers_keys_to_running_listeners():
+    backend = FakeInputBackend()
+    events = []
+    listener = backend.listener(lambda key: events.append(("press", key)),
+                                lambda key: events.append(("release", key)))
+
+    # 启动前的按键不会送达
+    backend.feed("space")
+    assert events == []
+
+    listener.start()
+    assert listener.is_alive()
+    backend.feed("space")
+    backend.feed("space", pressed=False)
+    assert events == [("press", "space"), ("release", "space")]
+
+    listener.stop()
+    assert not listener.is_alive()
+    backend.feed("space")
+    assert len(events) == 2
+
+
+def test_fake_backend_shortcut_reaches_application_and_listener():
+    synthesized = []
+    backend = FakeInputBackend(on_synthesize=synthesized.append, modifier="cmd")
+    pressed = []
+    backend.listener(pressed.append, None).start()
+
+    backend.shortcut("v")
+    assert backend.sent == ["cmd+v"]
+    assert synthesized == ["cmd+v"]
+    # 模拟的按键像真实系统一样回送给监听器
+    assert pressed == ["cmd", "v"]
+
+
+def test_fake_backend_drives_gesture_dispatch():
+    backend = FakeInputBackend()
+    buffer = KeyRingBuffer()
+    matcher = GestureMatcher([
+        (parse_gesture("space*3", 0.5), "translate"),
+        (parse_gesture("esc"), "cancel")
+    ])
+    dispatched = []
+    armed = []
+    done = threading.Event()
+
+    def on_gesture(action, gesture, timestamp):
+        dispatched.append((action, gesture.spec))
+        if action == "cancel":
+            done.set()
+
+    worker = GestureWorker(buffer, matcher, on_gesture,
+                           lambda action, gesture, timestamp: armed.append(action)).start()
+    backend.listener(lambda key: buffer.push(key, True), lambda key: buffer.push(key, False)).start()
+    try:
+        for _ in range(3):
+            backend.press_and_release("space")
+        # 模拟的复制快捷键不会被当作触发手势
+        backend.shortcut("c")
+        backend.press_and_release("esc")
+        assert done.wait(1)
+    finally:
+        worker.stop()
+
+    assert dispatched == [("translate", "space*3"), ("cancel", "esc")]
+    assert armed == ["translate"]
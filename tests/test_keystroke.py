@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+from types import SimpleNamespace
+
+import pytest
+
+from keystroke import ChordGesture, GestureMatcher, KeyRingBuffer, TapGesture, key_name, parse_gesture
+
+
+def key(name):
+    # 与pynput的特殊键一样只有name属性
+    return SimpleNamespace(name=name)
+
+
+def char(c):
+    return SimpleNamespace(name=None, char=c)
+
+
+def feed_all(matcher, events):
+    matched = []
+    for k, timestamp, pressed in events:
+        matched.extend(action for _, action in matcher.feed(k, timestamp, pressed))
+    return matched
+
+
+def taps(k, times):
+    events = []
+    for t in times:
+        events += [(k, t, True), (k, t + 0.01, False)]
+    return events
+
+
+def test_key_name_normalizes_keys():
+    assert key_name(key("shift_r")) == "shift"
+    assert key_name(char("A")) == "a"
+    assert key_name(char("\x01")) == "a"
+    assert key_name(SimpleNamespace(vk=65)) == "vk65"
+    assert key_name(object()) is None
+
+
+def test_parse_gesture():
+    assert isinstance(parse_gesture("space*3"), TapGesture)
+    assert isinstance(parse_gesture("ctrl+alt+t"), ChordGesture)
+    assert parse_gesture("esc").count == 1
+    for spec in ("", "space*0", "space*x", "t+ctrl", "ctrl++t"):
+        with pytest.raises(ValueError):
+            parse_gesture(spec)
+
+
+def test_typed_chars_counts_printable_keys():
+    assert parse_gesture("space*3").typed_chars == 3
+    assert parse_gesture("a*3").typed_chars == 3
+    assert parse_gesture(";*2").typed_chars == 2
+    assert parse_gesture("shift*2").typed_chars == 0
+    assert parse_gesture("esc").typed_chars == 0
+    assert parse_gesture("ctrl+alt+t").typed_chars == 0
+
+
+def test_tap_gesture_triggers_within_timeout_and_arms_before_last_tap():
+    matcher = GestureMatcher([(parse_gesture("space*3", 0.5), "translate")])
+    assert feed_all(matcher, [(key("space"), 0.0, True)]) == []
+    assert matcher.armed == []
+    # 第二次按下后只差一次
+    assert feed_all(matcher, [(key("space"), 0.2, True)]) == []
+    assert [action for _, action in matcher.armed] == ["translate"]
+    assert feed_all(matcher, [(key("space"), 0.4, True)]) == ["translate"]
+
+
+def test_tap_gesture_resets_on_timeout_or_other_key():
+    matcher = GestureMatcher([(parse_gesture("space*3", 0.5), "translate")])
+    assert feed_all(matcher, taps(key("space"), [0.0, 0.2, 1.0])) == []
+    matcher = GestureMatcher([(parse_gesture("space*3", 0.5), "translate")])
+    events = taps(key("space"), [0.0, 0.1]) + taps(char("x"), [0.2]) + taps(key("space"), [0.3])
+    assert feed_all(matcher, events) == []
+
+
+def test_chord_gesture_requires_exact_modifiers():
+    matcher = GestureMatcher([(parse_gesture("ctrl+alt+t"), "translate"), (parse_gesture("esc"), "cancel")])
+    events = [(key("ctrl_l"), 0.0, True), (key("alt"), 0.1, True), (char("t"), 0.2, True)]
+    assert feed_all(matcher, events) == ["translate"]
+    # 多按了shift不匹配
+    assert feed_all(matcher, [(key("shift"), 0.3, True), (char("t"), 0.4, True)]) == []
+    assert feed_all(matcher, [(key("shift"), 0.5, False), (key("ctrl_l"), 0.6, False),
+                              (key("alt"), 0.7, False), (key("esc"), 0.8, True)]) == ["cancel"]
+
+
+def test_ring_buffer_drains_in_order_and_counts_overruns():
+    buffer = KeyRingBuffer(capacity=4)
+    for i in range(3):
+        buffer.push(i)
+    assert [k for k, _, _ in buffer.drain()] == [0, 1, 2]
+    for i in range(6):
+        buffer.push(i)
+    assert [k for k, _, _ in buffer.drain()] == [2, 3, 4, 5]
+    assert buffer.dropped == 2
+    assert buffer.wait(0) is False
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import lang_detect  # noqa: E402
+from lang_detect import LanguageDetector, classify_by_script, script_counts  # noqa: E402
+
+
+class FakeLangid:
+    """
+    代替py3langid，记录交给它识别的文本
+    """
+    def __init__(self, lang="fr"):
+        self.lang = lang
+        self.texts = []
+
+    def classify(self, text):
+        self.texts.append(text)
+        return self.lang, 0.9
+
+
+@pytest.fixture
+def fake_langid(monkeypatch):
+    fake = FakeLangid()
+    monkeypatch.setattr(lang_detect, "langid", fake)
+    return fake
+
+
+def test_script_counts():
+    counts = script_counts("Hi 你好 かな 한글 Ωμ")
+    assert counts == {"han": 2, "kana": 2, "hangul": 2, "latin": 2, "other": 2}
+
+
+def test_classify_by_script_ratios():
+    assert classify_by_script("你好，世界。今天天气很好。")[0] == "zh"
+    assert classify_by_script("The quick brown fox jumps over the lazy dog.")[0] == "latin"
+    assert classify_by_script("안녕하세요 반갑습니다")[0] == "ko"
+    # 日文夹杂汉字，假名达到一定比例就判定为日文
+    assert classify_by_script("今日は東京で会議があります")[0] == "ja"
+    # 拉丁字母按4个折合一个汉字：4个汉字和16个字母各占一半，比例不明确
+    assert classify_by_script("你好世界 abcd efgh ijkl mnop") is None
+    assert classify_by_script("123 !!!") is None
+
+
+def test_fast_path_never_returns_pseudo_codes(fake_langid):
+    detector = LanguageDetector()
+    for text in ("The quick brown fox jumps over the lazy dog.", "Привет, как дела?"):
+        lang, confidence, fast_path = detector.classify(text)
+        assert (lang, fast_path) == ("unknown", True)
+        assert confidence >= lang_detect.DECISIVE_RATIO
+    assert detector.classify("你好，世界")[:1] == ("zh",)
+    assert fake_langid.texts == []
+
+
+def test_ambiguous_text_falls_back_to_langid(fake_langid):
+    detector = LanguageDetector()
+    text = "你好世界 abcd efgh ijkl mnop"
+    assert detector.classify(text) == ("fr", 0.9, False)
+    assert fake_langid.texts == [text]
+    detector.classify("你好，世界")
+    assert detector.stats() == {"fast_path": 1, "fallback": 1, "fast_path_ratio": 0.5}
+
+
+def test_is_english_checks_latin_text_with_langid(fake_langid):
+    detector = LanguageDetector()
+    assert not detector.is_english("Bonjour tout le monde")
+    fake_langid.lang = "en"
+    assert detector.is_english("Hello everyone")
+    # 中文由快速路径直接排除，不调用py3langid
+    assert not detector.is_english("大家好，欢迎光临")
+    assert fake_langid.texts == ["Bonjour tout le monde", "Hello everyone"]
+
+
+def test_langid_fallback_with_real_model():
+    pytest.importorskip("py3langid")
+    lang, _, fast_path = LanguageDetector().classify("你好世界 abcd efgh ijkl mnop")
+    assert not fast_path
+    assert isinstance(lang, str) and lang not in ("latin", "other")
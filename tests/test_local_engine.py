@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from local_engine import LocalTranslator
+
+
+class FakeModel:
+    def translate_batch(self, sentences):
+        return [f"<{s}>" for s in sentences]
+
+
+@pytest.fixture
+def translator(tmp_path, monkeypatch):
+    translator = LocalTranslator(str(tmp_path))
+    monkeypatch.setattr(translator, "unavailable_reason", lambda target_lang: None)
+    monkeypatch.setattr(translator, "model", lambda target_lang: FakeModel())
+    yield translator
+    translator.close()
+
+
+def test_translate_joins_sentences(translator):
+    assert translator.translate("Hello. World.", "zh-Hans") == "<Hello.> <World.>"
+
+
+def test_submit_after_close_raises_instead_of_hanging(translator):
+    assert translator.translate("Hello.", "en") == "<Hello.>"
+    translator.close()
+    assert translator.supports("Hello.", "en") is False
+    with pytest.raises(RuntimeError):
+        translator.submit("Hello again.", "en")
+
+
+def test_close_twice(translator):
+    translator.close()
+    translator.close()
+
+
+def test_only_english_goes_to_en_zh_model(translator):
+    pytest.importorskip("py3langid")
+    assert translator.supports("Please restart the server before deploying.", "zh-Hans")
+    assert not translator.supports("Bonjour, comment allez-vous aujourd'hui ?", "zh-Hans")
+    assert not translator.supports("Guten Morgen, wie geht es dir heute?", "zh-Hans")
+    assert not translator.supports("服务器需要重启", "zh-Hans")
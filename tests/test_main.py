@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+import clipboard_monitor
+import main
+from benchmark import FakeApplication, FakeClipboard, FakeTextField
+from config_manager import DEFAULT_CONFIG
+from input_backend import FakeInputBackend
+
+
+@pytest.fixture
+def desk(server, monkeypatch):
+    """
+    用模拟的键盘、剪贴板和输入框创建SpaceTranslator，剪贴板没有序列号（Linux的情况）
+    """
+    clipboard = FakeClipboard()
+    field = FakeTextField()
+    config = dict(DEFAULT_CONFIG, API_KEY="test", API_HOST=server.url, CACHE_ENABLED=False,
+                  HEDGE_ENABLED=False, KEEPALIVE_INTERVAL=0, TELEMETRY_ENABLED=False,
+                  METRICS_PORT=0, SELECTION_SOURCE="clipboard")
+    monkeypatch.setattr(main, "_config", config)
+    monkeypatch.setattr(main, "pyperclip", clipboard)
+    monkeypatch.setattr(main, "get_foreground_app", lambda: "editor")
+    monkeypatch.setattr(clipboard_monitor, "pyperclip", clipboard)
+    monkeypatch.setattr(clipboard_monitor, "_load_sequence_reader", lambda: None)
+
+    translator = main.SpaceTranslator(FakeInputBackend(on_synthesize=FakeApplication(clipboard, field).on_shortcut))
+    translator.clipboard_monitor = clipboard_monitor.ClipboardMonitor(
+        poll_interval=0.001, deadline=0.5, stats_path=None
+    )
+    yield translator, clipboard, field
+    translator.core.stop()
+    translator.engine.close()
+
+
+def test_snapshot_without_sequence_is_not_trusted(desk):
+    translator, clipboard, field = desk
+    clipboard.copy("before")
+    snapshot = translator.take_clipboard_snapshot()
+    assert snapshot["sequence"] is None
+
+    # 快照之后剪贴板被其他程序改动，没有序列号时无法察觉，只能重新读取
+    clipboard.copy("changed")
+    field.set("hello world")
+    field.select_all()
+    assert not translator.snapshot_current(snapshot)
+    assert translator.get_selected_text(snapshot) == "hello world"
+    assert clipboard.paste() == "changed"
+
+
+def test_snapshot_with_unchanged_sequence_is_used(desk):
+    translator, clipboard, field = desk
+    translator.clipboard_monitor = clipboard_monitor.ClipboardMonitor(
+        poll_interval=0.001, deadline=0.5, stats_path=None, sequence_reader=clipboard.sequence
+    )
+    clipboard.copy("before")
+    snapshot = translator.take_clipboard_snapshot()
+    assert translator.snapshot_current(snapshot)
+
+    field.set("hello world")
+    field.select_all()
+    assert translator.get_selected_text(snapshot) == "hello world"
+    assert clipboard.paste() == "before"
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+from config_manager import DEFAULT_CONFIG
+from http_client import APIError
+from prompt_budget import (
+    COMPACT_SYSTEM_PROMPT, MIN_OUTPUT_TOKENS, OutputTruncatedError, PromptBudget, estimate_tokens
+)
+from providers import is_provider_failure
+from translation_engine import build_user_prompt
+
+
+def test_estimate_tokens_by_script():
+    assert estimate_tokens("abcdefgh") == (2, 0)
+    assert estimate_tokens("你好世界") == (4, 4)
+    # 西里尔字母按每2个字符一个token估算
+    assert estimate_tokens("Привет") == (3, 0)
+
+
+def test_compact_prompt_only_for_default_short_messages():
+    budget = PromptBudget(DEFAULT_CONFIG["SYSTEM_PROMPT"], compact_tokens=10)
+    assert budget.select_prompt("short") == COMPACT_SYSTEM_PROMPT
+    assert budget.select_prompt("word " * 50) == DEFAULT_CONFIG["SYSTEM_PROMPT"]
+    assert PromptBudget("custom", compact_tokens=10).select_prompt("short") == "custom"
+
+
+def test_max_tokens_leaves_headroom_over_estimate():
+    budget = PromptBudget(DEFAULT_CONFIG["SYSTEM_PROMPT"], max_tokens_factor=1.0)
+    assert budget.max_tokens("hi") == MIN_OUTPUT_TOKENS
+    message = build_user_prompt("The quick brown fox jumps over the lazy dog. " * 20, "zh-Hans")
+    assert budget.max_tokens(message) > estimate_tokens(message)[0] * 1.5
+    assert PromptBudget("prompt", max_tokens_factor=0).max_tokens(message) is None
+
+
+def test_truncation_is_not_a_provider_failure():
+    assert not is_provider_failure(OutputTruncatedError(100))
+    assert not is_provider_failure(APIError("bad request", 400))
+    assert is_provider_failure(APIError("overloaded", 503))
+
+
+def test_truncated_output_is_retried_with_larger_cap(make_engine, server):
+    engine = make_engine(MAX_TOKENS_FACTOR=0.4)
+    text = "The quick brown fox jumps over the lazy dog. " * 20
+    assert engine.request_translation(build_user_prompt(text, "zh-Hans")) == text.strip()
+    assert server.requests == 2
+
+
+def test_cache_key_matches_the_sent_prompt(make_engine, tmp_path):
+    glossary = tmp_path / "glossary.tsv"
+    glossary.write_text("fox\t狐狸\n", encoding="utf-8")
+    # 不带术语时用精简提示词，带上术语后超过阈值改用完整提示词
+    plain = build_user_prompt("a fox", "zh-Hans")
+    engine = make_engine(GLOSSARY_FILE=str(glossary), COMPACT_PROMPT_TOKENS=estimate_tokens(plain)[0])
+    message, _, _ = engine.lookup_cache("a fox", "zh-Hans")
+    assert "狐狸" in message
+    _, payload = engine.build_request(message)
+    assert payload["messages"][0]["content"] == DEFAULT_CONFIG["SYSTEM_PROMPT"]
+    assert payload["messages"][1]["content"] == message
+    assert engine.budget.select_prompt(plain) == COMPACT_SYSTEM_PROMPT
+    assert engine.cache_key(message, "zh-Hans") != engine.cache_key(plain, "zh-Hans")
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import time
+
+import pytest
+
+from config_manager import DEFAULT_CONFIG
+from http_client import APIError
+from mock_server import MockOpenAIServer
+from providers import CLOSED, OPEN, Provider, ProviderRouter
+
+
+def make_provider(name, api_host="http://127.0.0.1:9", **overrides):
+    config = dict(DEFAULT_CONFIG, KEEPALIVE_INTERVAL=0, **overrides)
+    return Provider(name, api_host, "test", "mock", config)
+
+
+def test_close_stops_the_probe_thread_and_the_pool():
+    provider = make_provider("dead")
+    router = ProviderRouter([provider], failure_threshold=1, cooldown=0.05)
+    router.record_failure(provider, APIError("down", 503))
+    assert provider.state == OPEN
+    thread = router._probe_thread
+    assert thread.is_alive()
+
+    router.close()
+    provider.close()
+    thread.join(2)
+    assert not thread.is_alive()
+    with pytest.raises(APIError):
+        provider.http_client
+    # 关闭后的失败不再启动探测线程
+    router._probe_thread = None
+    router.record_failure(provider, APIError("down", 503))
+    assert router._probe_thread is None
+
+
+def test_engine_close_stops_probing(make_engine):
+    engine = make_engine(PROVIDERS=[{"NAME": "backup", "API_HOST": "http://127.0.0.1:9"}])
+    backup = engine.providers[1]
+    for _ in range(engine.router.failure_threshold):
+        engine.router.record_failure(backup, APIError("down", 503))
+    thread = engine.router._probe_thread
+    engine.close()
+    thread.join(2)
+    assert not thread.is_alive()
+
+
+def sample(router, provider, seconds, count=5):
+    for _ in range(count):
+        router.record_success(provider, seconds)
+
+
+def test_unsampled_providers_keep_their_configured_position():
+    primary, backup, spare = make_provider("primary"), make_provider("backup"), make_provider("spare")
+    router = ProviderRouter([primary, backup, spare])
+    assert router.ranked() == [primary, backup, spare]
+    # 主服务有了样本，没有样本的备用服务不会排到它前面
+    sample(router, primary, 0.5)
+    assert router.ranked() == [primary, backup, spare]
+    # 有样本的服务之间按耗时排序
+    sample(router, spare, 0.1)
+    assert router.ranked() == [spare, backup, primary]
+    router.close()
+
+
+@pytest.fixture
+def failing_server():
+    """
+    所有翻译请求都返回503的模拟服务，模型列表仍然正常返回
+    """
+    server = MockOpenAIServer(latency=0, token_rate=0, error_rate=1.0).start()
+    yield server
+    server.stop()
+
+
+def test_breaker_opens_after_consecutive_failures():
+    provider = make_provider("flaky")
+    router = ProviderRouter([provider], failure_threshold=3, cooldown=60)
+    router.record_failure(provider, APIError("down", 503))
+    router.record_failure(provider, APIError("down", 503))
+    # 成功请求清零连续失败次数
+    router.record_success(provider)
+    router.record_failure(provider, APIError("down", 503))
+    router.record_failure(provider, APIError("down", 503))
+    assert provider.state == CLOSED
+    # 请求本身有误（400）不说明服务不可用，不计入
+    router.record_failure(provider, APIError("bad request", 400))
+    assert provider.state == CLOSED
+
+    router.record_failure(provider, APIError("down", 503))
+    assert provider.state == OPEN
+    assert provider.opened_at > 0
+    router.close()
+
+
+def test_probe_is_the_half_open_trial(server):
+    dead = make_provider("dead")
+    alive = make_provider("alive", server.url)
+    router = ProviderRouter([dead, alive], failure_threshold=1, cooldown=60)
+    for provider in (dead, alive):
+        router.record_failure(provider, APIError("down", 503))
+    assert [p.state for p in (dead, alive)] == [OPEN, OPEN]
+
+    # 探测失败时保持熔断并重新开始冷却，探测成功时恢复
+    opened_at = dead.opened_at
+    assert not router.probe(dead)
+    assert dead.state == OPEN and dead.opened_at > opened_at
+    assert router.probe(alive)
+    assert alive.state == CLOSED and alive.consecutive_failures == 0
+    assert router.ranked() == [alive]
+    router.close()
+    for provider in (dead, alive):
+        provider.close()
+
+
+def test_probe_thread_recovers_provider_after_cooldown(server):
+    provider = make_provider("primary", server.url)
+    router = ProviderRouter([provider], failure_threshold=1, cooldown=0.05)
+    router.record_failure(provider, APIError("down", 503))
+    assert provider.state == OPEN
+    deadline = time.monotonic() + 2
+    while provider.state == OPEN and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert provider.state == CLOSED
+    router.close()
+    provider.close()
+
+
+def test_5xx_fails_over_to_backup_and_opens_breaker(make_engine, server, failing_server):
+    engine = make_engine(
+        API_HOST=failing_server.url, RETRY_ATTEMPTS=0, BREAKER_FAILURES=2, BREAKER_COOLDOWN=60,
+        PROVIDERS=[{"NAME": "backup", "API_HOST": server.url}]
+    )
+    primary, backup = engine.providers
+    for _ in range(2):
+        assert engine.request_translation("Translate into English: hello") == "hello"
+    assert failing_server.requests == 2
+    assert primary.state == OPEN
+
+    # 熔断后直接使用备用服务，不再请求主服务
+    assert engine.request_translation("Translate into English: again") == "again"
+    assert failing_server.requests == 2
+    assert server.requests == 3
+    assert engine.router.ranked() == [backup]
+
+
+def test_async_5xx_fails_over_to_backup(make_engine, server, failing_server):
+    engine = make_engine(
+        API_HOST=failing_server.url, RETRY_ATTEMPTS=0, BREAKER_COOLDOWN=60,
+        PROVIDERS=[{"NAME": "backup", "API_HOST": server.url}]
+    )
+    text, provider = asyncio.run(engine._request_with_failover_async("Translate into English: hello"))
+    assert (text, provider.name) == ("hello", "backup")
+    assert failing_server.requests == 1
+    assert engine.providers[0].consecutive_failures == 1
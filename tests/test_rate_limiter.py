@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from http_client import APIError
+from mock_server import MockOpenAIServer
+from rate_limiter import BATCH, INTERACTIVE, RateLimiter, TokenBucket, backoff_delay, request_priority
+
+
+def test_token_bucket_refills_up_to_capacity():
+    bucket = TokenBucket(600, headroom=1.0)
+    assert bucket.rate == 10
+    assert bucket.capacity == 60
+    bucket.take(60)
+    assert bucket.wait_time(5) == 0.5
+    bucket.refill(bucket.updated + 1)
+    assert bucket.level == 10
+    bucket.refill(bucket.updated + 100)
+    assert bucket.level == 60
+
+
+def test_token_bucket_caps_wait_for_oversized_requests():
+    bucket = TokenBucket(600, headroom=1.0)
+    bucket.take(bucket.capacity)
+    assert bucket.wait_time(10_000) == bucket.capacity / bucket.rate
+
+
+def test_backoff_delay_honours_retry_after():
+    assert backoff_delay(3, retry_after=7) == 7
+    for attempt in range(10):
+        assert 0 < backoff_delay(attempt) <= 30
+
+
+def test_disabled_limiter_never_waits():
+    limiter = RateLimiter()
+    start = time.monotonic()
+    for _ in range(100):
+        limiter.acquire(1000)
+    assert time.monotonic() - start < 0.1
+
+
+def test_settle_returns_and_charges_the_difference():
+    limiter = RateLimiter(tpm=6000, headroom=1.0)
+    bucket = limiter.tokens
+    limiter.acquire(400)
+    level = bucket.level
+    limiter.settle(400, 100)
+    assert bucket.level >= level + 300
+    level = bucket.level
+    limiter.settle(100, 300)
+    assert bucket.level <= level - 200 + 1
+    # 没有实际用量时保留预留额度
+    level = bucket.level
+    limiter.settle(100, None)
+    assert bucket.level >= level
+
+
+def test_interactive_requests_are_granted_before_batch():
+    limiter = RateLimiter(rpm=600)
+    limiter.requests.level = 0
+    order = []
+
+    def worker(priority, name):
+        with request_priority(priority):
+            limiter.acquire()
+        order.append(name)
+
+    batch = threading.Thread(target=worker, args=(BATCH, "batch"))
+    batch.start()
+    time.sleep(0.02)
+    interactive = threading.Thread(target=worker, args=(INTERACTIVE, "interactive"))
+    interactive.start()
+    batch.join(5)
+    interactive.join(5)
+    assert order == ["interactive", "batch"]
+    assert limiter.stats()["interactive"] == 1 and limiter.stats()["batch"] == 1
+
+
+def test_throttle_pauses_every_request():
+    limiter = RateLimiter()
+    limiter.throttle(0.2)
+    assert limiter.blocked_for() > 0
+    start = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - start >= 0.15
+    assert limiter.stats()["throttled"] == 1
+
+
+def test_streaming_request_settles_its_reservation(make_engine):
+    engine = make_engine(RATE_LIMIT_TPM=100000)
+    provider = engine.providers[0]
+    settled = []
+    settle = provider.limiter.settle
+    provider.limiter.settle = lambda reserved, actual: settled.append((reserved, actual)) or settle(reserved, actual)
+
+    message = engine.user_prompt("Hello world. " * 20, "zh-Hans")
+    assert "".join(engine.translate_text_stream(message)).strip() == ("Hello world. " * 20).strip()
+    assert len(settled) == 1
+    reserved, actual = settled[0]
+    assert 0 < actual < reserved
+
+
+def record_settles(provider):
+    settled = []
+    settle = provider.limiter.settle
+    provider.limiter.settle = lambda reserved, actual: settled.append((reserved, actual)) or settle(reserved, actual)
+    return settled
+
+
+def test_failed_requests_return_their_reservation(make_engine):
+    server = MockOpenAIServer(latency=0, token_rate=0, error_rate=1.0).start()
+    try:
+        engine = make_engine(API_HOST=server.url, RATE_LIMIT_TPM=100000, RETRY_ATTEMPTS=0)
+        settled = record_settles(engine.providers[0])
+        with pytest.raises(APIError):
+            engine.request_translation("Translate into Chinese: hello")
+        with pytest.raises(APIError):
+            asyncio.run(engine.request_translation_async("Translate into Chinese: hello"))
+        assert len(settled) == 2
+        assert all(reserved > 0 and actual == 0 for reserved, actual in settled)
+    finally:
+        server.stop()
+
+
+def test_rate_limited_request_returns_its_reservation(make_engine):
+    server = MockOpenAIServer(latency=0, token_rate=0, rpm=1).start()
+    try:
+        engine = make_engine(API_HOST=server.url, RATE_LIMIT_TPM=100000, RETRY_ATTEMPTS=0)
+        settled = record_settles(engine.providers[0])
+        assert engine.request_translation("Translate into Chinese: hello") == "hello"
+        with pytest.raises(APIError) as error:
+            engine.request_translation("Translate into Chinese: again")
+        assert error.value.status_code == 429
+        # 成功的请求按usage修正，被限流的请求全部退回
+        assert settled[0][1] > 0
+        assert settled[1][1] == 0
+    finally:
+        server.stop()
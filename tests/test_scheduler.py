@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import time
+
+import pytest
+
+from async_core import StageTimeoutError
+from scheduler import TranslationScheduler
+
+
+def test_timed_out_capture_is_cancelled_and_keeps_the_lock_until_it_exits():
+    events = []
+
+    def slow_capture(cancelled):
+        time.sleep(0.2)
+        # 超时后才轮到模拟按键，此时应当看到取消标记
+        events.append(("slow_exit", cancelled.is_set(), time.perf_counter()))
+        return "stale"
+
+    def next_capture(cancelled):
+        events.append(("next_start", cancelled.is_set(), time.perf_counter()))
+        return "text"
+
+    async def main():
+        scheduler = TranslationScheduler()
+        first = asyncio.ensure_future(scheduler.capture(slow_capture, timeout=0.05))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(scheduler.capture(next_capture, timeout=1))
+        with pytest.raises(StageTimeoutError):
+            await first
+        assert await second == ("text", 1)
+
+    asyncio.run(main())
+    (name1, cancelled1, exit_time), (name2, cancelled2, start_time) = events
+    assert (name1, cancelled1) == ("slow_exit", True)
+    assert (name2, cancelled2) == ("next_start", False)
+    assert start_time >= exit_time
+
+
+def test_identical_requests_are_coalesced():
+    calls = []
+
+    async def translate():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "译文"
+
+    async def main():
+        scheduler = TranslationScheduler()
+        results = await asyncio.gather(
+            scheduler.translate(("text", "zh-Hans"), translate, 1),
+            scheduler.translate(("text", "zh-Hans"), translate, 2)
+        )
+        assert results == ["译文", "译文"]
+        assert scheduler.superseded(("text", "zh-Hans"), 1)
+        assert not scheduler.superseded(("text", "zh-Hans"), 2)
+        return scheduler.stats()
+
+    stats = asyncio.run(main())
+    assert len(calls) == 1
+    assert stats["coalesced"] == 1
+
+
+def test_timed_out_stream_keeps_both_locks_until_it_stops():
+    events = []
+
+    def streaming(cancelled):
+        # 模拟边接收边粘贴：每段之前检查取消标记
+        for _ in range(100):
+            if cancelled.is_set():
+                break
+            time.sleep(0.01)
+        events.append(("stream_exit", cancelled.is_set(), time.perf_counter()))
+        return True
+
+    def paste():
+        events.append(("paste", False, time.perf_counter()))
+
+    def capture(cancelled):
+        events.append(("capture", cancelled.is_set(), time.perf_counter()))
+        return "text"
+
+    async def main():
+        scheduler = TranslationScheduler()
+        stream = asyncio.ensure_future(scheduler.exclusive(streaming, timeout=0.05))
+        await asyncio.sleep(0)
+        others = asyncio.gather(scheduler.paste(paste), scheduler.capture(capture))
+        with pytest.raises(StageTimeoutError):
+            await stream
+        await others
+
+    asyncio.run(main())
+    assert events[0][:2] == ("stream_exit", True)
+    assert sorted(name for name, _, _ in events[1:]) == ["capture", "paste"]
+    assert all(at >= events[0][2] for _, _, at in events[1:])
+
+
+def test_timed_out_paste_keeps_the_lock_until_it_finishes():
+    events = []
+
+    def slow_paste():
+        time.sleep(0.15)
+        events.append(("slow", time.perf_counter()))
+
+    def next_paste():
+        events.append(("next", time.perf_counter()))
+
+    async def main():
+        scheduler = TranslationScheduler()
+        first = asyncio.ensure_future(scheduler.paste(slow_paste, timeout=0.03))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(scheduler.paste(next_paste))
+        with pytest.raises(StageTimeoutError):
+            await first
+        # 超时在粘贴线程结束之后才报告
+        assert events and events[0][0] == "slow"
+        await second
+
+    asyncio.run(main())
+    assert [name for name, _ in events] == ["slow", "next"]
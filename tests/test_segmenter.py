@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+import random
+
+from segmenter import join_translations, segment_text, split_sentences
+
+SAMPLE = (
+    "  First paragraph. It has two sentences!\n\n"
+    "第二段。包含中文句子！\n"
+    "A line right after it; then more.\n\n\n"
+    "  trailing words   \n"
+)
+
+
+def test_segments_reassemble_to_the_original():
+    for max_chars in (10, 30, 80, 1500):
+        segments = segment_text(SAMPLE, max_chars)
+        assert "".join(part for part, _ in segments) == SAMPLE
+        for part, translatable in segments:
+            if translatable:
+                assert len(part) <= max_chars
+                assert part == part.strip()
+            else:
+                assert not part.strip()
+
+
+def test_short_text_is_one_segment():
+    assert segment_text("Hello world.", 100) == [("Hello world.", True)]
+    assert segment_text("  Hello  ", 100) == [("  ", False), ("Hello", True), ("  ", False)]
+
+
+def test_words_longer_than_max_chars_are_hard_split():
+    segments = segment_text("x" * 25, 10)
+    assert [part for part, _ in segments] == ["x" * 10, "x" * 10, "x" * 5]
+
+
+def test_random_text_reassembles():
+    rng = random.Random(0)
+    alphabet = "ab. \n。！?"
+    for _ in range(200):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 80)))
+        assert "".join(part for part, _ in segment_text(text, rng.randint(1, 20))) == text
+        assert "".join(part for part, _ in split_sentences(text, rng.randint(1, 20))) == text
+
+
+def test_split_sentences_keeps_each_sentence_separate():
+    parts = split_sentences("One. Two!\n三。四？", 200)
+    assert [part for part, translatable in parts if translatable] == ["One.", "Two!", "三。", "四？"]
+
+
+def test_join_translations_restores_separators():
+    parts = split_sentences("One. Two!\nThree.", 200)
+    assert join_translations(parts, ["一。", "二！", "三。"], "zh-Hans") == "一。 二！\n三。"
+    parts = split_sentences("一。二！", 200)
+    assert join_translations(parts, ["One.", "Two!"], "en") == "One. Two!"
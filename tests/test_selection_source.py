@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import sys
+
+import pytest
+
+import selection_source
+from selection_source import PrimarySelection, create_selection_source, find_primary_selection
+
+
+def python_command(code):
+    return [sys.executable, "-c", code]
+
+
+def test_read_returns_command_output():
+    selection = PrimarySelection(python_command("print('选中的文本', end='')"))
+    assert selection.read() == "选中的文本"
+
+
+def test_read_returns_none_on_failure_empty_output_or_timeout():
+    assert PrimarySelection(python_command("raise SystemExit(1)")).read() is None
+    assert PrimarySelection(python_command("pass")).read() is None
+    assert PrimarySelection(python_command("import time; time.sleep(5)"), timeout=0.2).read() is None
+    assert PrimarySelection(["spacetrans-no-such-command"]).read() is None
+
+
+def test_find_primary_selection_depends_on_platform_and_display(monkeypatch):
+    monkeypatch.setattr(selection_source.platform, "system", lambda: "Darwin")
+    assert find_primary_selection() is None
+
+    monkeypatch.setattr(selection_source.platform, "system", lambda: "Linux")
+    monkeypatch.delenv("DISPLAY", raising=False)
+    monkeypatch.delenv("WAYLAND_DISPLAY", raising=False)
+    assert find_primary_selection() is None
+
+    monkeypatch.setenv("WAYLAND_DISPLAY", "wayland-0")
+    monkeypatch.setattr(selection_source.shutil, "which", lambda name: f"/usr/bin/{name}")
+    assert find_primary_selection().read_command[0] == "wl-paste"
+
+
+def test_clipboard_source_and_unknown_source():
+    assert create_selection_source("clipboard") is None
+    assert create_selection_source("unknown") is None
+
+
+@pytest.mark.skipif(
+    not os.environ.get("DISPLAY") or not (shutil.which("xclip") or shutil.which("xsel")),
+    reason="需要X11（例如xvfb-run）以及xclip或xsel"
+)
+def test_primary_round_trip_on_x11():
+    selection = find_primary_selection()
+    assert selection is not None
+    selection.write("SpaceTrans选区测试")
+    assert selection.read() == "SpaceTrans选区测试"
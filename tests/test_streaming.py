@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+import pytest
+
+from http_client import APIError
+from streaming import SentenceBuffer, iter_completion_deltas, iter_sse_data
+
+
+def sse(*chunks):
+    lines = []
+    for chunk in chunks:
+        lines += [f"data: {json.dumps(chunk) if isinstance(chunk, dict) else chunk}", ""]
+    return lines
+
+
+def delta(text):
+    return {"choices": [{"index": 0, "delta": {"content": text}}]}
+
+
+def test_iter_sse_data_skips_comments_and_stops_at_done():
+    lines = [": ping", "data: a", "data: b", "", b"data: c", "", "data: [DONE]", "", "data: d", ""]
+    assert list(iter_sse_data(lines)) == ["a\nb", "c"]
+
+
+def test_iter_completion_deltas_collects_usage():
+    usage = {"prompt_tokens": 12, "completion_tokens": 3, "total_tokens": 15}
+    result = {}
+    lines = sse(delta("你"), delta("好"), {"choices": [], "usage": usage}, "[DONE]")
+    assert list(iter_completion_deltas(lines, result)) == ["你", "好"]
+    assert result["usage"] == usage
+
+
+def test_iter_completion_deltas_raises_stream_errors():
+    with pytest.raises(APIError):
+        list(iter_completion_deltas(sse(delta("a"), {"error": {"message": "boom"}})))
+
+
+def feed_all(buffer, pieces):
+    out = [buffer.feed(piece) for piece in pieces]
+    return [chunk for chunk in out if chunk] + [buffer.flush()]
+
+
+def test_sentence_buffer_releases_whole_sentences():
+    buffer = SentenceBuffer()
+    chunks = feed_all(buffer, ["  Hel", "lo. Wor", "ld! Pi is 3.", "14 ok"])
+    assert chunks == ["Hello.", " World!", " Pi is 3.14 ok"]
+
+
+def test_sentence_buffer_splits_after_chinese_punctuation():
+    buffer = SentenceBuffer()
+    assert feed_all(buffer, ["你好。", "世界", "！再见"]) == ["你好。", "世界！", "再见"]
+
+
+def test_sentence_buffer_waits_for_min_chars():
+    buffer = SentenceBuffer(min_chars=10)
+    assert buffer.feed("Hi. ") == ""
+    assert buffer.feed("How are you? ") == "Hi. How are you?"
+    assert buffer.flush() == ""
+
+
+def test_sentence_buffer_drops_leading_whitespace_only_at_start():
+    buffer = SentenceBuffer()
+    assert buffer.feed("\n  ") == ""
+    assert feed_all(buffer, ["A.\n", "\nB"]) == ["A.\n", "\n", "B"]
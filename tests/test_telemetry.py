@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import json
+import time
+import urllib.request
+
+import pytest
+
+import telemetry
+
+
+@pytest.fixture
+def log_path(tmp_path, monkeypatch):
+    """
+    把计时日志写到临时目录，结束后移除日志处理器
+    """
+    monkeypatch.setattr(telemetry, "_handler", None)
+    path = tmp_path / "telemetry.jsonl"
+    telemetry.configure(str(path))
+    handler = telemetry._handler
+    yield path
+    telemetry._logger.removeHandler(handler)
+    handler.close()
+
+
+def test_trace_writes_one_jsonl_line_with_spans(log_path):
+    trace = telemetry.start_trace("translate")
+    trace.set(chars=5, target="zh-Hans")
+    with telemetry.span("clipboard_copy", app="editor") as attrs:
+        attrs["chars"] = 5
+
+    # asyncio.to_thread中记录的片段归入同一次翻译
+    async def in_thread():
+        await asyncio.to_thread(telemetry.record_span, "paste", 0.002, time.perf_counter())
+    asyncio.run(in_thread())
+
+    assert telemetry.current_trace() is trace
+    trace.finish("cancelled")
+    assert telemetry.current_trace() is None
+
+    lines = log_path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 1
+    record = json.loads(lines[0])
+    assert record["name"] == "translate"
+    assert record["status"] == "cancelled"
+    assert record["attrs"] == {"chars": 5, "target": "zh-Hans"}
+    assert [span["name"] for span in record["spans"]] == ["clipboard_copy", "paste"]
+    assert record["spans"][0]["app"] == "editor"
+    assert record["spans"][0]["chars"] == 5
+    assert record["spans"][1]["duration"] == 0.002
+
+
+def test_span_outside_trace_only_updates_metrics(log_path):
+    with telemetry.span("outside"):
+        pass
+    assert log_path.read_text(encoding="utf-8") == ""
+    assert 'spacetrans_span_seconds_count{span="outside"}' in telemetry.metrics.render()
+
+
+def test_registry_renders_prometheus_text():
+    registry = telemetry.MetricsRegistry()
+    registry.inc("requests_total", status="ok")
+    registry.inc("requests_total", 2, status="ok")
+    registry.observe("latency_seconds", 0.02, stage='paste"')
+    registry.add_collector("queue", lambda: {"depth": 3, "busy": True, "name": "x"})
+    registry.add_collector("broken", lambda: 1 / 0)
+
+    text = registry.render()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{status="ok"} 3' in text
+    assert 'latency_seconds_bucket{stage="paste\\"",le="0.01"} 0' in text
+    assert 'latency_seconds_bucket{stage="paste\\"",le="0.025"} 1' in text
+    assert 'latency_seconds_count{stage="paste\\""} 1' in text
+    assert "queue_depth 3" in text
+    # 布尔值和非数值不导出，统计函数出错只写注释
+    assert "queue_busy" not in text and "queue_name" not in text
+    assert "# broken 统计失败" in text
+
+
+def test_metrics_server_on_ephemeral_port(monkeypatch):
+    monkeypatch.setattr(telemetry, "_servers", {})
+    telemetry.metrics.inc("spacetrans_test_scrapes_total")
+    server = telemetry.serve_metrics(0)
+    try:
+        assert telemetry.serve_metrics(0) is server
+        port = server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            body = response.read().decode("utf-8")
+        assert "spacetrans_test_scrapes_total 1" in body
+
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/other", timeout=5)
+        assert error.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
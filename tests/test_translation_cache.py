@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+from translation_cache import TranslationCache, normalize_text
+
+
+def key(text, model="m", prompt="p", temperature=0.3, target="zh-Hans"):
+    return TranslationCache.make_key(model, prompt, temperature, target, text)
+
+
+def test_normalize_text():
+    assert normalize_text("  a\r\nb\r ") == "a\nb"
+    assert normalize_text("é") == "é"
+
+
+def test_make_key_depends_on_every_field():
+    base = key("Hello")
+    assert key(" Hello\n") == base
+    assert key("Hello", temperature=0) != base
+    assert key("Hello", model="other") != base
+    assert key("Hello", prompt="other") != base
+    assert key("Hello", target="en") != base
+    assert key("Hello!") != base
+
+
+def test_memory_only_cache_evicts_least_recently_used():
+    cache = TranslationCache(db_path=None, memory_size=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert cache.get("a") == "1"
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+    stats = cache.stats()
+    assert stats["memory_hits"] == 3 and stats["misses"] == 1 and stats["disk_entries"] == 0
+
+
+def test_disk_cache_persists_across_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = TranslationCache(path)
+    cache.put("k", "译文")
+    cache.close()
+
+    cache = TranslationCache(path)
+    assert cache.get("k") == "译文"
+    assert cache.get("k") == "译文"
+    stats = cache.stats()
+    assert stats["disk_hits"] == 1 and stats["memory_hits"] == 1 and stats["disk_entries"] == 1
+    cache.clear()
+    assert cache.get("k") is None
+    cache.close()
+
+
+def test_expired_entries_are_dropped(tmp_path):
+    cache = TranslationCache(str(tmp_path / "cache.sqlite3"), ttl=1)
+    cache.put("k", "v")
+    cache._memory["k"] = ("v", time.time() - 10)
+    cache._db.execute("UPDATE translations SET created = ?", (time.time() - 10,))
+    assert cache.get("k") is None
+    assert cache.stats()["disk_entries"] == 0
+    cache.close()
+
+
+def test_disk_cache_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr("translation_cache.EVICT_CHECK_INTERVAL", 1)
+    cache = TranslationCache(str(tmp_path / "cache.sqlite3"), memory_size=1, max_entries=3)
+    for i in range(10):
+        cache.put(str(i), str(i))
+    assert cache.stats()["disk_entries"] == 3
+    assert cache.get("9") == "9"
+    assert cache.get("0") is None
+    cache.close()
+
+
+def test_engine_caches_successful_translations(make_engine, server):
+    engine = make_engine()
+    engine.cache = TranslationCache(db_path=None)
+    assert engine.translate("Hello world.", "zh-Hans") == "Hello world."
+    assert engine.translate("Hello world.\n", "zh-Hans") == "Hello world."
+    assert server.requests == 1
+
+
+def test_backup_results_with_another_model_are_not_cached(make_engine, server):
+    dead = "http://127.0.0.1:9"
+    engine = make_engine(API_HOST=dead, PROVIDERS=[{"API_HOST": server.url, "MODEL": "other-model"}])
+    engine.cache = TranslationCache(db_path=None)
+    assert engine.translate("Hello world.", "zh-Hans") == "Hello world."
+    assert engine.cache.stats()["memory_entries"] == 0
+
+    engine = make_engine(API_HOST=dead, PROVIDERS=[{"API_HOST": server.url}])
+    engine.cache = TranslationCache(db_path=None)
+    assert engine.translate("Hello world.", "zh-Hans") == "Hello world."
+    assert engine.cache.stats()["memory_entries"] == 1
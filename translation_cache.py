@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SpaceTrans翻译缓存模块
+
+两级缓存：进程内LRU + 配置目录下的SQLite持久化存储，
+相同的句子再次翻译时无需访问API。
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from config_manager import CONFIG_DIR
+
+# 默认缓存文件路径，与config.json放在同一目录
+CACHE_FILE = os.path.join(CONFIG_DIR, "cache.sqlite3")
+
+# 每写入多少条记录检查一次磁盘容量
+EVICT_CHECK_INTERVAL = 100
+
+
+def normalize_text(text):
+    """
+    规范化待翻译文本，使仅在首尾空白或换行符风格上不同的文本命中同一条缓存
+    """
+    text = unicodedata.normalize("NFC", text)
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text.strip()
+
+
+class TranslationCache:
+    """
+    翻译缓存 - 内存LRU在前，SQLite持久化存储在后
+    """
+    def __init__(self, db_path=CACHE_FILE, memory_size=256, max_entries=10000, ttl=30 * 24 * 3600):
+        """
+        Args:
+            db_path: SQLite文件路径，为None时只使用内存缓存
+            memory_size: 内存LRU保留的条目数
+            max_entries: 磁盘缓存保留的最大条目数
+            ttl: 缓存有效期（秒），0表示永不过期
+        """
+        self.db_path = db_path
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._writes = 0
+        self._hits_memory = 0
+        self._hits_disk = 0
+        self._misses = 0
+
+        self._db = None
+        if db_path:
+            try:
+                os.makedirs(os.path.dirname(db_path), exist_ok=True)
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS translations ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                    "created REAL NOT NULL, accessed REAL NOT NULL)"
+                )
+                self._db.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_translations_accessed ON translations(accessed)"
+                )
+                self._db.commit()
+                self._purge_expired()
+            except sqlite3.Error as e:
+                print(f"打开翻译缓存出错，将只使用内存缓存: {e}")
+                self._db = None
+
+    @staticmethod
+    def make_key(model, system_prompt, temperature, target_lang, text):
+        """
+        生成缓存键
+
+        Args:
+            model: 模型名称
+            system_prompt: 系统提示词（只参与哈希）
+            temperature: 温度
+            target_lang: 目标语言
+            text: 原文
+        """
+        prompt_hash = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+        raw = json.dumps(
+            [model, prompt_hash, float(temperature), target_lang, normalize_text(text)],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        查询缓存
+
+        Returns:
+            缓存的译文，未命中时返回None
+        """
+        now = time.time()
+        with self._lock:
+            if key in self._memory:
+                value, created = self._memory[key]
+                if not self._expired(created, now):
+                    self._memory.move_to_end(key)
+                    self._hits_memory += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT value, created FROM translations WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row is not None:
+                        value, created = row
+                        if not self._expired(created, now):
+                            self._db.execute(
+                                "UPDATE translations SET accessed = ? WHERE key = ?", (now, key)
+                            )
+                            self._db.commit()
+                            self._remember(key, value, created)
+                            self._hits_disk += 1
+                            return value
+                        self._db.execute("DELETE FROM translations WHERE key = ?", (key,))
+                        self._db.commit()
+                except sqlite3.Error as e:
+                    print(f"读取翻译缓存出错: {e}")
+
+            self._misses += 1
+            return None
+
+    def put(self, key, value):
+        """
+        写入缓存
+        """
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO translations (key, value, created, accessed) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, value, now, now)
+                )
+                self._writes += 1
+                if self._writes % EVICT_CHECK_INTERVAL == 0:
+                    self._evict()
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"写入翻译缓存出错: {e}")
+
+    def clear(self):
+        """
+        清空内存和磁盘中的全部缓存，并重置统计
+        """
+        with self._lock:
+            self._memory.clear()
+            self._hits_memory = 0
+            self._hits_disk = 0
+            self._misses = 0
+            if self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM translations")
+                    self._db.commit()
+                    self._db.execute("VACUUM")
+                except sqlite3.Error as e:
+                    print(f"清空翻译缓存出错: {e}")
+
+    def stats(self):
+        """
+        获取缓存统计
+
+        Returns:
+            包含命中、未命中次数和条目数的字典
+        """
+        with self._lock:
+            disk_entries = 0
+            if self._db is not None:
+                try:
+                    disk_entries = self._db.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+                except sqlite3.Error:
+                    pass
+            lookups = self._hits_memory + self._hits_disk + self._misses
+            return {
+                "memory_hits": self._hits_memory,
+                "disk_hits": self._hits_disk,
+                "misses": self._misses,
+                "hit_rate": (self._hits_memory + self._hits_disk) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries
+            }
+
+    def close(self):
+        """
+        关闭磁盘缓存
+        """
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _expired(self, created, now):
+        return self.ttl > 0 and now - created > self.ttl
+
+    def _remember(self, key, value, created):
+        # 写入内存LRU，超出容量时淘汰最久未使用的条目
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _evict(self):
+        # 超出容量时按最近访问时间淘汰磁盘中的旧条目
+        count = self._db.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        if count > self.max_entries:
+            self._db.execute(
+                "DELETE FROM translations WHERE key IN ("
+                "SELECT key FROM translations ORDER BY accessed LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def _purge_expired(self):
+        if self.ttl > 0:
+            self._db.execute("DELETE FROM translations WHERE created < ?", (time.time() - self.ttl,))
+            self._db.commit()
@@ -0,0 +1,868 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SpaceTrans翻译引擎模块
+
+与键盘、剪贴板无关的翻译核心：提示词构造、API请求、缓存、语言识别和长文本分片。
+键盘触发的SpaceTranslator和批量翻译命令共用同一个引擎。
+"""
+
+import asyncio
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import telemetry
+from http_client import APIError
+from glossary import Glossary, format_terms
+from incremental import SENTENCE_MAX_CHARS, TranslationMemory, number_segments, parse_numbered
+from prompt_budget import TRUNCATION_RETRY_FACTOR, OutputTruncatedError, PromptBudget, estimate_tokens
+from providers import ProviderRouter, is_provider_failure, load_providers
+from rate_limiter import backoff_delay
+from streaming import StreamingUnsupportedError, iter_completion_deltas
+from translation_cache import TranslationCache
+from lang_detect import LanguageDetector
+from local_engine import LocalTranslator
+from segmenter import join_translations, segment_text, split_sentences
+
+# 翻译后端：remote为API服务，local为本地模型，auto为短文本用本地模型、长文本用API服务
+ENGINE_MODES = ("remote", "local", "auto")
+
+# 目标语言代码与提示词中使用的语言名称
+TARGET_LANGUAGES = {
+    "en": "English",
+    "zh-Hans": "Simplified Chinese"
+}
+
+
+def build_user_prompt(text, target_lang, terms=None):
+    """
+    构造发送给模型的用户消息，告知目标语言
+
+    Args:
+        terms: 原文中命中的术语对 [(术语, 对应术语)]，放在消息开头
+    """
+    return f"{format_terms(terms)}Translate into {TARGET_LANGUAGES[target_lang]}: {text}"
+
+
+class TranslationEngine:
+    """
+    翻译引擎 - 持有连接池、缓存和语言识别器，提供各种粒度的翻译接口
+    """
+    def __init__(self, config):
+        """
+        Args:
+            config: 配置字典，见config_manager.DEFAULT_CONFIG
+        """
+        self.config = config
+        self.API_KEY = config["API_KEY"]
+        self.API_HOST = config["API_HOST"]
+        self.MODEL = config["MODEL"]
+
+        # 翻译服务列表：第一个是主服务，其余是用于对冲请求的备用服务
+        self.providers = load_providers(config)
+        # 服务路由：按健康状况选择服务，连续失败的服务熔断后在后台探测
+        self.router = ProviderRouter(
+            self.providers,
+            failure_threshold=config["BREAKER_FAILURES"],
+            cooldown=config["BREAKER_COOLDOWN"]
+        )
+        self._hedge_lock = threading.Lock()
+        self.hedge_wins = {"primary": 0, "primary_after_hedge": 0, "hedge": 0}
+
+        # 语言识别：按文字系统快速判定，不明确时才调用py3langid
+        self.language_detector = LanguageDetector()
+
+        # 本地翻译模型：按需加载后常驻内存，模型或依赖缺失时自动改用API服务
+        self.engine_mode = config["ENGINE"]
+        if self.engine_mode not in ENGINE_MODES:
+            print(f"未知的ENGINE: {self.engine_mode}，使用remote")
+            self.engine_mode = "remote"
+        self.local = LocalTranslator(
+            config["LOCAL_MODEL_DIR"], config["LOCAL_THREADS"], self.language_detector
+        ) if self.engine_mode != "remote" else None
+        self._local_warnings = set()
+
+        # 长文本分片并发翻译使用的有界线程池
+        self.chunk_executor = ThreadPoolExecutor(
+            max_workers=config["CHUNK_WORKERS"], thread_name_prefix="chunk"
+        )
+
+        # 流式翻译开关，服务不支持时会在运行中自动关闭
+        self.stream_enabled = config["STREAM"]
+
+        # 翻译缓存：内存LRU + ~/.spacetrans下的SQLite
+        self.cache = TranslationCache(
+            memory_size=config["CACHE_MEMORY_SIZE"],
+            max_entries=config["CACHE_MAX_ENTRIES"],
+            ttl=config["CACHE_TTL_DAYS"] * 24 * 3600
+        ) if config["CACHE_ENABLED"] else None
+
+        # 提示词预算：短文本使用精简提示词，按原文长度限制输出token数
+        self.budget = PromptBudget(
+            config["SYSTEM_PROMPT"],
+            compact_tokens=config["COMPACT_PROMPT_TOKENS"],
+            max_tokens_factor=config["MAX_TOKENS_FACTOR"]
+        )
+
+        # 术语表：只把原文中出现的术语对加入用户消息
+        self.glossary = Glossary(config["GLOSSARY_FILE"], config["GLOSSARY_MAX_TERMS"])
+
+        # 增量翻译：按会话记住上次的逐句译文，再次触发时只翻译改动的句子
+        self.memory = TranslationMemory() if config["INCREMENTAL_ENABLED"] else None
+
+        # API返回的token用量累计
+        self._usage_lock = threading.Lock()
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    @property
+    def http_client(self):
+        """
+        主服务长期持有的连接池客户端，复用与API_HOST的连接
+        """
+        return self.providers[0].http_client
+
+    def bind_loop(self, loop):
+        """
+        指定异步翻译所在的事件循环，预热连接时同时预热该循环中异步请求使用的连接池
+        """
+        for provider in self.providers:
+            provider.bind_loop(loop)
+
+    def warm_up_tasks(self):
+        """
+        返回引擎的预热任务：加载语言识别模型并建立API连接
+        """
+        tasks = [
+            ("语言识别", self.language_detector.warm_up),
+            ("术语表", self.glossary.load),
+            ("HTTP连接", lambda: self.http_client.warm_up(wait=True))
+        ]
+        if self.local is not None:
+            tasks.insert(1, ("本地翻译模型", self.local.load))
+        if self.hedge_enabled:
+            # 备用服务的连接也提前建立，对冲请求不必再握手
+            tasks.extend(
+                (f"HTTP连接（{provider.name}）", lambda provider=provider: provider.http_client.warm_up(wait=True))
+                for provider in self.providers[1:]
+            )
+        return tasks
+
+    def close(self):
+        """
+        释放连接池、线程池、缓存和本地模型，用于替换为新配置的引擎之后
+        """
+        self.chunk_executor.shutdown(wait=False, cancel_futures=True)
+        self.router.close()
+        for provider in self.providers:
+            provider.close()
+        if self.cache is not None:
+            self.cache.close()
+        if self.local is not None:
+            self.local.close()
+
+    def detect_target_language(self, text):
+        """
+        识别原文语言并确定目标语言：中文译为英文，其他语言译为简体中文
+
+        Returns:
+            (目标语言代码, 识别出的语言, 置信度, 是否由快速路径判定)
+        """
+        with telemetry.span("language_detection"):
+            lang, confidence, fast_path = self.language_detector.classify(text)
+        target_lang = "en" if lang == "zh" else "zh-Hans"
+        return target_lang, lang, confidence, fast_path
+
+    def match_terms(self, text, target_lang):
+        """
+        匹配原文中译为target_lang时要用的术语。每个请求只匹配一次，结果传给use_local和翻译方法
+        """
+        return self.glossary.match(text, target_lang)
+
+    def use_local(self, text, target_lang, terms=None):
+        """
+        是否用本地模型翻译这段文本
+
+        Args:
+            terms: 已经匹配好的术语，为None时在需要时匹配
+        """
+        if self.local is None:
+            return False
+        if self.engine_mode == "auto":
+            if len(text) > self.config["LOCAL_MAX_CHARS"]:
+                return False
+            if terms is None:
+                terms = self.match_terms(text, target_lang)
+            if terms:
+                # 本地模型无法使用术语表，命中术语的文本交给API服务
+                return False
+        reason = self.local.unavailable_reason(target_lang)
+        if reason is not None:
+            if reason not in self._local_warnings:
+                self._local_warnings.add(reason)
+                print(f"本地翻译不可用，改用API服务: {reason}")
+            return False
+        return self.local.supports(text, target_lang)
+
+    @property
+    def hedge_enabled(self):
+        """
+        是否配置了备用服务并开启了对冲请求
+        """
+        return self.config["HEDGE_ENABLED"] and len(self.providers) > 1
+
+    def build_request(self, text, provider=None):
+        """
+        构造chat completions请求的请求头和请求体
+
+        Args:
+            text: 用户消息
+            provider: 目标服务，默认为主服务
+        """
+        provider = provider or self.providers[0]
+        headers = provider.headers()
+        system_prompt, max_tokens, _ = self.budget.plan(text)
+
+        payload = {
+            "model": provider.model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": text}
+            ],
+            "temperature": self.config["TEMPERATURE"]
+        }
+        if max_tokens:
+            payload["max_tokens"] = max_tokens
+        return headers, payload
+
+    def request_translation(self, text):
+        """
+        调用AI API翻译文本，当前服务失败时依次切换到其他服务，全部失败时抛出异常
+
+        Raises:
+            APIError: API服务返回错误
+        """
+        return self._request_with_failover(text)[0]
+
+    def _request_with_failover(self, text):
+        # request_translation的实现，同时返回实际给出译文的服务
+        last_error = None
+        for provider in self.router.ranked():
+            try:
+                return self._request_provider_sync(provider, text), provider
+            except Exception as e:
+                if not is_provider_failure(e):
+                    raise
+                last_error = e
+                print(f"服务{provider.name}请求失败，切换到下一个服务: {e}")
+        raise last_error
+
+    async def request_translation_async(self, text):
+        """
+        request_translation的异步版本，在AsyncCore的事件循环中使用。
+        开启对冲时，最优服务迟迟没有响应会向次优服务发出对冲请求
+
+        Raises:
+            APIError: API服务返回错误
+        """
+        return (await self._request_with_failover_async(text))[0]
+
+    async def _request_with_failover_async(self, text):
+        # request_translation_async的实现，同时返回实际给出译文的服务
+        candidates = self.router.ranked()
+        last_error = None
+        while candidates:
+            provider = candidates.pop(0)
+            try:
+                if self.hedge_enabled and candidates:
+                    return await self._request_hedged(text, provider, candidates.pop(0))
+                return await self._request_provider(provider, text), provider
+            except Exception as e:
+                if not is_provider_failure(e):
+                    raise
+                last_error = e
+                if candidates:
+                    print(f"服务{provider.name}请求失败，切换到下一个服务: {e}")
+        raise last_error
+
+    def hedge_delay(self, provider=None):
+        """
+        发出对冲请求前等待该服务的时间：该服务最近耗时的百分位数，样本不足时使用HEDGE_DELAY
+        """
+        provider = provider or self.router.ranked()[0]
+        delay = provider.latency.percentile(self.config["HEDGE_PERCENTILE"])
+        return self.config["HEDGE_DELAY"] if delay is None else delay
+
+    def hedge_stats(self):
+        """
+        获取对冲请求的统计
+
+        Returns:
+            {"primary": 未触发对冲, "primary_after_hedge": 触发对冲后首选服务仍先返回,
+             "hedge": 对冲服务先返回, "hedge_delay": 当前首选服务的对冲等待时间}
+        """
+        with self._hedge_lock:
+            stats = dict(self.hedge_wins)
+        stats["hedge_delay"] = round(self.hedge_delay(), 3)
+        return stats
+
+    def translate_text(self, text):
+        """
+        调用AI API翻译文本，失败时返回错误信息
+        """
+        if not self.API_KEY:
+            return "错误：请先设置API_KEY"
+
+        try:
+            return self.request_translation(text)
+        except APIError as e:
+            return f"翻译失败: {e.message}"
+        except Exception as e:
+            return f"翻译出错: {str(e)}"
+
+    def translate_text_stream(self, text, result=None):
+        """
+        以流式方式调用AI API翻译文本，译文到达一段返回一段
+
+        Args:
+            result: 传入字典时，把发出请求的服务写入result["provider"]，供cache_result使用
+
+        Raises:
+            StreamingUnsupportedError: API服务不支持流式输出
+            APIError: API服务返回错误
+        """
+        provider = self.router.ranked()[0]
+        if result is not None:
+            result["provider"] = provider
+        start_time = time.perf_counter()
+        first_time = None
+        parts = []
+        try:
+            for delta in self._stream_provider(provider, text):
+                if first_time is None:
+                    first_time = time.perf_counter()
+                    telemetry.record_span("first_token", first_time - start_time, start_time, provider=provider.name)
+                parts.append(delta)
+                yield delta
+            if first_time is not None:
+                # 流式响应不一定返回用量，按本地估算记录
+                telemetry.record_span(
+                    "generation", time.perf_counter() - first_time, first_time, provider=provider.name,
+                    completion_tokens_estimated=estimate_tokens("".join(parts))[0]
+                )
+        except StreamingUnsupportedError:
+            raise
+        except Exception as e:
+            self.router.record_failure(provider, e)
+            raise
+        self.router.record_success(provider)
+
+    def _stream_provider(self, provider, text):
+        # 向指定服务发出流式请求
+        headers, payload = self.build_request(text, provider)
+        payload["stream"] = True
+        cost = self._request_cost(payload)
+        provider.limiter.acquire(cost)
+
+        with provider.http_client.stream_post("/v1/chat/completions", payload, headers=headers) as response:
+            if response.status_code != 200:
+                # 出错的响应不消耗token，预留的全部退回
+                provider.limiter.settle(cost, 0)
+                try:
+                    error_message = response.json().get("error", {}).get("message", "未知错误")
+                except ValueError:
+                    error_message = "未知错误"
+                if "stream" in error_message.lower():
+                    raise StreamingUnsupportedError(error_message)
+                error = APIError(error_message, response.status_code, response.retry_after)
+                # 流式请求不重试，由调用方回退到非流式请求，届时会等待限流结束
+                self._throttle(provider, error)
+                raise error
+
+            if "text/event-stream" not in response.content_type:
+                # 服务忽略了stream参数，直接返回了完整的JSON
+                response_data = response.json()
+                provider.limiter.settle(cost, self._usage_total(response_data))
+                yield response_data["choices"][0]["message"]["content"]
+                return
+
+            # 流结束或被调用方提前关闭时修正预留的token：有usage chunk时按实际用量，
+            # 否则按输入估算加上已收到的译文估算
+            result = {}
+            parts = []
+            try:
+                for delta in iter_completion_deltas(response.iter_lines(), result):
+                    parts.append(delta)
+                    yield delta
+            finally:
+                actual = self._usage_total(result)
+                if actual is None:
+                    actual = self._prompt_tokens(payload) + estimate_tokens("".join(parts))[0]
+                provider.limiter.settle(cost, actual)
+
+    def user_prompt(self, text, target_lang, terms=None):
+        """
+        构造用户消息，附带原文中命中的术语
+
+        Args:
+            terms: 已经匹配好的术语，为None时在这里匹配
+        """
+        if terms is None:
+            terms = self.match_terms(text, target_lang)
+        return build_user_prompt(text, target_lang, terms)
+
+    def cache_key(self, message, target_lang):
+        """
+        生成当前模型、提示词和温度下的缓存键
+
+        Args:
+            message: user_prompt构造的用户消息。系统提示词与build_request一样由它选出，
+                缓存键对应的正是实际发出的这一对提示词
+        """
+        system_prompt = self.budget.select_prompt(message)
+        return TranslationCache.make_key(
+            self.MODEL, system_prompt, self.config["TEMPERATURE"], target_lang, message
+        )
+
+    def cache_result(self, key, provider, translated_text):
+        """
+        把译文写入缓存。缓存键按主服务的模型生成，模型不同的备用服务给出的译文不写入，
+        以免之后被当作主服务的结果返回
+
+        Args:
+            key: lookup_cache返回的缓存键，为None时不写缓存
+            provider: 实际给出译文的服务
+        """
+        if key is not None and provider.model == self.MODEL:
+            self.cache.put(key, translated_text)
+
+    def lookup_cache(self, text, target_lang, terms=None):
+        """
+        构造用户消息并查询翻译缓存
+
+        Returns:
+            (用户消息, 缓存键, 缓存的译文)，未启用缓存时缓存键为None，未命中时译文为None
+        """
+        message = self.user_prompt(text, target_lang, terms)
+        if self.cache is None:
+            return message, None, None
+        key = self.cache_key(message, target_lang)
+        return message, key, self.cache.get(key)
+
+    def translate_segment(self, text, target_lang, terms=None):
+        """
+        翻译单个片段，按ENGINE选择本地模型或API服务，本地翻译出错时改用API服务
+
+        Args:
+            terms: 已经匹配好的术语，为None时在需要时匹配
+
+        Raises:
+            APIError: API服务返回错误
+        """
+        if terms is None:
+            terms = self.match_terms(text, target_lang)
+        if self.use_local(text, target_lang, terms):
+            try:
+                with telemetry.span("local_translation"):
+                    return self.local.translate(text, target_lang)
+            except Exception as e:
+                print(f"本地翻译失败，改用API服务: {e}")
+        return self._translate_remote(text, target_lang, terms)
+
+    def _translate_remote(self, text, target_lang, terms=None):
+        """
+        通过API服务翻译单个片段，优先使用缓存，只有成功的结果才会写入缓存
+
+        Raises:
+            APIError: API服务返回错误
+        """
+        message, key, cached = self.lookup_cache(text, target_lang, terms)
+        if cached is not None:
+            return cached
+
+        translated_text, provider = self._request_with_failover(message)
+        self.cache_result(key, provider, translated_text)
+        return translated_text
+
+    def translate_chunked(self, text, target_lang):
+        """
+        把长文本切分成片段并发翻译，再按原顺序拼接，片段之间的空白和换行原样保留
+
+        Raises:
+            APIError: 任一片段翻译失败
+        """
+        segments = segment_text(text, self.config["CHUNK_MAX_CHARS"])
+        futures = [
+            self.chunk_executor.submit(self._translate_remote, segment, target_lang) if translatable else None
+            for segment, translatable in segments
+        ]
+        print(f"长文本已切分为{sum(1 for f in futures if f)}个片段并发翻译")
+
+        try:
+            return "".join(
+                future.result() if future is not None else segment
+                for future, (segment, _) in zip(futures, segments)
+            )
+        except Exception:
+            # 有片段失败时取消尚未开始的片段，不返回不完整的译文
+            for future in futures:
+                if future is not None:
+                    future.cancel()
+            raise
+
+    async def translate_segment_async(self, text, target_lang, terms=None):
+        """
+        translate_segment的异步版本
+
+        Raises:
+            APIError: API服务返回错误
+        """
+        if terms is None:
+            terms = self.match_terms(text, target_lang)
+        if self.use_local(text, target_lang, terms):
+            try:
+                with telemetry.span("local_translation"):
+                    return await self.local.translate_async(text, target_lang)
+            except Exception as e:
+                print(f"本地翻译失败，改用API服务: {e}")
+        return await self._translate_remote_async(text, target_lang, terms)
+
+    async def _translate_remote_async(self, text, target_lang, terms=None):
+        """
+        _translate_remote的异步版本
+
+        Raises:
+            APIError: API服务返回错误
+        """
+        message, key, cached = self.lookup_cache(text, target_lang, terms)
+        if cached is not None:
+            return cached
+
+        translated_text, provider = await self._request_with_failover_async(message)
+        self.cache_result(key, provider, translated_text)
+        return translated_text
+
+    async def translate_chunked_async(self, text, target_lang):
+        """
+        translate_chunked的异步版本，片段以协程并发，同时在途的请求数不超过CHUNK_WORKERS
+
+        Raises:
+            APIError: 任一片段翻译失败
+        """
+        semaphore = asyncio.Semaphore(self.config["CHUNK_WORKERS"])
+
+        async def run(segment):
+            async with semaphore:
+                return await self._translate_remote_async(segment, target_lang)
+
+        segments = segment_text(text, self.config["CHUNK_MAX_CHARS"])
+        tasks = [
+            asyncio.ensure_future(run(segment)) if translatable else None
+            for segment, translatable in segments
+        ]
+        print(f"长文本已切分为{sum(1 for t in tasks if t)}个片段并发翻译")
+
+        try:
+            results = await asyncio.gather(*[task for task in tasks if task is not None])
+        except BaseException:
+            # 失败或被取消时一并取消其余片段
+            for task in tasks:
+                if task is not None:
+                    task.cancel()
+            raise
+
+        results = iter(results)
+        return "".join(
+            next(results) if task is not None else segment
+            for task, (segment, _) in zip(tasks, segments)
+        )
+
+    async def translate_async(self, text, target_lang, terms=None):
+        """
+        异步翻译文本到指定语言，超长文本自动切分并发翻译
+
+        Args:
+            terms: 已经匹配好的术语，为None时在需要时匹配。切分后的片段各自匹配
+
+        Raises:
+            APIError: API服务返回错误
+        """
+        if len(text) > self.config["CHUNK_MAX_CHARS"] and not self.use_local(text, target_lang, terms):
+            return await self.translate_chunked_async(text, target_lang)
+        return await self.translate_segment_async(text, target_lang, terms)
+
+    async def translate_incremental_async(self, text, target_lang, session):
+        """
+        增量翻译：与会话上次的原文按句比较，只翻译新增或修改的句子。
+        多个待翻译的句子带编号放在同一个请求中，按编号对应回各句；
+        译文中缺少的编号再逐句并发补译，不重新翻译全文
+
+        Args:
+            session: 会话标识，例如前台应用名称
+
+        Raises:
+            APIError: API服务返回错误
+        """
+        parts = split_sentences(text, SENTENCE_MAX_CHARS)
+        sentences = [part for part, translatable in parts if translatable]
+        translations = self.memory.diff(session, target_lang, sentences)
+        pending = [i for i, translated in enumerate(translations) if translated is None]
+        reused = len(sentences) - len(pending)
+
+        trace = telemetry.current_trace()
+        if trace is not None:
+            trace.set(sentences=len(sentences), reused_sentences=reused)
+
+        if len(pending) > 1:
+            result = await self.translate_async(number_segments([sentences[i] for i in pending]), target_lang)
+            for i, translated in zip(pending, parse_numbered(result, len(pending))):
+                translations[i] = translated
+            missing = [i for i in pending if translations[i] is None]
+            if missing:
+                print(f"增量翻译的译文缺少{len(missing)}句，逐句补译")
+            pending = missing
+
+        if pending:
+            semaphore = asyncio.Semaphore(self.config["CHUNK_WORKERS"])
+
+            async def run(sentence):
+                async with semaphore:
+                    return await self.translate_segment_async(sentence, target_lang)
+
+            tasks = [asyncio.ensure_future(run(sentences[i])) for i in pending]
+            try:
+                results = await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
+            for i, translated in zip(pending, results):
+                translations[i] = translated
+
+        self.memory.put(session, target_lang, sentences, translations, reused)
+        return join_translations(parts, translations, target_lang)
+
+    def translate(self, text, target_lang):
+        """
+        翻译文本到指定语言，超长文本自动切分并发翻译，失败时返回错误信息
+
+        Args:
+            text: 原文
+            target_lang: 目标语言代码，见TARGET_LANGUAGES
+        """
+        terms = self.match_terms(text, target_lang)
+        local = self.use_local(text, target_lang, terms)
+        if not self.API_KEY and not local:
+            return "错误：请先设置API_KEY"
+
+        try:
+            if len(text) > self.config["CHUNK_MAX_CHARS"] and not local:
+                return self.translate_chunked(text, target_lang)
+            return self.translate_segment(text, target_lang, terms)
+        except APIError as e:
+            return f"翻译失败: {e.message}"
+        except Exception as e:
+            return f"翻译出错: {str(e)}"
+
+    def usage(self):
+        """
+        获取累计的token用量
+
+        Returns:
+            {"prompt_tokens": 输入token数, "completion_tokens": 输出token数}
+        """
+        with self._usage_lock:
+            return {
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens
+            }
+
+    def _request_provider_sync(self, provider, text):
+        # 向指定服务发出同步请求，并把结果计入该服务的健康状况。
+        # 发出前在该服务的限流器中排队；服务限流时按Retry-After等待后重试，重试用尽才计为失败
+        headers, payload = self.build_request(text, provider)
+        cost = self._request_cost(payload)
+        widened = False
+        for attempt in itertools.count():
+            provider.limiter.acquire(cost)
+            reserved, status_code, response_data = cost, None, None
+            start_time = time.perf_counter()
+            try:
+                # 非流式响应的首个token随完整译文一起到达
+                with telemetry.span("first_token", provider=provider.name) as attrs:
+                    status_code, response_data = provider.http_client.post_json(
+                        "/v1/chat/completions", payload, headers=headers
+                    )
+                    attrs.update(self._usage_attrs(payload, response_data))
+                translated_text = self._parse_completion(status_code, response_data, payload.get("max_tokens"))
+            except Exception as e:
+                if self._throttle(provider, e, attempt) and attempt < self.config["RETRY_ATTEMPTS"]:
+                    continue
+                if isinstance(e, OutputTruncatedError) and e.max_tokens and not widened:
+                    # 译文被截断说明本地估算偏小，放宽上限重试一次
+                    widened = True
+                    payload["max_tokens"] = e.max_tokens * TRUNCATION_RETRY_FACTOR
+                    cost = self._request_cost(payload)
+                    continue
+                self.router.record_failure(provider, e)
+                raise
+            finally:
+                provider.limiter.settle(reserved, self._settled_usage(status_code, response_data))
+            self.router.record_success(provider, time.perf_counter() - start_time)
+            return translated_text
+
+    async def _request_provider(self, provider, text):
+        # 向指定服务发出异步请求，被取消的请求不计入成败
+        headers, payload = self.build_request(text, provider)
+        cost = self._request_cost(payload)
+        widened = False
+        for attempt in itertools.count():
+            await provider.limiter.acquire_async(cost)
+            reserved, status_code, response_data = cost, None, None
+            start_time = time.perf_counter()
+            try:
+                with telemetry.span("first_token", provider=provider.name) as attrs:
+                    status_code, response_data = await provider.http_client.post_json_async(
+                        "/v1/chat/completions", payload, headers=headers
+                    )
+                    attrs.update(self._usage_attrs(payload, response_data))
+                translated_text = self._parse_completion(status_code, response_data, payload.get("max_tokens"))
+            except Exception as e:
+                if self._throttle(provider, e, attempt) and attempt < self.config["RETRY_ATTEMPTS"]:
+                    continue
+                if isinstance(e, OutputTruncatedError) and e.max_tokens and not widened:
+                    # 译文被截断说明本地估算偏小，放宽上限重试一次
+                    widened = True
+                    payload["max_tokens"] = e.max_tokens * TRUNCATION_RETRY_FACTOR
+                    cost = self._request_cost(payload)
+                    continue
+                self.router.record_failure(provider, e)
+                raise
+            finally:
+                provider.limiter.settle(reserved, self._settled_usage(status_code, response_data))
+            self.router.record_success(provider, time.perf_counter() - start_time)
+            return translated_text
+
+    def _prompt_tokens(self, payload):
+        # 估算的输入token数
+        return sum(estimate_tokens(m["content"])[0] for m in payload["messages"])
+
+    def _request_cost(self, payload):
+        # 请求在TPM中预留的token数：估算的输入token数加上输出上限，
+        # 没有输出上限时按译文与原文等长估算，响应返回后按实际用量修正
+        prompt_tokens = self._prompt_tokens(payload)
+        return prompt_tokens + (payload.get("max_tokens") or prompt_tokens)
+
+    def _usage_total(self, response_data):
+        # 响应中的实际token用量，没有usage时返回None
+        usage = response_data.get("usage") if isinstance(response_data, dict) else None
+        if not usage:
+            return None
+        return usage.get("total_tokens") or usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0)
+
+    def _settled_usage(self, status_code, response_data):
+        # 修正预留token时使用的用量：出错、被限流或没有收到响应时服务没有给出usage，预留的token全部退回
+        usage = self._usage_total(response_data)
+        if usage is None and (status_code is None or not 200 <= status_code < 300):
+            return 0
+        return usage
+
+    def _throttle(self, provider, error, attempt=0):
+        """
+        服务限流（429，或带Retry-After的503）时暂停该服务的所有请求
+
+        Args:
+            attempt: 已重试的次数，没有Retry-After时决定退避时间
+
+        Returns:
+            是否为限流错误
+        """
+        if not isinstance(error, APIError):
+            return False
+        if error.status_code != 429 and not (error.status_code == 503 and error.retry_after is not None):
+            return False
+        delay = backoff_delay(attempt, error.retry_after)
+        provider.limiter.throttle(delay)
+        telemetry.metrics.inc("spacetrans_rate_limited_total", provider=provider.name)
+        print(f"服务{provider.name}限流，暂停{delay:.1f}秒")
+        return True
+
+    async def _request_hedged(self, text, first, second):
+        # 首选服务在对冲等待时间内没有返回时，再向次优服务发出同样的请求，
+        # 采用先成功返回的结果并取消另一个；两个都失败时抛出首选服务的错误。
+        # 首选服务在等待时间内就失败时，直接改用次优服务。返回(译文, 给出译文的服务)
+        start_time = time.perf_counter()
+        primary = asyncio.ensure_future(self._request_provider(first, text))
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay(first))
+        if done:
+            error = primary.exception()
+            if error is None:
+                self._record_hedge("primary")
+                return primary.result(), first
+            if not is_provider_failure(error):
+                raise error
+            # 首选服务很快就失败了，直接改用次优服务
+            print(f"服务{first.name}请求失败，切换到服务{second.name}: {error}")
+            return await self._request_provider(second, text), second
+
+        hedge = asyncio.ensure_future(self._request_provider(second, text))
+        labels = {primary: "primary_after_hedge", hedge: "hedge"}
+        answered_by = {primary: first, hedge: second}
+        pending = set(labels)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self._record_hedge(labels[task])
+                        return task.result(), answered_by[task]
+            return primary.result(), first
+        finally:
+            if not primary.done():
+                # 首选服务被取消时，已等待的时间是它耗时的下限，同样计入统计，
+                # 否则慢请求永远不会被记录，对冲等待时间会越来越短
+                first.latency.add(time.perf_counter() - start_time)
+            for task in labels:
+                task.cancel()
+
+    def _record_hedge(self, path):
+        with self._hedge_lock:
+            self.hedge_wins[path] += 1
+
+    def _parse_completion(self, status_code, response_data, max_tokens=None):
+        # 解析chat completions响应，失败时抛出APIError
+        if status_code == 200 and "choices" in response_data:
+            self._record_usage(response_data.get("usage") or {})
+            choice = response_data["choices"][0]
+            if choice.get("finish_reason") == "length":
+                # 译文被max_tokens截断，粘贴不完整的译文会丢失原文
+                telemetry.metrics.inc("spacetrans_truncated_total")
+                raise OutputTruncatedError(max_tokens)
+            return choice["message"]["content"].strip()
+        error = response_data.get("error", {})
+        raise APIError(error.get("message", "未知错误"), status_code, error.get("retry_after"))
+
+    def _record_usage(self, usage):
+        with self._usage_lock:
+            self.prompt_tokens += usage.get("prompt_tokens", 0)
+            self.completion_tokens += usage.get("completion_tokens", 0)
+        for kind in ("prompt", "completion"):
+            if usage.get(f"{kind}_tokens"):
+                telemetry.metrics.inc("spacetrans_tokens_total", usage[f"{kind}_tokens"], kind=kind)
+
+    def _usage_attrs(self, payload, response_data):
+        # 单次请求的token用量，记录到计时日志中该请求的片段上，便于对照本地估算
+        usage = (response_data.get("usage") if isinstance(response_data, dict) else None) or {}
+        attrs = {
+            "prompt_tokens_estimated": sum(estimate_tokens(m["content"])[0] for m in payload["messages"]),
+            "compact_prompt": payload["messages"][0]["content"] != self.config["SYSTEM_PROMPT"]
+        }
+        if payload.get("max_tokens"):
+            attrs["max_tokens"] = payload["max_tokens"]
+        for key in ("prompt_tokens", "completion_tokens"):
+            if key in usage:
+                attrs[key] = usage[key]
+        return attrs